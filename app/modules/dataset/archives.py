@@ -0,0 +1,88 @@
+import hashlib
+import os
+
+from flask import current_app
+
+from app.modules.hubfile.services import HubfileService
+from core.archives.formats import stream_archive
+from core.caches.disk_cache import DiskLRUCache
+
+
+def get_archive_store() -> DiskLRUCache:
+    if "dataset_archives" not in current_app.extensions:
+        current_app.extensions["dataset_archives"] = DiskLRUCache(
+            current_app.config.get("DATASET_ARCHIVES_DIR", "cache/archives"),
+            max_bytes=current_app.config.get("DATASET_ARCHIVES_MAX_BYTES", 1024 * 1024 * 1024),
+        )
+    return current_app.extensions["dataset_archives"]
+
+
+def dataset_archive_etag(dataset_id, options):
+    """Strong validator of a dataset archive, it changes whenever a file of the dataset does."""
+    digest = hashlib.sha256(f"{dataset_id}\0{options.key}\n".encode("utf-8"))
+    for hubfile, _, _ in sorted(HubfileService().get_paths(dataset_ids=[dataset_id]), key=lambda row: row[0].id):
+        digest.update(f"{hubfile.id}\0{hubfile.name}\0{hubfile.checksum}\n".encode("utf-8"))
+    return digest.hexdigest()[:32]
+
+
+def dataset_archive_entries(dataset):
+    """(name in the archive, path) of every file of the dataset."""
+    folder = f"uploads/user_{dataset.user_id}/dataset_{dataset.id}/"
+    entries = []
+    for subdir, dirs, files in os.walk(folder):
+        for file in sorted(files):
+            full_path = os.path.join(subdir, file)
+            relative_path = os.path.relpath(full_path, folder)
+            entries.append((os.path.join(f"dataset_{dataset.id}", relative_path), full_path))
+
+    # Files moved to the blob store are not in the folder any more
+    names = {name for name, _ in entries}
+    for hubfile, _, file_path in HubfileService().get_paths(dataset_ids=[dataset.id]):
+        name = os.path.join(f"dataset_{dataset.id}", hubfile.name)
+        if name not in names and os.path.exists(file_path):
+            entries.append((name, file_path))
+            names.add(name)
+    return entries
+
+
+def get_dataset_archive(dataset, options, build=True):
+    """(path, etag) of the dataset's archive packed as options say.
+
+    Serving it from disk lets clients resume interrupted downloads with byte ranges. A missing archive is built
+    before returning, or without build the path is None and stream_dataset_archive() has to send it.
+    """
+    etag = dataset_archive_etag(dataset.id, options)
+    store = get_archive_store()
+    if not build:
+        return store.get((etag,), options.extension), etag
+
+    def produce(path):
+        with open(path, "wb") as archive:
+            for chunk in stream_archive(dataset_archive_entries(dataset), options):
+                archive.write(chunk)
+
+    return store.get_or_create((etag,), produce, suffix=options.extension), etag
+
+
+def stream_dataset_archive(dataset, options, etag):
+    """Chunks of the dataset's archive as they are built, so the first byte goes out without waiting for the rest.
+
+    A copy is written on the way and stored once the archive is complete, for get_dataset_archive() to serve with
+    ranges from then on. An interrupted download discards it.
+    """
+    store = get_archive_store()
+    entries = dataset_archive_entries(dataset)
+    temp_path = store.temp_path()
+
+    def generate():
+        try:
+            with open(temp_path, "wb") as copy:
+                for chunk in stream_archive(entries, options):
+                    copy.write(chunk)
+                    yield chunk
+            store.put((etag,), temp_path, options.extension)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    return generate()
@@ -0,0 +1,153 @@
+import fcntl
+import json
+import os
+import re
+import shutil
+import uuid
+
+from flask import current_app
+
+from app.modules.dataset.ingestion import Ingestor, save_record
+from core.archives.extract import unique_name
+
+UPLOAD_EXTENSIONS = (".uvl", ".zip")
+
+# Bytes copied from the request body per write
+COPY_BUFFER_SIZE = 64 * 1024
+
+
+class ChunkedUploadError(Exception):
+    """Rejected upload request, offset is the number of bytes the server holds when the client must resume."""
+
+    def __init__(self, message, status=400, offset=None):
+        super().__init__(message)
+        self.status = status
+        self.offset = offset
+
+
+def get_uploads_dir(temp_folder):
+    return os.path.join(temp_folder, ".chunked")
+
+
+class ChunkedUpload:
+    """A file sent in several PUT requests, kept as <temp folder>/.chunked/<id>/{upload.json, data.part}.
+
+    Each chunk has to start where the previous one ended, so after a dropped connection the client asks for the
+    offset and sends the rest. finalize() checks the size and SHA-256 and moves the file into the temp folder.
+    """
+
+    def __init__(self, temp_folder, upload_id, filename, size, sha256):
+        self.temp_folder = temp_folder
+        self.id = upload_id
+        self.filename = filename
+        self.size = size
+        self.sha256 = sha256
+
+    @classmethod
+    def create(cls, temp_folder, filename, size, sha256):
+        filename = os.path.basename(filename or "")
+        if not filename.endswith(UPLOAD_EXTENSIONS):
+            raise ChunkedUploadError("No valid file")
+        if not isinstance(size, int) or size < 0:
+            raise ChunkedUploadError("size must be a non negative integer")
+        if size > current_app.config.get("CHUNKED_UPLOAD_MAX_SIZE", 10 * 1024 * 1024 * 1024):
+            raise ChunkedUploadError("File too large", status=413)
+        if not isinstance(sha256, str) or not re.fullmatch(r"[0-9a-fA-F]{64}", sha256):
+            raise ChunkedUploadError("sha256 must be the hex digest of the file")
+
+        upload = cls(temp_folder, uuid.uuid4().hex, filename, size, sha256.lower())
+        os.makedirs(upload.folder)
+        open(upload.part_path, "wb").close()
+        with open(upload.meta_path, "w") as f:
+            json.dump({"filename": upload.filename, "size": upload.size, "sha256": upload.sha256}, f)
+        return upload
+
+    @classmethod
+    def get(cls, temp_folder, upload_id):
+        """The upload with that id in temp_folder, or None."""
+        if not re.fullmatch(r"[0-9a-f]{32}", upload_id):
+            return None
+        try:
+            with open(os.path.join(get_uploads_dir(temp_folder), upload_id, "upload.json")) as f:
+                meta = json.load(f)
+        except FileNotFoundError:
+            return None
+        return cls(temp_folder, upload_id, meta["filename"], meta["size"], meta["sha256"])
+
+    @property
+    def folder(self):
+        return os.path.join(get_uploads_dir(self.temp_folder), self.id)
+
+    @property
+    def meta_path(self):
+        return os.path.join(self.folder, "upload.json")
+
+    @property
+    def part_path(self):
+        return os.path.join(self.folder, "data.part")
+
+    @property
+    def offset(self):
+        return os.path.getsize(self.part_path)
+
+    def to_dict(self):
+        return {
+            "upload_id": self.id,
+            "filename": self.filename,
+            "size": self.size,
+            "offset": self.offset,
+            "chunk_size": current_app.config.get("CHUNKED_UPLOAD_CHUNK_SIZE", 8 * 1024 * 1024),
+        }
+
+    def write_chunk(self, offset, stream):
+        """Appends the stream at offset and returns the new offset.
+
+        The part file stays locked while the chunk is written, so a retried chunk racing the original fails
+        instead of interleaving with it. A chunk cut short keeps the bytes that arrived.
+        """
+        with open(self.part_path, "ab") as part:
+            try:
+                fcntl.flock(part, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                raise ChunkedUploadError("Another chunk is being written", status=409, offset=offset)
+            current = os.fstat(part.fileno()).st_size
+            if offset != current:
+                raise ChunkedUploadError("Chunk does not start at the upload offset", status=409, offset=current)
+
+            while True:
+                buffer = stream.read(COPY_BUFFER_SIZE)
+                if not buffer:
+                    break
+                if current + len(buffer) > self.size:
+                    part.flush()
+                    raise ChunkedUploadError("Chunk goes past the declared size", offset=current)
+                part.write(buffer)
+                current += len(buffer)
+            return current
+
+    def finalize(self):
+        """Checks the received file and moves it into the temp folder, returns the name it got there."""
+        offset = self.offset
+        if offset != self.size:
+            raise ChunkedUploadError("Upload is not complete", status=409, offset=offset)
+
+        # The checksum pass also ingests the file, so creating the dataset does not read it again
+        ingestor = Ingestor(self.filename)
+        with open(self.part_path, "rb") as part:
+            for buffer in iter(lambda: part.read(COPY_BUFFER_SIZE), b""):
+                ingestor.update(buffer)
+        ingested = ingestor.result()
+        if ingested.sha256 != self.sha256:
+            # The received bytes are unusable, the client has to start over
+            self.discard()
+            raise ChunkedUploadError("Checksum mismatch", status=422)
+
+        filename = unique_name(set(os.listdir(self.temp_folder)), self.filename)
+        file_path = os.path.join(self.temp_folder, filename)
+        os.replace(self.part_path, file_path)
+        save_record(file_path, ingested)
+        self.discard()
+        return filename
+
+    def discard(self):
+        shutil.rmtree(self.folder, ignore_errors=True)
@@ -0,0 +1,302 @@
+import glob
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import namedtuple
+from zipfile import ZipFile
+
+from flask import current_app
+
+from app.modules.flamapy import conversions
+from app.modules.hubfile.services import HubfileService
+from core.archives.formats import ZIP_COMPRESSIONS, ArchiveOptions, assemble_archive
+from core.caches.disk_cache import DiskLRUCache
+
+logger = logging.getLogger(__name__)
+
+# Plain rows, so the build thread never touches instances of the request's session
+CatalogueFile = namedtuple("CatalogueFile", ["id", "name", "checksum", "dataset_id", "path"])
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+def get_catalogue():
+    return [
+        CatalogueFile(hubfile.id, hubfile.name, hubfile.checksum, dataset_id, path)
+        for hubfile, dataset_id, path in HubfileService().get_paths()
+    ]
+
+
+def catalogue_fingerprint(files):
+    """Identifies the archive built from files, it changes whenever a file is added, removed or replaced."""
+    digest = hashlib.sha256(conversions.flamapy_version().encode("utf-8"))
+    for file in files:
+        digest.update(f"{file.id}\0{file.checksum}\0{file.path}\n".encode("utf-8"))
+    return digest.hexdigest()[:32]
+
+
+def get_archive_dir():
+    return current_app.config.get("DOWNLOAD_ALL_DIR", "cache/downloads")
+
+
+def job_id_for(catalogue, options):
+    return f"{catalogue}-{options.key}"
+
+
+def parse_job_id(job_id):
+    """(catalogue fingerprint, archive options) of a job id, raises ValueError if it is malformed."""
+    catalogue, _, key = job_id.partition("-")
+    if not catalogue.isalnum():
+        raise ValueError(f"Malformed job id '{job_id}'")
+    return catalogue, ArchiveOptions.from_key(key)
+
+
+def get_archive_path(job_id):
+    return os.path.join(get_archive_dir(), f"all_datasets_{job_id}{parse_job_id(job_id)[1].extension}")
+
+
+class DownloadAllJob:
+    """Builds the hub wide archive with every model in every format, reporting its progress.
+
+    The archive is assembled from one fragment per dataset, which is rebuilt only when the dataset's files change.
+    """
+
+    def __init__(self, job_id):
+        self.id = job_id
+        self.catalogue, self.options = parse_job_id(job_id)
+        self.status = PENDING
+        self.error = None
+        self.datasets_total = 0
+        self.datasets_done = 0
+        self.files_total = 0
+        self.files_done = 0
+        # When the catalogue was read, archives carry it as their mtime so newer catalogues can be told apart
+        self.created_at = time.time()
+        self.finished = threading.Event()
+
+    @property
+    def path(self):
+        return get_archive_path(self.id)
+
+    def to_dict(self):
+        return {
+            "job_id": self.id,
+            "format": self.options.format,
+            "compression": self.options.compression,
+            "level": self.options.level,
+            "status": self.status,
+            "error": self.error,
+            "datasets_total": self.datasets_total,
+            "datasets_done": self.datasets_done,
+            "files_total": self.files_total,
+            "files_done": self.files_done,
+        }
+
+    def run(self, files):
+        self.status = RUNNING
+        try:
+            self.build(files)
+            self.status = DONE
+        except Exception as e:
+            logger.exception(f"Building the download all archive {self.id} failed")
+            self.error = str(e)
+            self.status = FAILED
+        finally:
+            self.finished.set()
+
+    def build(self, files):
+        datasets = {}
+        for file in files:
+            if not os.path.exists(file.path):
+                logger.warning(f"File not found: {file.path}")
+                continue
+            datasets.setdefault(file.dataset_id, []).append(file)
+
+        self.files_total = sum(len(dataset_files) for dataset_files in datasets.values())
+        self.datasets_total = len(datasets)
+        if not datasets:
+            raise FileNotFoundError("No se encontraron archivos disponibles para descargar")
+
+        # Zips are joined from fragments with the same compression, other formats are repacked from stored ones
+        if self.options.format == "zip":
+            fragment_options = self.options
+        else:
+            fragment_options = ArchiveOptions("zip", "stored", 0)
+
+        # Only datasets whose files changed since their fragment was built are converted again
+        store = get_fragment_store()
+        fragments = {}
+        jobs = []
+        for dataset_id, dataset_files in datasets.items():
+            fragment = store.get(fragment_key(dataset_id, dataset_files, fragment_options), ".zip")
+            if fragment is not None:
+                fragments[dataset_id] = fragment
+                self.files_done += len(dataset_files)
+                self.datasets_done += 1
+            else:
+                jobs.extend((file, file.path, file.checksum) for file in dataset_files)
+
+        failed = set()
+
+        def report(tag, format, e):
+            logger.warning(f"Error converting {tag.name} to {format}: {e}")
+            failed.add(tag.dataset_id)
+
+        os.makedirs(get_archive_dir(), exist_ok=True)
+        transient = []
+        converted = {}
+        try:
+            for file, formats in conversions.get_conversion_engine().convert_all(jobs, on_error=report):
+                converted[file] = formats
+                self.files_done += 1
+
+                dataset_files = datasets[file.dataset_id]
+                if any(other not in converted for other in dataset_files):
+                    continue
+
+                def produce(target):
+                    write_fragment(target, dataset_files, converted, fragment_options)
+
+                if file.dataset_id in failed:
+                    # Conversions may fail for transient reasons (timeouts), so such fragments are not kept
+                    fragment = temp_archive_path(".fragment")
+                    transient.append(fragment)
+                    produce(fragment)
+                else:
+                    key = fragment_key(file.dataset_id, dataset_files, fragment_options)
+                    fragment = store.get_or_create(key, produce, suffix=".zip")
+                fragments[file.dataset_id] = fragment
+                self.datasets_done += 1
+
+            temp_path = temp_archive_path(".tmp")
+            transient.append(temp_path)
+            with open(temp_path, "wb") as archive:
+                paths = [fragments[dataset_id] for dataset_id in sorted(fragments)]
+                for chunk in assemble_archive(paths, self.options):
+                    archive.write(chunk)
+            os.utime(temp_path, (self.created_at, self.created_at))
+            os.replace(temp_path, self.path)
+        finally:
+            for path in transient:
+                if os.path.exists(path):
+                    os.remove(path)
+
+        remove_stale_archives(self)
+
+
+def remove_stale_archives(job):
+    """Removes the archives of catalogues older than job's, which are never served again.
+
+    A job that finishes late must not remove the archive of a newer catalogue, so only archives whose catalogue was
+    read before job's go, and never those of jobs still pending or running.
+    """
+    jobs, lock = get_jobs()
+    with lock:
+        active = {get_archive_path(id) for id, other in jobs.items() if not other.finished.is_set()}
+        built_at = os.path.getmtime(job.path)
+        for stale in glob.glob(os.path.join(get_archive_dir(), "all_datasets_*")):
+            if os.path.basename(stale).startswith(f"all_datasets_{job.catalogue}-") or stale in active:
+                continue
+            try:
+                if os.path.getmtime(stale) < built_at:
+                    os.remove(stale)
+            except FileNotFoundError:
+                pass
+
+
+def get_fragment_store() -> DiskLRUCache:
+    if "download_all_fragments" not in current_app.extensions:
+        current_app.extensions["download_all_fragments"] = DiskLRUCache(
+            os.path.join(get_archive_dir(), "fragments"),
+            max_bytes=current_app.config.get("DOWNLOAD_ALL_FRAGMENTS_MAX_BYTES", 2 * 1024 * 1024 * 1024),
+        )
+    return current_app.extensions["download_all_fragments"]
+
+
+def fragment_key(dataset_id, files, options):
+    """A dataset's fragment only depends on its files, the flamapy version used to convert them and its compression."""
+    return (dataset_id, conversions.flamapy_version(), options.key) + tuple(
+        f"{file.id}:{file.name}:{file.checksum}" for file in sorted(files, key=lambda file: file.id)
+    )
+
+
+def write_fragment(path, files, converted, options):
+    """Writes the part of the archive holding one dataset: every model in every format."""
+    compression = ZIP_COMPRESSIONS[options.compression]
+    compresslevel = options.level if options.compression == "deflate" else None
+    with ZipFile(path, "w", compression=compression, compresslevel=compresslevel) as zipf:
+        for file in sorted(files, key=lambda file: file.id):
+            folder = f"dataset_{file.dataset_id}/"
+            for format, converted_path in converted[file].items():
+                zipf.write(converted_path, os.path.join(folder, conversions.download_name(file, format)))
+            zipf.write(file.path, os.path.join(folder, f"{file.name}.txt"))
+
+
+def temp_archive_path(suffix):
+    fd, path = tempfile.mkstemp(dir=get_archive_dir(), suffix=suffix)
+    os.close(fd)
+    return path
+
+
+def get_jobs():
+    if "download_all_jobs" not in current_app.extensions:
+        current_app.extensions["download_all_jobs"] = ({}, threading.Lock())
+    return current_app.extensions["download_all_jobs"]
+
+
+def finished_job(job_id):
+    job = DownloadAllJob(job_id)
+    job.status = DONE
+    job.finished.set()
+    return job
+
+
+def get_job(job_id):
+    """The job, also when only its archive is left from a previous build (or another process)."""
+    try:
+        parse_job_id(job_id)
+    except ValueError:
+        return None
+    jobs, lock = get_jobs()
+    with lock:
+        job = jobs.get(job_id)
+    if job is None and os.path.exists(get_archive_path(job_id)):
+        job = finished_job(job_id)
+    return job
+
+
+def start_job(options=None):
+    """Returns the job building the archive of the current catalogue, starting it unless it is built or running.
+
+    The archive is packed as options say, a deflated zip by default. Concurrent callers attach to the same job,
+    which builds it in a background thread.
+    """
+    files = get_catalogue()
+    job_id = job_id_for(catalogue_fingerprint(files), options or ArchiveOptions.parse({}))
+
+    jobs, lock = get_jobs()
+    with lock:
+        job = jobs.get(job_id)
+        if job is not None and job.status != FAILED:
+            return job
+        if os.path.exists(get_archive_path(job_id)):
+            return finished_job(job_id)
+        # Jobs of previous catalogues are only kept while they run
+        for stale_id in [id for id, stale in jobs.items() if stale.finished.is_set()]:
+            del jobs[stale_id]
+        job = jobs[job_id] = DownloadAllJob(job_id)
+
+    app = current_app._get_current_object()
+
+    def run():
+        with app.app_context():
+            job.run(files)
+
+    threading.Thread(target=run, name=f"download-all-{job_id}", daemon=True).start()
+    return job
@@ -0,0 +1,135 @@
+import json
+import os
+import shutil
+from collections import namedtuple
+from urllib.parse import urlparse
+
+import requests
+from flask import current_app
+
+from app.modules.dataset.ingestion import Ingestor, ingest_stream, save_record
+from core.caches.disk_cache import DiskLRUCache
+
+# Bytes read from the response per step
+CHUNK_SIZE = 64 * 1024
+
+FetchedFile = namedtuple("FetchedFile", ["content_type", "size", "from_cache"])
+
+
+class GitHubImportError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def raw_url_for(github_url):
+    """URL of the raw content behind a github.com file URL, None when it is not one."""
+    if "github.com" not in github_url:
+        return None
+    path = urlparse(github_url).path.replace("/blob/", "/", 1)
+    return current_app.config.get("GITHUB_RAW_URL", "https://raw.githubusercontent.com").rstrip("/") + path
+
+
+def get_github_cache() -> DiskLRUCache:
+    if "github_import_cache" not in current_app.extensions:
+        current_app.extensions["github_import_cache"] = DiskLRUCache(
+            current_app.config.get("GITHUB_CACHE_DIR", "cache/github"),
+            max_bytes=current_app.config.get("GITHUB_CACHE_MAX_BYTES", 256 * 1024 * 1024),
+        )
+    return current_app.extensions["github_import_cache"]
+
+
+def read_cached(cache, raw_url):
+    """(body path, validators) of a previous import of raw_url, or (None, None)."""
+    meta_path = cache.get((raw_url,), ".json")
+    body_path = cache.get((raw_url,), ".body")
+    if meta_path is None or body_path is None:
+        return None, None
+    try:
+        with open(meta_path) as f:
+            return body_path, json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None, None
+
+
+def fetch_raw_file(raw_url, file_path):
+    """Downloads raw_url into file_path in chunks, never holding more than a chunk in memory.
+
+    Bodies larger than GITHUB_IMPORT_MAX_BYTES are refused, whatever Content-Length says. Responses with an ETag or
+    Last-Modified are kept in a local cache, so importing the same URL again sends a conditional request and a 304
+    is served from the cache.
+    """
+    cache = get_github_cache()
+    cached_body, validators = read_cached(cache, raw_url)
+    if validators:
+        fetched = request_raw_file(raw_url, file_path, cache, cached_body, validators)
+        if fetched is not None:
+            return fetched
+    return request_raw_file(raw_url, file_path, cache)
+
+
+def request_raw_file(raw_url, file_path, cache, cached_body=None, validators=None):
+    """FetchedFile of one GET of raw_url, None when it was a 304 whose cached copy is no longer there."""
+    headers = {}
+    if validators:
+        if validators.get("etag"):
+            headers["If-None-Match"] = validators["etag"]
+        if validators.get("last_modified"):
+            headers["If-Modified-Since"] = validators["last_modified"]
+
+    timeout = current_app.config.get("GITHUB_IMPORT_TIMEOUT", 15)
+    with requests.get(raw_url, headers=headers, stream=True, timeout=timeout) as response:
+        if response.status_code == 304 and cached_body is not None:
+            try:
+                with open(cached_body, "rb") as source:
+                    ingested = ingest_stream(source, file_path)
+            except FileNotFoundError:
+                # Evicted by another import since it was looked up
+                return None
+            return FetchedFile(validators.get("content_type"), ingested.size, True)
+
+        response.raise_for_status()
+
+        max_bytes = current_app.config.get("GITHUB_IMPORT_MAX_BYTES", 100 * 1024 * 1024)
+        content_length = response.headers.get("Content-Length")
+        if content_length and content_length.isdigit() and int(content_length) > max_bytes:
+            raise GitHubImportError(f"The file is larger than {max_bytes} bytes", status=413)
+
+        ingestor = Ingestor(file_path)
+        try:
+            with open(file_path, "wb") as target:
+                for chunk in response.iter_content(CHUNK_SIZE):
+                    ingestor.update(chunk)
+                    if ingestor.size > max_bytes:
+                        raise GitHubImportError(f"The file is larger than {max_bytes} bytes", status=413)
+                    target.write(chunk)
+        except BaseException:
+            if os.path.exists(file_path):
+                os.remove(file_path)
+            raise
+        save_record(file_path, ingestor.result())
+
+        content_type = response.headers.get("Content-Type")
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+
+    if etag or last_modified:
+        validators = {"etag": etag, "last_modified": last_modified, "content_type": content_type}
+        cache_file(cache, raw_url, file_path, validators)
+    return FetchedFile(content_type, ingestor.size, False)
+
+
+def cache_file(cache, raw_url, file_path, validators):
+    """Keeps a copy of the imported file and its validators, a hard link when the cache is on the same filesystem."""
+    body_path = cache.temp_path()
+    try:
+        os.remove(body_path)
+        os.link(file_path, body_path)
+    except OSError:
+        shutil.copyfile(file_path, body_path)
+    cache.put((raw_url,), body_path, ".body")
+
+    meta_path = cache.temp_path()
+    with open(meta_path, "w") as f:
+        json.dump(validators, f)
+    cache.put((raw_url,), meta_path, ".json")
@@ -0,0 +1,120 @@
+import hashlib
+import json
+import os
+from collections import namedtuple
+
+# Bytes read or written per step while ingesting
+BUFFER_SIZE = 64 * 1024
+
+IngestedFile = namedtuple("IngestedFile", ["md5", "sha256", "size", "features"])
+
+
+class FeatureCounter:
+    """Counts UVL features line by line, like reading the file and counting the lines of the features block
+    indented by an odd number of tabs (four spaces count as one), up to its first blank line."""
+
+    def __init__(self):
+        self.features = 0
+        self._in_features = False
+        self._done = False
+        self._pending = b""
+
+    def update(self, data):
+        if self._done:
+            return
+        lines = (self._pending + data).split(b"\n")
+        self._pending = lines.pop()
+        for line in lines:
+            self._line(line)
+            if self._done:
+                return
+
+    def finish(self):
+        if self._pending and not self._done:
+            self._line(self._pending, last=True)
+        self._pending = b""
+        return self.features
+
+    def _line(self, line, last=False):
+        line = line.rstrip(b"\r").decode("utf-8", errors="replace")
+        if not self._in_features:
+            self._in_features = line == "features" and not last
+            return
+        if line == "" and not last:
+            # Breakpoint
+            self._done = True
+            return
+        line = line.replace(" " * 4, "\t")
+        n_tabs = len(line) - len(line.lstrip("\t"))
+        if n_tabs % 2 == 1:
+            self.features += 1
+
+
+class Ingestor:
+    """Computes size, MD5, SHA-256 and, for .uvl files, the feature count of the bytes fed to it."""
+
+    def __init__(self, filename):
+        self.size = 0
+        self.md5 = hashlib.md5()
+        self.sha256 = hashlib.sha256()
+        self.counter = FeatureCounter() if filename.endswith(".uvl") else None
+
+    def update(self, data):
+        self.size += len(data)
+        self.md5.update(data)
+        self.sha256.update(data)
+        if self.counter is not None:
+            self.counter.update(data)
+
+    def result(self):
+        features = self.counter.finish() if self.counter is not None else 0
+        return IngestedFile(self.md5.hexdigest(), self.sha256.hexdigest(), self.size, features)
+
+
+def get_record_path(file_path):
+    folder, filename = os.path.split(file_path)
+    return os.path.join(folder, ".ingested", f"{filename}.json")
+
+
+def save_record(file_path, ingested):
+    record_path = get_record_path(file_path)
+    os.makedirs(os.path.dirname(record_path), exist_ok=True)
+    stat = os.stat(file_path)
+    with open(record_path, "w") as f:
+        json.dump({"mtime_ns": stat.st_mtime_ns, **ingested._asdict()}, f)
+
+
+def discard_record(file_path):
+    record_path = get_record_path(file_path)
+    if os.path.exists(record_path):
+        os.remove(record_path)
+
+
+def ingest_stream(stream, file_path):
+    """Writes stream to file_path, computing its IngestedFile on the way, and keeps it next to the file."""
+    ingestor = Ingestor(file_path)
+    with open(file_path, "wb") as target:
+        for data in iter(lambda: stream.read(BUFFER_SIZE), b""):
+            ingestor.update(data)
+            target.write(data)
+    ingested = ingestor.result()
+    save_record(file_path, ingested)
+    return ingested
+
+
+def ingest_file(file_path):
+    """IngestedFile of a file on disk, from its record while the file is unchanged, otherwise in one pass."""
+    try:
+        with open(get_record_path(file_path)) as f:
+            record = json.load(f)
+        stat = os.stat(file_path)
+        if record.pop("mtime_ns") == stat.st_mtime_ns and record["size"] == stat.st_size:
+            return IngestedFile(**record)
+    except (FileNotFoundError, ValueError, KeyError, TypeError):
+        pass
+
+    ingestor = Ingestor(file_path)
+    with open(file_path, "rb") as source:
+        for data in iter(lambda: source.read(BUFFER_SIZE), b""):
+            ingestor.update(data)
+    return ingestor.result()
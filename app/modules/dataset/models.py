@@ -30,6 +30,10 @@ class PublicationType(Enum):
 
 
 class Author(db.Model):
+    __table_args__ = (
+        db.Index("ix_author_fulltext", "name", "affiliation", "orcid", mysql_prefix="FULLTEXT"),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(120), nullable=False)
     affiliation = db.Column(db.String(120))
@@ -41,6 +45,35 @@ class Author(db.Model):
         return {"name": self.name, "affiliation": self.affiliation, "orcid": self.orcid}
 
 
+ds_meta_data_tag = db.Table(
+    "ds_meta_data_tag",
+    db.metadata,
+    db.Column("ds_meta_data_id", db.Integer, db.ForeignKey("ds_meta_data.id"), primary_key=True),
+    db.Column("tag_id", db.Integer, db.ForeignKey("tag.id"), primary_key=True, index=True),
+)
+
+fm_meta_data_tag = db.Table(
+    "fm_meta_data_tag",
+    db.metadata,
+    db.Column("fm_meta_data_id", db.Integer, db.ForeignKey("fm_meta_data.id"), primary_key=True),
+    db.Column("tag_id", db.Integer, db.ForeignKey("tag.id"), primary_key=True, index=True),
+)
+
+
+class Tag(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(120), nullable=False, unique=True, index=True)
+
+    @staticmethod
+    def parse(tags: str) -> list[str]:
+        """Splits a comma separated tags string into unique, normalized tag names (keeping their order)."""
+        names = [name.strip().lower() for name in (tags or "").split(",")]
+        return list(dict.fromkeys(name for name in names if name))
+
+    def __repr__(self):
+        return f"Tag<{self.name}>"
+
+
 class DSMetrics(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     number_of_models = db.Column(db.Integer)
@@ -51,6 +84,10 @@ class DSMetrics(db.Model):
 
 
 class DSMetaData(db.Model):
+    __table_args__ = (
+        db.Index("ix_ds_meta_data_fulltext", "title", "description", "tags", mysql_prefix="FULLTEXT"),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     deposition_id = db.Column(db.Integer)
     title = db.Column(db.String(120), nullable=False)
@@ -62,6 +99,8 @@ class DSMetaData(db.Model):
     ds_metrics_id = db.Column(db.Integer, db.ForeignKey("ds_metrics.id"))
     ds_metrics = db.relationship("DSMetrics", uselist=False, backref="ds_meta_data", cascade="all, delete")
     authors = db.relationship("Author", backref="ds_meta_data", lazy=True, cascade="all, delete")
+    # Normalized copy of `tags`, kept in sync by TagService
+    tag_list = db.relationship("Tag", secondary=ds_meta_data_tag, order_by="Tag.name", lazy=True)
 
 
 class DataSet(db.Model):
@@ -71,6 +110,11 @@ class DataSet(db.Model):
     ds_meta_data_id = db.Column(db.Integer, db.ForeignKey("ds_meta_data.id"), nullable=False)
     created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
 
+    # Denormalized summary, kept in sync by DataSetService (see DataSetRepository.refresh_summaries)
+    total_size_bytes = db.Column(db.BigInteger, nullable=False, default=0, server_default="0", index=True)
+    files_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    feature_models_count = db.Column(db.Integer, nullable=False, default=0, server_default="0", index=True)
+
     ds_meta_data = db.relationship("DSMetaData", backref=db.backref("data_set", uselist=False))
     feature_models = db.relationship("FeatureModel", backref="data_set", lazy=True, cascade="all, delete")
 
@@ -84,8 +128,12 @@ class DataSet(db.Model):
         return [file for fm in self.feature_models for file in fm.files]
 
     def delete(self):
-        db.session.delete(self)
-        db.session.commit()
+        from app.modules.explore.repositories import ExploreRepository
+        from app.modules.hubfile.services import HubfileService
+
+        # Takes the dataset out of the search statistics, its index rows go with it
+        ExploreRepository().unindex_datasets([self.id], commit=False)
+        HubfileService().delete_with_files(self, self.files())
 
     def get_cleaned_publication_type(self):
         return self.ds_meta_data.publication_type.name.replace("_", " ").title()
@@ -94,20 +142,20 @@ class DataSet(db.Model):
         return f"https://zenodo.org/record/{self.ds_meta_data.deposition_id}" if self.ds_meta_data.dataset_doi else None
 
     def get_files_count(self):
-        return sum(len(fm.files) for fm in self.feature_models)
+        return self.files_count
 
     def get_file_total_size(self):
-        return sum(file.size for fm in self.feature_models for file in fm.files)
+        return self.total_size_bytes
 
     def get_file_total_size_for_human(self):
         from app.modules.dataset.services import SizeService
 
-        return SizeService().get_human_readable_size(self.get_file_total_size())
+        return SizeService.get_human_readable_size(self.get_file_total_size())
 
     def get_uvlhub_doi(self):
         from app.modules.dataset.services import DataSetService
 
-        return DataSetService().get_uvlhub_doi(self)
+        return DataSetService.get_uvlhub_doi(self)
 
     def to_dict(self):
         return {
@@ -120,7 +168,7 @@ class DataSet(db.Model):
             "publication_type": self.get_cleaned_publication_type(),
             "publication_doi": self.ds_meta_data.publication_doi,
             "dataset_doi": self.ds_meta_data.dataset_doi,
-            "tags": self.ds_meta_data.tags.split(",") if self.ds_meta_data.tags else [],
+            "tags": [tag.name for tag in self.ds_meta_data.tag_list],
             "url": self.get_uvlhub_doi(),
             "download": f'{request.host_url.rstrip("/")}/dataset/download/{self.id}',
             "zenodo": self.get_zenodo_url(),
@@ -3,7 +3,9 @@ import logging
 from flask_login import current_user
 from typing import Optional
 
-from sqlalchemy import desc, func
+from sqlalchemy import desc, func, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload, selectinload
 
 from app.modules.dataset.models import (
     Author,
@@ -14,10 +16,14 @@ from app.modules.dataset.models import (
     DSViewRecord,
     DataSet,
     Community,
+    Tag,
     community_members,
     community_owners,
     community_request,
+    ds_meta_data_tag,
 )
+from app.modules.featuremodel.models import FMMetaData, FeatureModel
+from app.modules.hubfile.models import Hubfile
 from core.repositories.BaseRepository import BaseRepository
 
 from app import db
@@ -26,6 +32,16 @@ from app.modules.auth.models import User
 logger = logging.getLogger(__name__)
 
 
+def dataset_serialization_options():
+    """Loader options covering every relationship touched by DataSet.to_dict() and the API serializer."""
+    return (
+        joinedload(DataSet.ds_meta_data).selectinload(DSMetaData.authors),
+        joinedload(DataSet.ds_meta_data).selectinload(DSMetaData.tag_list),
+        selectinload(DataSet.feature_models).selectinload(FeatureModel.files),
+        joinedload(DataSet.community),
+    )
+
+
 class AuthorRepository(BaseRepository):
     def __init__(self):
         super().__init__(Author)
@@ -122,9 +138,99 @@ class DataSetRepository(BaseRepository):
     def get_all(self) -> list[DataSet]:
         return self.model.query.all()
 
+    def refresh_summaries(self, dataset_ids: Optional[list[int]] = None, commit: bool = True) -> int:
+        files_count = (
+            select(func.count(Hubfile.id))
+            .join(FeatureModel, Hubfile.feature_model_id == FeatureModel.id)
+            .where(FeatureModel.data_set_id == DataSet.id)
+            .scalar_subquery()
+        )
+        total_size_bytes = (
+            select(func.coalesce(func.sum(Hubfile.size), 0))
+            .join(FeatureModel, Hubfile.feature_model_id == FeatureModel.id)
+            .where(FeatureModel.data_set_id == DataSet.id)
+            .scalar_subquery()
+        )
+        feature_models_count = (
+            select(func.count(FeatureModel.id)).where(FeatureModel.data_set_id == DataSet.id).scalar_subquery()
+        )
+
+        statement = update(DataSet).values(
+            total_size_bytes=total_size_bytes,
+            files_count=files_count,
+            feature_models_count=feature_models_count,
+        )
+        if dataset_ids is not None:
+            statement = statement.where(DataSet.id.in_(dataset_ids))
+
+        result = self.session.execute(statement)
+        if commit:
+            self.session.commit()
+        return result.rowcount
+
+    def get_for_serialization(self, dataset_ids: list[int]) -> list[DataSet]:
+        if not dataset_ids:
+            return []
+        datasets = (
+            self.model.query.options(*dataset_serialization_options())
+            .filter(self.model.id.in_(dataset_ids))
+            .all()
+        )
+        # Keep the order of the ids we were given (e.g. explore sorting)
+        by_id = {dataset.id: dataset for dataset in datasets}
+        return [by_id[id] for id in dataset_ids if id in by_id]
+
     def get_all_by_community(community_id):
         return DataSet.query.filter_by(community_id=community_id)
 
+    def get_ids_by_community(community_id):
+        return [
+            id for id, in DataSet.query.with_entities(DataSet.id)
+            .filter_by(community_id=community_id)
+            .order_by(DataSet.created_at.desc())
+        ]
+
+
+class TagRepository(BaseRepository):
+    def __init__(self):
+        super().__init__(Tag)
+
+    def get_or_create_many(self, names: list[str], retry: bool = True) -> list[Tag]:
+        """Tags with the given names, in order, creating the missing ones."""
+        if not names:
+            return []
+        query = self.model.query.filter(self.model.name.in_(names))
+        if not retry:
+            # A locking read sees the rows other workers committed after this transaction's snapshot
+            query = query.with_for_update(read=True)
+        existing = {tag.name: tag for tag in query}
+        missing = [name for name in names if name not in existing]
+        if missing:
+            try:
+                with self.session.begin_nested():
+                    for name in missing:
+                        existing[name] = self.create(commit=False, name=name)
+            except IntegrityError:
+                if not retry:
+                    raise
+                # Another worker created some of them first
+                return self.get_or_create_many(names, retry=False)
+        return [existing[name] for name in names]
+
+    def count_by_dataset(self) -> list[tuple[str, int]]:
+        return (
+            self.session.query(Tag.name, func.count(ds_meta_data_tag.c.ds_meta_data_id))
+            .join(ds_meta_data_tag, ds_meta_data_tag.c.tag_id == Tag.id)
+            .join(DSMetaData, DSMetaData.id == ds_meta_data_tag.c.ds_meta_data_id)
+            .filter(DSMetaData.dataset_doi.isnot(None))
+            .group_by(Tag.id, Tag.name)
+            .order_by(func.count(ds_meta_data_tag.c.ds_meta_data_id).desc(), Tag.name)
+            .all()
+        )
+
+    def get_all_metadata(self) -> list:
+        return DSMetaData.query.all() + FMMetaData.query.all()
+
 
 class DOIMappingRepository(BaseRepository):
     def __init__(self):
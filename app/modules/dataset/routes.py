@@ -2,19 +2,21 @@ import logging
 import os
 import json
 import shutil
-import tempfile
 import uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
-from zipfile import ZipFile
 import zipfile
 
 from flask import (
     Blueprint,
+    Response,
+    current_app,
     flash,
     redirect,
     render_template,
     request,
     jsonify,
+    send_file,
     send_from_directory,
     make_response,
     abort,
@@ -23,7 +25,12 @@ from flask import (
 from flask_login import login_required, current_user
 import requests
 
+from app.modules.dataset import download_all
+from app.modules.dataset.archives import get_dataset_archive, stream_dataset_archive
+from app.modules.dataset.chunked_upload import ChunkedUpload, ChunkedUploadError
 from app.modules.dataset.forms import DataSetForm
+from app.modules.dataset.github_import import GitHubImportError, fetch_raw_file, raw_url_for
+from app.modules.dataset.ingestion import discard_record, ingest_stream
 from app.modules.dataset.models import DSDownloadRecord
 from app.modules.dataset import dataset_bp
 from app.modules.dataset.services import (
@@ -35,11 +42,12 @@ from app.modules.dataset.services import (
     DOIMappingService,
     CommunityService,
 )
-from flamapy.metamodels.fm_metamodel.transformations import UVLReader, GlencoeWriter, SPLOTWriter
-from flamapy.metamodels.pysat_metamodel.transformations import FmToPysat, DimacsWriter
-from app.modules.hubfile.services import HubfileService
 from app.modules.zenodo.services import ZenodoService
 from app.modules.fakenodo.services import FakenodoService
+from app.modules.flamapy.validation import validate_uvl
+from core.archives.extract import ExtractionLimits, UnsafeArchiveError, extract_members, unique_name
+from core.archives.formats import ArchiveOptions
+from core.downloads.accel import accel_redirect
 
 logger = logging.getLogger(__name__)
 
@@ -165,7 +173,6 @@ def list_dataset():
 @login_required
 def upload():
     file = request.files["file"]
-    print(file.filename)
     temp_folder = current_user.temp_folder()
 
     if not file or not file.filename.endswith(".uvl"):
@@ -175,21 +182,12 @@ def upload():
     if not os.path.exists(temp_folder):
         os.makedirs(temp_folder)
 
-    file_path = os.path.join(temp_folder, file.filename)
-
-    if os.path.exists(file_path):
-        # Generate unique filename (by recursion)
-        base_name, extension = os.path.splitext(file.filename)
-        i = 1
-        while os.path.exists(os.path.join(temp_folder, f"{base_name} ({i}){extension}")):
-            i += 1
-        new_filename = f"{base_name} ({i}){extension}"
-        file_path = os.path.join(temp_folder, new_filename)
-    else:
-        new_filename = file.filename
+    # Generate unique filename from a single listing of the folder
+    new_filename = unique_name(set(os.listdir(temp_folder)), file.filename)
+    file_path = os.path.join(temp_folder, new_filename)
 
     try:
-        file.save(file_path)
+        ingest_stream(file.stream, file_path)
     except Exception as e:
         return jsonify({"message": str(e)}), 500
 
@@ -212,96 +210,87 @@ def upload_from_github():
         return jsonify({"error": "GitHub URL is required"}), 400
 
     # Cambiar la URL a la versión raw
-    if "github.com" in github_url:
-        raw_url = github_url.replace("github.com", "raw.githubusercontent.com").replace("/blob/", "/")
-    else:
+    raw_url = raw_url_for(github_url)
+    if raw_url is None:
         return jsonify({"error": "Invalid GitHub URL"}), 400
 
-    try:
-        # Descargar el archivo desde la URL raw
-        response = requests.get(raw_url, timeout=15)
-        response.raise_for_status()  # Si la respuesta es mala (404, 500), lanza una excepción
-
-        file_name = raw_url.split("/")[-1]
-        file_type = response.headers["Content-Type"]
-        file_size = response.headers["Content-Length"]
-
-        # Obtener la carpeta temporal específica para el usuario actual
-        temp_folder = current_user.temp_folder()
-
-        # Crear la carpeta si no existe
-        if not os.path.exists(temp_folder):
-            os.makedirs(temp_folder)
-
-        # Ruta completa para el archivo descargado
-        file_path = os.path.join(temp_folder, file_name)
-
-        # Si el archivo ya existe, generar un nuevo nombre único
-        if os.path.exists(file_path):
-            base_name, extension = os.path.splitext(file_name)
-            i = 1
-            while os.path.exists(os.path.join(temp_folder, f"{base_name} ({i}){extension}")):
-                i += 1
-            file_name = f"{base_name} ({i}){extension}"
-            file_path = os.path.join(temp_folder, file_name)
-
-        # Guardar el archivo descargado en la carpeta temporal
-        with open(file_path, "wb") as temp_file:
-            temp_file.write(response.content)
-
-        # Procesar si es un ZIP
-        if file_name.endswith(".zip"):
-            extracted_files = []
-            with zipfile.ZipFile(file_path, "r") as zip_ref:
-                for zip_info in zip_ref.infolist():
-                    if zip_info.filename.endswith(".uvl"):  # Excluir directorios
-                        extracted_filename = os.path.basename(zip_info.filename)
-                        extracted_path = os.path.join(temp_folder, extracted_filename)
-
-                        base_name, extension = os.path.splitext(extracted_filename)
-                        i = 1
-                        while os.path.exists(extracted_path):
-                            extracted_path = os.path.join(temp_folder, f"{base_name} ({i}){extension}")
-                            i += 1
-
-                        with zip_ref.open(zip_info) as source, open(extracted_path, "wb") as target:
-                            target.write(source.read())
-
-                        # Agregar el nombre del archivo extraído a la lista de archivos
-                        extracted_files.append(extracted_filename)
-
-            return jsonify(
-                {
-                    "message": "ZIP file uploaded and extracted successfully",
-                    "fileName": file_name,
-                    "fileType": file_type,
-                    "extracted_files": extracted_files,
-                    "fileSize": file_size,
-                }
-            )
-
-        # Si el archivo es un uvl o cualquier otro archivo que no sea zip
-        elif file_name.endswith(".uvl"):
-            uvl_file_path = os.path.join(temp_folder, file_name)
-            with open(uvl_file_path, "wb") as uvl_file:
-                uvl_file.write(response.content)
-
-            return jsonify(
-                {
-                    "message": "UVL file uploaded and validated successfully",
-                    "fileName": file_name,
-                    "filePath": uvl_file_path,  # Ruta del archivo UVL
-                    "fileSize": file_size,
-                }
-            )
+    file_name = raw_url.split("/")[-1]
+    if not file_name.endswith((".zip", ".uvl")):
+        return jsonify({"error": "Unsupported file type"}), 400
 
-        else:
-            return jsonify({"error": "Unsupported file type"}), 400
+    # Obtener la carpeta temporal específica para el usuario actual
+    temp_folder = current_user.temp_folder()
+    os.makedirs(temp_folder, exist_ok=True)
 
-    except requests.exceptions.RequestException as e:
-        return jsonify({"error": f"Error uploading file from GitHub: {str(e)}"}), 500
+    # Si el archivo ya existe, generar un nuevo nombre único
+    file_name = unique_name(set(os.listdir(temp_folder)), file_name)
+    file_path = os.path.join(temp_folder, file_name)
+
+    try:
+        # Descargar el archivo desde la URL raw, por trozos y con tamaño máximo
+        fetched = fetch_raw_file(raw_url, file_path)
+    except GitHubImportError as e:
+        return jsonify({"error": str(e)}), e.status
     except requests.exceptions.Timeout:
         return jsonify({"error": "The request to GitHub timed out"}), 408
+    except requests.exceptions.RequestException as e:
+        return jsonify({"error": f"Error uploading file from GitHub: {str(e)}"}), 500
+
+    # Procesar si es un ZIP
+    if file_name.endswith(".zip"):
+        try:
+            extracted_files, invalid_files = extract_uvl_files(file_path, temp_folder)
+        except (zipfile.BadZipFile, UnsafeArchiveError) as e:
+            return jsonify({"error": f"Invalid zip file: {e}"}), 400
+
+        return jsonify(
+            {
+                "message": "ZIP file uploaded and extracted successfully",
+                "fileName": file_name,
+                "fileType": fetched.content_type,
+                "extracted_files": extracted_files,
+                "invalid_files": invalid_files,
+                "fileSize": fetched.size,
+            }
+        )
+
+    return jsonify(
+        {
+            "message": "UVL file uploaded and validated successfully",
+            "fileName": file_name,
+            "filePath": file_path,  # Ruta del archivo UVL
+            "fileSize": fetched.size,
+        }
+    )
+
+
+def extract_uvl_files(file_path, temp_folder):
+    """Extracts the .uvl members of the zip at file_path into temp_folder.
+
+    Returns their names in temp_folder and the syntax errors of the invalid ones. Each file is validated in a
+    thread pool as soon as it is extracted, while the next one is being written.
+    """
+    limits = ExtractionLimits.from_config(current_app.config)
+    validations = {}
+    with ThreadPoolExecutor(max_workers=current_app.config.get("UVL_VALIDATION_WORKERS", 4)) as executor:
+        extracted_files = extract_members(
+            file_path,
+            temp_folder,
+            select=lambda info: info.filename.endswith(".uvl"),
+            limits=limits,
+            write=ingest_stream,
+            on_extracted=lambda name, path: validations.setdefault(name, executor.submit(validate_uvl, path)),
+        )
+
+    invalid_files = {}
+    for name, validation in validations.items():
+        try:
+            errors = validation.result()
+        except Exception as e:
+            errors = [str(e)]
+        if errors:
+            invalid_files[name] = errors
+    return extracted_files, invalid_files
 
 
 @dataset_bp.route("/dataset/file/upload/zip", methods=["GET", "POST"])
@@ -316,18 +305,9 @@ def upload_from_zip():
     if not os.path.exists(temp_folder):
         os.makedirs(temp_folder)
 
-    file_path = os.path.join(temp_folder, file.filename)
-
-    # Manejar conflictos de nombre de archivo
-    if os.path.exists(file_path):
-        base_name, extension = os.path.splitext(file.filename)
-        i = 1
-        while os.path.exists(os.path.join(temp_folder, f"{base_name} ({i}){extension}")):
-            i += 1
-        new_filename = f"{base_name} ({i}){extension}"
-        file_path = os.path.join(temp_folder, new_filename)
-    else:
-        new_filename = file.filename
+    # Manejar conflictos de nombre de archivo con un único listado de la carpeta
+    new_filename = unique_name(set(os.listdir(temp_folder)), file.filename)
+    file_path = os.path.join(temp_folder, new_filename)
 
     try:
         file.save(file_path)
@@ -335,30 +315,103 @@ def upload_from_zip():
         return jsonify({"message": str(e)}), 500
 
     # Extraer archivos .uvl del zip
-    extracted_files = []
     try:
-        with ZipFile(file_path, "r") as zip_ref:
-            for zip_info in zip_ref.infolist():
-                if zip_info.filename.endswith(".uvl"):
-                    extracted_filename = os.path.basename(zip_info.filename)
-                    extracted_path = os.path.join(temp_folder, extracted_filename)
-
-                    # Si el archivo ya existe, generar un nombre único
-                    base_name, extension = os.path.splitext(extracted_filename)
-                    i = 1
-                    while os.path.exists(extracted_path):
-                        extracted_path = os.path.join(temp_folder, f"{base_name} ({i}){extension}")
-                        i += 1
-
-                    # Extraer el archivo y guardarlo en temp_folder
-                    with zip_ref.open(zip_info) as source, open(extracted_path, "wb") as target:
-                        target.write(source.read())
-
-                    # Agregar el nombre del archivo extraído a la lista de archivos
-                    extracted_files.append(extracted_filename)
+        extracted_files, invalid_files = extract_uvl_files(file_path, temp_folder)
+    except zipfile.BadZipFile:
+        return jsonify({"message": "Invalid zip file"}), 400
+    except UnsafeArchiveError as e:
+        return jsonify({"message": str(e)}), 400
+    except Exception as e:
+        return jsonify({"message": str(e)}), 500
+
+    if not extracted_files:
+        return jsonify({"message": "No .uvl files found in the zip"}), 400
+
+    return (
+        jsonify(
+            {
+                "message": "Zip uploaded and .uvl files extracted successfully",
+                "extracted_files": extracted_files,
+                "invalid_files": invalid_files,
+            }
+        ),
+        200,
+    )
+
+
+@dataset_bp.route("/dataset/file/upload/chunked", methods=["POST"])
+@login_required
+def start_chunked_upload():
+    data = request.get_json(silent=True) or {}
+    try:
+        upload = ChunkedUpload.create(
+            current_user.temp_folder(), data.get("filename"), data.get("size"), data.get("sha256")
+        )
+    except ChunkedUploadError as e:
+        return chunked_upload_error(e)
+    return jsonify(upload.to_dict()), 201
+
+
+@dataset_bp.route("/dataset/file/upload/chunked/<string:upload_id>", methods=["GET"])
+@login_required
+def chunked_upload_status(upload_id):
+    upload = ChunkedUpload.get(current_user.temp_folder(), upload_id)
+    if upload is None:
+        return jsonify({"message": "Upload not found"}), 404
+    return jsonify(upload.to_dict())
 
+
+@dataset_bp.route("/dataset/file/upload/chunked/<string:upload_id>", methods=["PUT"])
+@login_required
+def upload_chunk(upload_id):
+    upload = ChunkedUpload.get(current_user.temp_folder(), upload_id)
+    if upload is None:
+        return jsonify({"message": "Upload not found"}), 404
+
+    offset = request.args.get("offset", request.headers.get("Upload-Offset"), type=int)
+    if offset is None:
+        return jsonify({"message": "offset is required"}), 400
+
+    # The body is copied to disk as it arrives, it is never held in memory or parsed as a form
+    try:
+        offset = upload.write_chunk(offset, request.stream)
+    except ChunkedUploadError as e:
+        return chunked_upload_error(e)
+    return jsonify({"upload_id": upload.id, "offset": offset, "size": upload.size})
+
+
+@dataset_bp.route("/dataset/file/upload/chunked/<string:upload_id>", methods=["DELETE"])
+@login_required
+def cancel_chunked_upload(upload_id):
+    upload = ChunkedUpload.get(current_user.temp_folder(), upload_id)
+    if upload is None:
+        return jsonify({"message": "Upload not found"}), 404
+    upload.discard()
+    return jsonify({"message": "Upload cancelled"})
+
+
+@dataset_bp.route("/dataset/file/upload/chunked/<string:upload_id>/finalize", methods=["POST"])
+@login_required
+def finalize_chunked_upload(upload_id):
+    temp_folder = current_user.temp_folder()
+    upload = ChunkedUpload.get(temp_folder, upload_id)
+    if upload is None:
+        return jsonify({"message": "Upload not found"}), 404
+
+    try:
+        filename = upload.finalize()
+    except ChunkedUploadError as e:
+        return chunked_upload_error(e)
+
+    if filename.endswith(".uvl"):
+        return jsonify({"message": "UVL uploaded and validated successfully", "filename": filename}), 200
+
+    try:
+        extracted_files, invalid_files = extract_uvl_files(os.path.join(temp_folder, filename), temp_folder)
     except zipfile.BadZipFile:
         return jsonify({"message": "Invalid zip file"}), 400
+    except UnsafeArchiveError as e:
+        return jsonify({"message": str(e)}), 400
     except Exception as e:
         return jsonify({"message": str(e)}), 500
 
@@ -369,13 +422,22 @@ def upload_from_zip():
         jsonify(
             {
                 "message": "Zip uploaded and .uvl files extracted successfully",
+                "filename": filename,
                 "extracted_files": extracted_files,
+                "invalid_files": invalid_files,
             }
         ),
         200,
     )
 
 
+def chunked_upload_error(e):
+    data = {"message": str(e)}
+    if e.offset is not None:
+        data["offset"] = e.offset
+    return jsonify(data), e.status
+
+
 @dataset_bp.route("/dataset/upload/zip", methods=["POST", "GET"])
 @login_required
 def create_from_zip():
@@ -511,6 +573,7 @@ def delete():
 
     if os.path.exists(filepath):
         os.remove(filepath)
+        discard_record(filepath)
         return jsonify({"message": "File deleted successfully"})
 
     return jsonify({"error": "Error: File not found"})
@@ -520,43 +583,38 @@ def delete():
 def download_dataset(dataset_id):
     dataset = dataset_service.get_or_404(dataset_id)
 
-    file_path = f"uploads/user_{dataset.user_id}/dataset_{dataset.id}/"
-
-    temp_dir = tempfile.mkdtemp()
-    zip_path = os.path.join(temp_dir, f"dataset_{dataset_id}.zip")
-
-    with ZipFile(zip_path, "w") as zipf:
-        for subdir, dirs, files in os.walk(file_path):
-            for file in files:
-                full_path = os.path.join(subdir, file)
-
-                relative_path = os.path.relpath(full_path, file_path)
-
-                zipf.write(
-                    full_path,
-                    arcname=os.path.join(os.path.basename(zip_path[:-4]), relative_path),
-                )
+    try:
+        options = ArchiveOptions.parse(request.args)
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+
+    # The archive is kept on disk, so interrupted downloads can be resumed with byte ranges (If-Range validated).
+    # The first request for it gets it streamed while it is stored, without a validator, unless it asks for a range
+    archive_path, etag = get_dataset_archive(dataset, options, build="Range" in request.headers)
+    download_name = f"dataset_{dataset_id}{options.extension}"
+    if archive_path is None:
+        resp = Response(
+            stream_dataset_archive(dataset, options, etag),
+            mimetype=options.mimetype,
+            headers={"Content-Disposition": f"attachment; filename={download_name}"},
+        )
+    else:
+        resp = accel_redirect(archive_path, download_name=download_name, mimetype=options.mimetype) or send_file(
+            archive_path,
+            mimetype=options.mimetype,
+            as_attachment=True,
+            download_name=download_name,
+            etag=etag,
+            conditional=True,
+        )
+        # Werkzeug only advertises ranges on partial responses
+        resp.headers.setdefault("Accept-Ranges", "bytes")
 
     user_cookie = request.cookies.get("download_cookie")
     if not user_cookie:
         user_cookie = str(uuid.uuid4())  # Generate a new unique identifier if it does not exist
         # Save the cookie to the user's browser
-        resp = make_response(
-            send_from_directory(
-                temp_dir,
-                f"dataset_{dataset_id}.zip",
-                as_attachment=True,
-                mimetype="application/zip",
-            )
-        )
         resp.set_cookie("download_cookie", user_cookie)
-    else:
-        resp = send_from_directory(
-            temp_dir,
-            f"dataset_{dataset_id}.zip",
-            as_attachment=True,
-            mimetype="application/zip",
-        )
 
     # Check if the download record already exists for this cookie
     existing_record = DSDownloadRecord.query.filter_by(
@@ -577,101 +635,34 @@ def download_dataset(dataset_id):
     return resp
 
 
-@dataset_bp.route("/dataset/download/all", methods=["GET"])
-def download_all_dataset():
+def download_all_job_to_dict(job):
+    data = job.to_dict()
+    data["status_url"] = url_for("dataset.download_all_dataset_status", job_id=job.id)
+    if job.status == download_all.DONE:
+        data["download_url"] = url_for("dataset.download_all_dataset_file", job_id=job.id)
+    return data
+
+
+def send_all_datasets(job):
     # Obtener la cookie de descarga
     user_cookie = request.cookies.get("download_cookie")
     if not user_cookie:
         user_cookie = str(uuid.uuid4())
 
-    temp_dir = tempfile.mkdtemp()
-    zip_path = os.path.join(temp_dir, "all_datasets.zip")
-
-    files_added = False
-
-    # Crear un archivo ZIP donde se guardarán todos los archivos convertidos
-    with ZipFile(zip_path, "w") as zipf:
-        datasets = dataset_service.get_all()
-
-        for dataset in datasets:
-            file_path = f"uploads/user_{dataset.user_id}/dataset_{dataset.id}/"
-
-            # Verificar que el directorio del dataset existe
-            if os.path.exists(file_path):
-                # Crear una carpeta para el dataset dentro del ZIP (usando el ID o nombre del dataset)
-                dataset_folder = f"dataset_{dataset.id}/"
-
-                # Iterar sobre todos los archivos del dataset usando dataset.files()
-                for file in dataset.files():
-                    full_path = os.path.join(file_path, file.name)
-
-                    # Verificar que el archivo existe
-                    if not os.path.exists(full_path):
-                        print(f"Archivo no encontrado: {full_path}")
-                        continue  # Si el archivo no existe, continuar con el siguiente archivo
-
-                    # Obtener el Hubfile correspondiente a este archivo
-                    try:
-                        hubfile = HubfileService().get_or_404(file.id)
-                        if not hubfile:
-                            print(f"No se encontró el Hubfile para el archivo {file.name}")
-                            continue
-                    except Exception as e:
-                        print(f"Error al obtener Hubfile para {file.name}: {str(e)}")
-                        continue
-
-                    # Convertir cada archivo a los formatos deseados y agregarlo al ZIP
-                    for format in ["glencoe", "dimacs", "splot", "uvl"]:
-                        content = ""
-                        name = f"{hubfile.name}_{format}.txt"
-                        # Realizar la conversión según el formato
-                        try:
-                            if format == "glencoe":
-                                temp_file = tempfile.NamedTemporaryFile(suffix=".json", delete=False)
-                                fm = UVLReader(hubfile.get_path()).transform()
-                                GlencoeWriter(temp_file.name, fm).transform()
-                                with open(temp_file.name, "r") as new_format_file:
-                                    content = new_format_file.read()
-                                name = f"{hubfile.name}_glencoe.txt"
-                            elif format == "dimacs":
-                                temp_file = tempfile.NamedTemporaryFile(suffix=".cnf", delete=False)
-                                fm = UVLReader(hubfile.get_path()).transform()
-                                sat = FmToPysat(fm).transform()
-                                DimacsWriter(temp_file.name, sat).transform()
-                                with open(temp_file.name, "r") as new_format_file:
-                                    content = new_format_file.read()
-                                name = f"{hubfile.name}_cnf.txt"
-                            elif format == "splot":
-                                temp_file = tempfile.NamedTemporaryFile(suffix=".splx", delete=False)
-                                fm = UVLReader(hubfile.get_path()).transform()
-                                SPLOTWriter(temp_file.name, fm).transform()
-                                with open(temp_file.name, "r") as new_format_file:
-                                    content = new_format_file.read()
-                                name = f"{hubfile.name}_splot.txt"
-                            elif format == "uvl":
-                                # Para UVL no hacemos transformación adicional, solo agregamos el archivo original
-                                content = open(full_path, "r").read()
-                                name = f"{file.name}.txt"
-
-                            # Agregar el archivo convertido al ZIP en la carpeta correspondiente al dataset
-                            zipf.writestr(os.path.join(dataset_folder, name), content)
-                            files_added = True  # Se agregaron archivos al ZIP
-
-                        except Exception as e:
-                            print(f"Error al procesar el archivo {file.name} en formato {format}: {str(e)}")
-                            continue
-
-            else:
-                print(f"Archivo no encontrado para el dataset {dataset.id}")
-
-    # Si no se agregaron archivos al ZIP, devolvemos un mensaje de error, pero no un JSON.
-    if not files_added:
-        return make_response(jsonify({"error": "No se encontraron archivos disponibles para descargar"}), 404)
-
     # Responder con el archivo ZIP
-    resp = make_response(
-        send_from_directory(temp_dir, "all_datasets.zip", as_attachment=True, mimetype="application/zip")
+    download_name = f"all_datasets{job.options.extension}"
+    resp = accel_redirect(job.path, download_name=download_name, mimetype=job.options.mimetype) or make_response(
+        send_from_directory(
+            os.path.abspath(os.path.dirname(job.path)),
+            os.path.basename(job.path),
+            as_attachment=True,
+            download_name=download_name,
+            mimetype=job.options.mimetype,
+            # The job id fingerprints every file checksum, so it is a strong validator for resumed downloads
+            etag=job.id,
+        )
     )
+    resp.headers.setdefault("Accept-Ranges", "bytes")
 
     # Establecer la cookie "download_cookie" para que no se genere nuevamente
     resp.set_cookie("download_cookie", user_cookie)
@@ -692,6 +683,48 @@ def download_all_dataset():
     return resp
 
 
+@dataset_bp.route("/dataset/download/all", methods=["POST"])
+def start_download_all_dataset():
+    try:
+        options = ArchiveOptions.parse(request.values)
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+
+    # El ZIP se construye en segundo plano, las peticiones simultáneas se unen al mismo trabajo
+    job = download_all.start_job(options)
+    return jsonify(download_all_job_to_dict(job)), 202
+
+
+@dataset_bp.route("/dataset/download/all/<string:job_id>", methods=["GET"])
+def download_all_dataset_status(job_id):
+    job = download_all.get_job(job_id)
+    if job is None:
+        return jsonify({"message": "Download job not found"}), 404
+    return jsonify(download_all_job_to_dict(job))
+
+
+@dataset_bp.route("/dataset/download/all/<string:job_id>/file", methods=["GET"])
+def download_all_dataset_file(job_id):
+    job = download_all.get_job(job_id)
+    if job is None or job.status != download_all.DONE:
+        return jsonify({"message": "Download job not found or not finished"}), 404
+    return send_all_datasets(job)
+
+
+@dataset_bp.route("/dataset/download/all", methods=["GET"])
+def download_all_dataset():
+    try:
+        options = ArchiveOptions.parse(request.args)
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+
+    # Nunca bloquea al worker: si el ZIP ya está en disco se redirige a él, si no se arranca (o se une) al trabajo
+    job = download_all.start_job(options)
+    if job.status == download_all.DONE:
+        return redirect(url_for("dataset.download_all_dataset_file", job_id=job.id))
+    return jsonify(download_all_job_to_dict(job)), 202
+
+
 @dataset_bp.route("/doi/<path:doi>/", methods=["GET"])
 def subdomain_index(doi):
 
@@ -771,7 +804,7 @@ def view_community(community_id):
     owners = [owner.profile.name for owner in community.owners.all()]
     members = [member.profile.name for member in community.members.all()]
     requests = community.requests.all()
-    datasets = DataSetService.get_all_by_community(community_id=community_id)
+    datasets = dataset_service.serialize_many(DataSetService.get_ids_by_community(community_id=community_id))
 
     return render_template(
         "community/view_community.html",
@@ -5,6 +5,9 @@ from app.modules.featuremodel.models import FMMetaData, FeatureModel
 from app.modules.hubfile.models import Hubfile
 from core.seeders.BaseSeeder import BaseSeeder
 from app.modules.dataset.models import DataSet, DSMetaData, PublicationType, DSMetrics, Author, Community
+from app.modules.dataset.repositories import DataSetRepository
+from app.modules.dataset.services import TagService
+from app.modules.explore.repositories import ExploreRepository
 from datetime import datetime
 from dotenv import load_dotenv
 from app import db
@@ -147,6 +150,15 @@ class DataSetSeeder(BaseSeeder):
             )
             self.seed([uvl_file])
 
+        DataSetRepository().refresh_summaries([dataset.id for dataset in seeded_datasets])
+
+        tag_service = TagService()
+        for metadata in seeded_ds_meta_data + seeded_fm_meta_data:
+            tag_service.sync(metadata)
+        db.session.commit()
+
+        ExploreRepository().index_datasets([dataset.id for dataset in seeded_datasets])
+
 
 class CommunitySeeder(BaseSeeder):
 
@@ -1,14 +1,13 @@
 import logging
 import os
-import hashlib
-import shutil
 from typing import Optional
 import uuid
 
 from flask import abort, request
 
 from app.modules.auth.services import AuthenticationService
-from app.modules.dataset.models import DSViewRecord, DataSet, DSMetaData
+from app.modules.dataset.ingestion import ingest_file
+from app.modules.dataset.models import DSViewRecord, DataSet, DSMetaData, Tag
 from app.modules.dataset.repositories import (
     AuthorRepository,
     DOIMappingRepository,
@@ -17,7 +16,14 @@ from app.modules.dataset.repositories import (
     DSMetricsRepository,
     DSViewRecordRepository,
     DataSetRepository,
-    CommunityRepository
+    CommunityRepository,
+    TagRepository
+)
+from app.modules.explore.services import (
+    ExploreService,
+    add_to_suggestion_index,
+    invalidate_explore_cache,
+    invalidate_suggestion_index
 )
 from app.modules.featuremodel.repositories import FMMetaDataRepository, FeatureModelRepository
 from app.modules.hubfile.repositories import (
@@ -30,31 +36,6 @@ from core.services.BaseService import BaseService
 logger = logging.getLogger(__name__)
 
 
-def calculate_checksum_and_size(file_path):
-    file_size = os.path.getsize(file_path)
-    with open(file_path, "rb") as file:
-        content = file.read()
-        hash_md5 = hashlib.md5(content).hexdigest()
-        return hash_md5, file_size
-
-
-def calculate_features(file_path):
-    with open(file_path, 'r') as file:
-        # Counts features by counting the number of lines with an odd number of lines at the start
-        odd_tabs_lines = 0
-        while file.readline() != 'features\n':
-            pass
-        for line in file.readlines():
-            if line == '\n':
-                # Breakpoint
-                return odd_tabs_lines
-            line = line.replace(' '*4, '\t')
-            n_tabs = len(line) - len(line.lstrip('\t'))
-            if (n_tabs % 2 == 1):
-                odd_tabs_lines += 1
-    return odd_tabs_lines
-
-
 class DataSetService(BaseService):
     def __init__(self):
         super().__init__(DataSetRepository())
@@ -68,19 +49,20 @@ class DataSetService(BaseService):
         self.hubfilerepository = HubfileRepository()
         self.dsviewrecord_repostory = DSViewRecordRepository()
         self.hubfileviewrecord_repository = HubfileViewRecordRepository()
+        self.tag_service = TagService()
 
     def move_feature_models(self, dataset: DataSet):
+        from app.modules.hubfile.services import HubfileService
+
         current_user = AuthenticationService().get_authenticated_user()
         source_dir = current_user.temp_folder()
 
-        working_dir = os.getenv("WORKING_DIR", "")
-        dest_dir = os.path.join(working_dir, "uploads", f"user_{current_user.id}", f"dataset_{dataset.id}")
-
-        os.makedirs(dest_dir, exist_ok=True)
-
+        # Files go to the blob store, so a model already uploaded in another dataset is not stored again
+        hubfile_service = HubfileService()
         for feature_model in dataset.feature_models:
             uvl_filename = feature_model.fm_meta_data.uvl_filename
-            shutil.move(os.path.join(source_dir, uvl_filename), dest_dir)
+            for hubfile in feature_model.files:
+                hubfile_service.store_file(hubfile, os.path.join(source_dir, uvl_filename))
 
     def get_synchronized(self, current_user_id: int) -> DataSet:
         return self.repository.get_synchronized(current_user_id)
@@ -118,6 +100,29 @@ class DataSetService(BaseService):
     def get_all_by_community(community_id):
         return DataSetRepository.get_all_by_community(community_id=community_id)
 
+    def get_ids_by_community(community_id):
+        return DataSetRepository.get_ids_by_community(community_id=community_id)
+
+    def refresh_summaries(self, dataset_ids: Optional[list[int]] = None) -> int:
+        updated = self.repository.refresh_summaries(dataset_ids)
+        invalidate_explore_cache()
+        return updated
+
+    def serialize_many(self, dataset_ids: list[int]) -> list[dict]:
+        # Relationships are eager loaded in bulk, so to_dict() does not hit the database per dataset
+        return [dataset.to_dict() for dataset in self.repository.get_for_serialization(dataset_ids)]
+
+    def serialize_stream(self, dataset_ids, batch_size: int = 100):
+        """Lazily serializes an iterable of ids, hydrating them batch_size at a time."""
+        batch = []
+        for dataset_id in dataset_ids:
+            batch.append(dataset_id)
+            if len(batch) == batch_size:
+                yield from self.serialize_many(batch)
+                batch = []
+        if batch:
+            yield from self.serialize_many(batch)
+
     def create_from_form(self, form, current_user) -> DataSet:
         main_author = {
             "name": f"{current_user.profile.surname}, {current_user.profile.name}",
@@ -132,6 +137,7 @@ class DataSetService(BaseService):
             dsmetadata_data = form.get_dsmetadata()
             dsmetadata_data.pop('community_id', None)
             dsmetadata = self.dsmetadata_repository.create(**dsmetadata_data)
+            self.tag_service.sync(dsmetadata)
 
             # Añadir el autor principal y otros autores
             for author_data in [main_author] + form.get_authors():
@@ -153,12 +159,14 @@ class DataSetService(BaseService):
             # Procesar cada modelo de características
             number_of_models = 0
             number_of_features = 0
+            total_size_bytes = 0
             for feature_model in form.feature_models:
                 # Crear metadata del modelo de características
                 fmmetadata = self.fmmetadata_repository.create(
                     commit=False,
                     **feature_model.get_fmmetadata()
                 )
+                self.tag_service.sync(fmmetadata)
 
                 # Agregar autores al modelo de características
                 for author_data in feature_model.get_authors():
@@ -180,25 +188,33 @@ class DataSetService(BaseService):
                 uvl_filename = feature_model.uvl_filename.data
                 file_path = os.path.join(current_user.temp_folder(), uvl_filename)
 
-                # Calcular el checksum y tamaño del archivo
-                checksum, size = calculate_checksum_and_size(file_path)
-                number_of_features += calculate_features(file_path)
+                # Checksums, size and features were computed while the upload was written
+                ingested = ingest_file(file_path)
+                size = ingested.size
+                number_of_features += ingested.features
 
                 # Crear el archivo en el repositorio
                 file = self.hubfilerepository.create(
                     commit=False,
                     name=uvl_filename,
-                    checksum=checksum,
+                    checksum=ingested.md5,
+                    sha256=ingested.sha256,
                     size=size,
                     feature_model_id=fm.id
                 )
                 fm.files.append(file)
                 number_of_models += 1
+                total_size_bytes += size
 
             dsmetrics = self.dsmetrics_repository.create(number_of_models=number_of_models,
                                                          number_of_features=number_of_features)
             dsmetadata.ds_metrics_id = dsmetrics.id
 
+            # Each feature model carries exactly one file
+            dataset.total_size_bytes = total_size_bytes
+            dataset.files_count = number_of_models
+            dataset.feature_models_count = number_of_models
+
             # Confirmar todos los cambios realizados
             self.repository.session.commit()
 
@@ -207,12 +223,38 @@ class DataSetService(BaseService):
             self.repository.session.rollback()
             raise exc
 
+        self.index_for_search([dataset.id])
         return dataset
 
+    def index_for_search(self, dataset_ids):
+        """Updates the relevance index of datasets that are already saved, a failure is logged instead of raised.
+
+        Until they are indexed (`rosemary db:backfill search` does it for all) they rank last when sorting by
+        relevance, but every other explore query still finds them.
+        """
+        try:
+            ExploreService().index_datasets(dataset_ids)
+        except Exception as exc:
+            logger.error(f"Exception indexing datasets {dataset_ids} for search: {exc}", exc_info=True)
+            self.repository.session.rollback()
+
     def update_dsmetadata(self, id, **kwargs):
-        return self.dsmetadata_repository.update(id, **kwargs)
+        dsmetadata = self.dsmetadata_repository.update(id, **kwargs)
+        if dsmetadata and "tags" in kwargs:
+            self.tag_service.sync(dsmetadata)
+            self.repository.session.commit()
+        # Publishing sets dataset_doi, which makes the dataset show up in explore
+        invalidate_explore_cache()
+        if dsmetadata and kwargs.get("dataset_doi"):
+            add_to_suggestion_index(dsmetadata.id)
+        elif "title" in kwargs or "tags" in kwargs:
+            invalidate_suggestion_index()
+        if dsmetadata and dsmetadata.data_set and {"title", "description", "tags"} & kwargs.keys():
+            self.index_for_search([dsmetadata.data_set.id])
+        return dsmetadata
 
-    def get_uvlhub_doi(self, dataset: DataSet) -> str:
+    @staticmethod
+    def get_uvlhub_doi(dataset: DataSet) -> str:
         domain = os.getenv('DOMAIN', 'localhost')
         return f'http://{domain}/doi/{dataset.ds_meta_data.dataset_doi}'
 
@@ -222,6 +264,27 @@ class AuthorService(BaseService):
         super().__init__(AuthorRepository())
 
 
+class TagService(BaseService):
+    def __init__(self):
+        super().__init__(TagRepository())
+
+    def sync(self, metadata):
+        """Mirrors the comma separated `tags` string of a DSMetaData/FMMetaData into its tag_list."""
+        metadata.tag_list = self.repository.get_or_create_many(Tag.parse(metadata.tags))
+
+    def backfill(self) -> int:
+        metadata_list = self.repository.get_all_metadata()
+        for metadata in metadata_list:
+            self.sync(metadata)
+        self.repository.session.commit()
+        invalidate_explore_cache()
+        invalidate_suggestion_index()
+        return len(metadata_list)
+
+    def count_by_dataset(self) -> list[dict]:
+        return [{"name": name, "count": count} for name, count in self.repository.count_by_dataset()]
+
+
 class DSDownloadRecordService(BaseService):
     def __init__(self):
         super().__init__(DSDownloadRecordRepository())
@@ -232,7 +295,9 @@ class DSMetaDataService(BaseService):
         super().__init__(DSMetaDataRepository())
 
     def update(self, id, **kwargs):
-        return self.repository.update(id, **kwargs)
+        dsmetadata = self.repository.update(id, **kwargs)
+        invalidate_explore_cache()
+        return dsmetadata
 
     def filter_by_doi(self, doi: str) -> Optional[DSMetaData]:
         return self.repository.filter_by_doi(doi)
@@ -279,7 +344,8 @@ class SizeService():
     def __init__(self):
         pass
 
-    def get_human_readable_size(self, size: int) -> str:
+    @staticmethod
+    def get_human_readable_size(size: int) -> str:
         if size < 1024:
             return f'{size} bytes'
         elif size < 1024 ** 2:
@@ -107,6 +107,10 @@ class DatsetDownloadAllBehavior(TaskSet):
             # Verificación del contenido del archivo ZIP
             self.verify_zip_content(zip_filename)
 
+        elif response.status_code == 202:
+            # El ZIP se está construyendo en segundo plano
+            print(f"Descarga en preparación: {response.json()['status_url']}")
+
         else:
             print(f"Error al descargar el archivo: {response.status_code}")
 
@@ -1,3 +1,8 @@
+import hashlib
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import os
+import shutil
 import pytest
 from flask import url_for
 from app import create_app, db
@@ -10,6 +15,8 @@ from io import BytesIO
 from zipfile import ZipFile
 from unittest.mock import patch
 from app.modules.dataset.forms import DataSetForm
+from app.modules.dataset import github_import
+from app.modules.dataset.ingestion import FeatureCounter, ingest_file, ingest_stream
 from app.modules.dataset.models import Author, DSMetaData, DSMetrics, DataSet
 from app.modules.featuremodel.models import FMMetaData, FeatureModel
 from app.modules.hubfile.models import Hubfile
@@ -541,6 +548,137 @@ def test_leave_community_not_a_member(client, app, setup_data):
         assert not CommunityService.is_member(community, user)
 
 
+def test_download_dataset_streams_zip(client, app, setup_data):
+    dsmetadata = DSMetaData(id=444, title="Download me", description="Streamed", publication_type="NONE")
+    dataset = DataSet(id=444, user_id=111, ds_meta_data_id=444)
+    db.session.add_all([dsmetadata, dataset])
+    db.session.commit()
+
+    shutil.rmtree(app.config["DATASET_ARCHIVES_DIR"], ignore_errors=True)
+    folder = os.path.join("uploads", "user_111", "dataset_444")
+    os.makedirs(os.path.join(folder, "nested"), exist_ok=True)
+    contents = {"model.uvl": b"features\n    Root\n", os.path.join("nested", "other.uvl"): b"x" * 200_000}
+    for name, data in contents.items():
+        with open(os.path.join(folder, name), "wb") as f:
+            f.write(data)
+
+    try:
+        response = client.get("/dataset/download/444")
+        assert response.status_code == 200
+        assert response.mimetype == "application/zip"
+        assert response.is_streamed
+        assert "dataset_444.zip" in response.headers["Content-Disposition"]
+
+        with ZipFile(BytesIO(response.data)) as zipf:
+            assert zipf.testzip() is None
+            for name, data in contents.items():
+                member = zipf.getinfo(os.path.join("dataset_444", name))
+                # Written to an unseekable stream: sizes and CRC come in a data descriptor
+                assert member.flag_bits & 0x08
+                assert zipf.read(member) == data
+    finally:
+        shutil.rmtree(folder)
+
+
+def test_stream_zip_yields_chunks(tmp_path):
+    from core.archives.zip_stream import stream_zip
+
+    path = tmp_path / "big.uvl"
+    path.write_bytes(os.urandom(300_000))
+
+    chunks = list(stream_zip([("big.uvl", str(path))], chunk_size=64 * 1024))
+    assert len(chunks) > 4
+    with ZipFile(BytesIO(b"".join(chunks))) as zipf:
+        assert zipf.read("big.uvl") == path.read_bytes()
+
+
+def test_download_dataset_compression_options(client, app, setup_data):
+    import tarfile
+    import zstandard
+
+    dsmetadata = DSMetaData(id=445, title="Compress me", description="Compressed", publication_type="NONE")
+    dataset = DataSet(id=445, user_id=111, ds_meta_data_id=445)
+    db.session.add_all([dsmetadata, dataset])
+    db.session.commit()
+
+    shutil.rmtree(app.config["DATASET_ARCHIVES_DIR"], ignore_errors=True)
+    folder = os.path.join("uploads", "user_111", "dataset_445")
+    os.makedirs(folder, exist_ok=True)
+    content = b"features\n    Root\n        optional\n            Leaf\n" * 1000
+    with open(os.path.join(folder, "model.uvl"), "wb") as f:
+        f.write(content)
+
+    try:
+        response = client.get("/dataset/download/445?level=9")
+        with ZipFile(BytesIO(response.data)) as zipf:
+            member = zipf.getinfo("dataset_445/model.uvl")
+            assert member.compress_size < len(content) / 10
+            assert zipf.read(member) == content
+
+        response = client.get("/dataset/download/445?compression=stored")
+        with ZipFile(BytesIO(response.data)) as zipf:
+            assert zipf.getinfo("dataset_445/model.uvl").compress_size == len(content)
+
+        response = client.get("/dataset/download/445?format=tar.zst&level=19")
+        assert response.mimetype == "application/zstd"
+        assert "dataset_445.tar.zst" in response.headers["Content-Disposition"]
+        reader = zstandard.ZstdDecompressor().stream_reader(BytesIO(response.data))
+        with tarfile.open(fileobj=reader, mode="r|") as tar:
+            member = tar.next()
+            assert member.name == "dataset_445/model.uvl"
+            assert tar.extractfile(member).read() == content
+
+        assert client.get("/dataset/download/445?format=rar").status_code == 400
+        assert client.get("/dataset/download/445?level=42").status_code == 400
+    finally:
+        shutil.rmtree(folder)
+
+
+def test_download_dataset_supports_ranges(client, app, setup_data):
+    shutil.rmtree(app.config["DATASET_ARCHIVES_DIR"], ignore_errors=True)
+    dsmetadata = DSMetaData(id=446, title="Resume me", description="Ranges", publication_type="NONE")
+    dataset = DataSet(id=446, user_id=111, ds_meta_data_id=446)
+    db.session.add_all([dsmetadata, dataset])
+    db.session.commit()
+
+    folder = os.path.join("uploads", "user_111", "dataset_446")
+    os.makedirs(folder, exist_ok=True)
+    with open(os.path.join(folder, "model.uvl"), "wb") as f:
+        f.write(os.urandom(10_000))
+
+    try:
+        # The first download streams the archive while it is stored, there is nothing to resume yet
+        cold = client.get("/dataset/download/446")
+        assert cold.status_code == 200
+        assert cold.is_streamed
+        assert "ETag" not in cold.headers and "Accept-Ranges" not in cold.headers
+
+        full = client.get("/dataset/download/446")
+        assert full.status_code == 200
+        assert full.data == cold.data
+        assert full.headers["Accept-Ranges"] == "bytes"
+        etag = full.headers["ETag"]
+        assert not etag.startswith("W/")
+
+        partial = client.get("/dataset/download/446", headers={"Range": "bytes=100-", "If-Range": etag})
+        assert partial.status_code == 206
+        assert partial.data == full.data[100:]
+
+        # Another compression is another archive, so the validator does not match
+        headers = {"Range": "bytes=100-", "If-Range": etag}
+        other = client.get("/dataset/download/446?compression=stored", headers=headers)
+        assert other.status_code == 200
+        assert other.headers["ETag"] != etag
+
+        # A range on an archive that is not stored (evicted since) builds it before answering
+        shutil.rmtree(app.config["DATASET_ARCHIVES_DIR"], ignore_errors=True)
+        partial = client.get("/dataset/download/446", headers={"Range": "bytes=100-", "If-Range": etag})
+        assert partial.status_code == 206
+        assert partial.data == full.data[100:]
+    finally:
+        shutil.rmtree(folder)
+
+
 def test_upload_valid_zip(test_client, login):
     """
     Prueba para cargar un archivo ZIP válido.
@@ -602,6 +740,69 @@ def test_upload_invalid_zip(test_client, login):
     assert response.status_code == 400
 
 
+def test_extract_members_streams_with_limits(tmp_path):
+    from zipfile import ZIP_DEFLATED
+
+    from core.archives.extract import ExtractionLimits, UnsafeArchiveError, extract_members
+
+    archive = tmp_path / "models.zip"
+    with ZipFile(archive, "w") as zip_file:
+        zip_file.writestr("a.uvl", "features\n    A\n")
+        zip_file.writestr("nested/a.uvl", "features\n    B\n")
+        zip_file.writestr("readme.txt", "ignored")
+
+    target = tmp_path / "temp"
+    target.mkdir()
+    (target / "a.uvl").write_text("already here")
+
+    def select(info):
+        return info.filename.endswith(".uvl")
+
+    limits = ExtractionLimits(max_members=10, max_total_size=1024, max_ratio=100)
+    names = extract_members(str(archive), str(target), select, limits)
+    assert names == ["a (1).uvl", "a (2).uvl"]
+    assert (target / "a.uvl").read_text() == "already here"
+    assert (target / "a (2).uvl").read_text() == "features\n    B\n"
+
+    with pytest.raises(UnsafeArchiveError):
+        extract_members(str(archive), str(target), select, ExtractionLimits(1, 0, 0))
+    with pytest.raises(UnsafeArchiveError):
+        extract_members(str(archive), str(target), select, ExtractionLimits(0, 16, 0))
+
+    bomb = tmp_path / "bomb.zip"
+    with ZipFile(bomb, "w", compression=ZIP_DEFLATED) as zip_file:
+        zip_file.writestr("zeros.uvl", b"\0" * (4 * 1024 * 1024))
+    with pytest.raises(UnsafeArchiveError):
+        extract_members(str(bomb), str(target), select, ExtractionLimits(0, 0, 100))
+    assert not (target / "zeros.uvl").exists()
+
+
+def test_upload_zip_reports_invalid_uvl(test_client, login):
+    remember_token, session = login
+
+    with open("app/modules/dataset/uvl_examples/file1.uvl", "rb") as f:
+        valid_uvl = f.read()
+    zip_buffer = BytesIO()
+    with ZipFile(zip_buffer, "w") as zip_file:
+        zip_file.writestr("valid_model.uvl", valid_uvl)
+        zip_file.writestr("broken_model.uvl", "features\n    Root {\n")
+    zip_buffer.seek(0)
+
+    headers = {"Cookie": f"remember_token={remember_token}; session={session}"}
+    response = test_client.post(
+        "/dataset/file/upload/zip",
+        data={"file": (zip_buffer, "validated.zip")},
+        headers=headers,
+        content_type="multipart/form-data",
+    )
+
+    assert response.status_code == 200
+    data = response.get_json()
+    assert len(data["extracted_files"]) == 2
+    invalid = [name for name in data["extracted_files"] if name in data["invalid_files"]]
+    assert len(invalid) == 1 and invalid[0].startswith("broken_model")
+
+
 def test_upload_no_file(test_client, login):
     """
     Verifica que no se envía archivo en la solicitud.
@@ -619,6 +820,116 @@ def test_upload_no_file(test_client, login):
     assert response.status_code == 400
 
 
+def test_chunked_upload_resumes_and_finalizes(test_client, login):
+    remember_token, session = login
+    headers = {"Cookie": f"remember_token={remember_token}; session={session}"}
+    content = b"features\n    Root\n" * 1000
+    sha256 = hashlib.sha256(content).hexdigest()
+
+    response = test_client.post(
+        "/dataset/file/upload/chunked",
+        json={"filename": "chunked.uvl", "size": len(content), "sha256": sha256},
+        headers=headers,
+    )
+    assert response.status_code == 201
+    upload_id = response.get_json()["upload_id"]
+    assert response.get_json()["offset"] == 0
+
+    response = test_client.put(
+        f"/dataset/file/upload/chunked/{upload_id}?offset=0", data=content[:5000], headers=headers
+    )
+    assert response.status_code == 200
+    assert response.get_json()["offset"] == 5000
+
+    # A chunk that does not start at the offset is rejected and tells the client where to resume
+    response = test_client.put(
+        f"/dataset/file/upload/chunked/{upload_id}?offset=4000", data=content[4000:], headers=headers
+    )
+    assert response.status_code == 409
+    assert response.get_json()["offset"] == 5000
+
+    response = test_client.post(f"/dataset/file/upload/chunked/{upload_id}/finalize", headers=headers)
+    assert response.status_code == 409
+
+    response = test_client.get(f"/dataset/file/upload/chunked/{upload_id}", headers=headers)
+    offset = response.get_json()["offset"]
+    response = test_client.put(
+        f"/dataset/file/upload/chunked/{upload_id}",
+        data=content[offset:],
+        headers={**headers, "Upload-Offset": str(offset)},
+    )
+    assert response.get_json()["offset"] == len(content)
+
+    response = test_client.post(f"/dataset/file/upload/chunked/{upload_id}/finalize", headers=headers)
+    assert response.status_code == 200
+    filename = response.get_json()["filename"]
+
+    with test_client.application.app_context():
+        temp_folder = User.query.filter_by(email="test@example.com").first().temp_folder()
+    with open(os.path.join(temp_folder, filename), "rb") as f:
+        assert f.read() == content
+    assert test_client.get(f"/dataset/file/upload/chunked/{upload_id}", headers=headers).status_code == 404
+
+
+def test_chunked_upload_checksum_mismatch(test_client, login):
+    remember_token, session = login
+    headers = {"Cookie": f"remember_token={remember_token}; session={session}"}
+
+    response = test_client.post(
+        "/dataset/file/upload/chunked",
+        json={"filename": "models.zip", "size": 4, "sha256": hashlib.sha256(b"abcd").hexdigest()},
+        headers=headers,
+    )
+    upload_id = response.get_json()["upload_id"]
+    test_client.put(f"/dataset/file/upload/chunked/{upload_id}?offset=0", data=b"abce", headers=headers)
+
+    response = test_client.post(f"/dataset/file/upload/chunked/{upload_id}/finalize", headers=headers)
+    assert response.status_code == 422
+    assert test_client.get(f"/dataset/file/upload/chunked/{upload_id}", headers=headers).status_code == 404
+
+
+def test_chunked_upload_zip(test_client, login):
+    remember_token, session = login
+    headers = {"Cookie": f"remember_token={remember_token}; session={session}"}
+
+    zip_buffer = BytesIO()
+    with ZipFile(zip_buffer, "w") as zip_file:
+        zip_file.writestr("chunked_zip_member.uvl", "contenido del archivo UVL")
+    content = zip_buffer.getvalue()
+
+    response = test_client.post(
+        "/dataset/file/upload/chunked",
+        json={"filename": "chunked.zip", "size": len(content), "sha256": hashlib.sha256(content).hexdigest()},
+        headers=headers,
+    )
+    upload_id = response.get_json()["upload_id"]
+    test_client.put(f"/dataset/file/upload/chunked/{upload_id}?offset=0", data=content, headers=headers)
+
+    response = test_client.post(f"/dataset/file/upload/chunked/{upload_id}/finalize", headers=headers)
+    assert response.status_code == 200
+    assert response.get_json()["extracted_files"] == ["chunked_zip_member.uvl"]
+
+
+def test_chunked_upload_rejects_invalid_files(test_client, login):
+    remember_token, session = login
+    headers = {"Cookie": f"remember_token={remember_token}; session={session}"}
+    sha256 = hashlib.sha256(b"").hexdigest()
+
+    response = test_client.post(
+        "/dataset/file/upload/chunked", json={"filename": "notes.txt", "size": 0, "sha256": sha256}, headers=headers
+    )
+    assert response.status_code == 400
+
+    test_client.application.config["CHUNKED_UPLOAD_MAX_SIZE"] = 10
+    try:
+        response = test_client.post(
+            "/dataset/file/upload/chunked", json={"filename": "big.uvl", "size": 11, "sha256": sha256}, headers=headers
+        )
+    finally:
+        test_client.application.config["CHUNKED_UPLOAD_MAX_SIZE"] = 10 * 1024 * 1024 * 1024
+    assert response.status_code == 413
+
+
 def test_dsmetrics_with_whitespaces(dataset_service, current_user, test_app):
 
     with test_app.app_context():
@@ -665,8 +976,143 @@ def test_dsmetrics_both(dataset_service, current_user, test_app):
         mock_create_dsmetrics.assert_called_once_with(number_of_models=2, number_of_features=34)
 
 
+def test_ingest_stream_matches_file(tmp_path):
+    uvl_path = "app/modules/dataset/uvl_examples/file_that_uses_tabs.uvl"
+    with open(uvl_path, "rb") as f:
+        content = f.read()
+
+    target = str(tmp_path / "model.uvl")
+    ingested = ingest_stream(BytesIO(content), target)
+    assert ingested == ingest_file(uvl_path)
+    assert ingested.md5 == hashlib.md5(content).hexdigest()
+    assert ingested.sha256 == hashlib.sha256(content).hexdigest()
+    assert ingested.size == len(content)
+    assert ingested.features == 24
+
+    # Dataset creation reads the record instead of the file
+    with patch("app.modules.dataset.ingestion.Ingestor", side_effect=AssertionError("file read again")):
+        assert ingest_file(target) == ingested
+
+
+def test_feature_counter_handles_split_chunks():
+    content = b"features\r\n\tRoot\r\n\t\toptional\r\n\t\t\tLeaf\r\n\r\n\t\t\tIgnored\r\n"
+    counter = FeatureCounter()
+    for i in range(len(content)):
+        counter.update(content[i:i + 1])
+    assert counter.finish() == 2
+
+
+def test_dataset_summary_from_form(dataset_service, current_user, test_app):
+
+    with test_app.app_context():
+        form = DataSetForm()
+        form.feature_models[0].uvl_filename.data = "file_that_uses_whitespaces.uvl"
+        form.feature_models.append_entry(data={"uvl_filename": "file_that_uses_tabs.uvl"})
+
+    with patch.object(current_user, "temp_folder", return_value="app/modules/dataset/uvl_examples"), patch.object(
+        dataset_service.dsmetrics_repository, "create", return_value=DSMetrics(id=1)
+    ):
+        dataset = dataset_service.create_from_form(form=form, current_user=current_user)
+
+    uvl_examples = "app/modules/dataset/uvl_examples"
+    assert dataset.feature_models_count == 2
+    assert dataset.files_count == 2
+    assert dataset.total_size_bytes == (
+        os.path.getsize(os.path.join(uvl_examples, "file_that_uses_whitespaces.uvl"))
+        + os.path.getsize(os.path.join(uvl_examples, "file_that_uses_tabs.uvl"))
+    )
+
+
+def test_create_from_form_survives_indexing_failure(dataset_service, current_user, test_app):
+
+    with test_app.app_context():
+        form = DataSetForm()
+        form.feature_models[0].uvl_filename.data = "file_that_uses_tabs.uvl"
+
+    with patch.object(current_user, "temp_folder", return_value="app/modules/dataset/uvl_examples"), patch.object(
+        dataset_service.dsmetrics_repository, "create", return_value=DSMetrics(id=1)
+    ), patch(
+        "app.modules.dataset.services.ExploreService.index_datasets", side_effect=RuntimeError("index unavailable")
+    ) as index_datasets:
+        # The dataset is already saved, so it is returned even though it could not be indexed
+        dataset = dataset_service.create_from_form(form=form, current_user=current_user)
+
+    index_datasets.assert_called_once_with([dataset.id])
+    assert dataset.files_count == 1
+
+
+class GitHubStandIn(BaseHTTPRequestHandler):
+    """Serves the files of GITHUB_FILES like raw.githubusercontent.com, with ETags and conditional requests."""
+
+    requests_seen = []
+
+    def do_GET(self):
+        GitHubStandIn.requests_seen.append((self.path, self.headers.get("If-None-Match")))
+        if self.path not in GITHUB_FILES:
+            self.send_error(404)
+            return
+
+        content = GITHUB_FILES[self.path]
+        etag = f'"{hashlib.md5(content).hexdigest()}"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("ETag", etag)
+        # Bodies under /unsized/ come without Content-Length, read until the connection closes
+        if not self.path.startswith("/unsized/"):
+            self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def build_github_files():
+    with open("app/modules/dataset/uvl_examples/file1.uvl", "rb") as f:
+        uvl = f.read()
+    zip_buffer = BytesIO()
+    with ZipFile(zip_buffer, "w") as zip_file:
+        zip_file.writestr("prueba/file1.uvl", uvl)
+    return {
+        "/jorgomde/prueba-archivos-zip-y-uvl/main/prueba.zip": zip_buffer.getvalue(),
+        "/jorgomde/prueba-archivos-zip-y-uvl/main/file1.uvl": uvl,
+        "/sized/repo/main/big.uvl": b"x" * 200_000,
+        "/unsized/repo/main/big.uvl": b"x" * 200_000,
+    }
+
+
+GITHUB_FILES = {}
+
+
+@pytest.fixture
+def github_stand_in(test_client):
+    """Points GitHub imports at a local server instead of raw.githubusercontent.com."""
+    GITHUB_FILES.update(build_github_files())
+    GitHubStandIn.requests_seen.clear()
+    server = ThreadingHTTPServer(("127.0.0.1", 0), GitHubStandIn)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    config = test_client.application.config
+    shutil.rmtree(config["GITHUB_CACHE_DIR"], ignore_errors=True)
+    test_client.application.extensions.pop("github_import_cache", None)
+    previous_url = config["GITHUB_RAW_URL"]
+    config["GITHUB_RAW_URL"] = f"http://127.0.0.1:{server.server_port}"
+    try:
+        yield GitHubStandIn
+    finally:
+        config["GITHUB_RAW_URL"] = previous_url
+        server.shutdown()
+        server.server_close()
+
+
 # Caso: URL válida de GitHub con archivo ZIP
-def test_upload_github_valid_zip(test_client, login):
+def test_upload_github_valid_zip(test_client, login, github_stand_in):
     remember_token, session = login  # Obtenemos el token de autenticación
 
     # URL válida del archivo ZIP en GitHub
@@ -688,7 +1134,7 @@ def test_upload_github_valid_zip(test_client, login):
 
 
 # Caso: URL válida de GitHub con archivo UVL
-def test_upload_github_valid_uvl(test_client, login):
+def test_upload_github_valid_uvl(test_client, login, github_stand_in):
     remember_token, session = login  # Obtenemos el token de autenticación
 
     github_url = "https://github.com/jorgomde/prueba-archivos-zip-y-uvl/blob/main/file1.uvl"
@@ -737,7 +1183,7 @@ def test_upload_github_missing_url(test_client, login):
 
 
 # Caso: Error genérico al descargar desde GitHub
-def test_upload_github_request_error(test_client, login):
+def test_upload_github_request_error(test_client, login, github_stand_in):
     remember_token, session = login  # Obtenemos el token de autenticación
 
     github_url = "https://github.com/user/repo/blob/main/test.zip"
@@ -751,3 +1197,67 @@ def test_upload_github_request_error(test_client, login):
     # Verificar la respuesta
     assert response.status_code == 500  # Aseguramos que el status code es 500
     assert response_data["error"].startswith("Error uploading file from GitHub")
+
+
+def test_upload_github_refetches_conditionally(test_client, login, github_stand_in):
+    remember_token, session = login
+    headers = {"Cookie": f"remember_token={remember_token}; session={session}", "Content-Type": "application/json"}
+    github_url = "https://github.com/jorgomde/prueba-archivos-zip-y-uvl/blob/main/file1.uvl"
+
+    first = test_client.post("/dataset/file/upload/github", json={"url": github_url}, headers=headers)
+    second = test_client.post("/dataset/file/upload/github", json={"url": github_url}, headers=headers)
+    assert first.status_code == second.status_code == 200
+
+    # The second import revalidates the cached copy instead of downloading it again
+    (_, first_validator), (_, second_validator) = github_stand_in.requests_seen
+    assert first_validator is None
+    assert second_validator is not None
+
+    uvl = GITHUB_FILES["/jorgomde/prueba-archivos-zip-y-uvl/main/file1.uvl"]
+    assert second.get_json()["fileSize"] == len(uvl)
+    assert second.get_json()["fileName"] != first.get_json()["fileName"]
+    with open(second.get_json()["filePath"], "rb") as f:
+        assert f.read() == uvl
+
+
+def test_upload_github_size_limit(test_client, login, github_stand_in):
+    remember_token, session = login
+    headers = {"Cookie": f"remember_token={remember_token}; session={session}", "Content-Type": "application/json"}
+
+    config = test_client.application.config
+    config["GITHUB_IMPORT_MAX_BYTES"] = 100_000
+    try:
+        # Refused from Content-Length
+        response = test_client.post(
+            "/dataset/file/upload/github", json={"url": "https://github.com/sized/repo/blob/main/big.uvl"},
+            headers=headers,
+        )
+        assert response.status_code == 413
+
+        # Refused while streaming when no length is announced
+        response = test_client.post(
+            "/dataset/file/upload/github", json={"url": "https://github.com/unsized/repo/blob/main/big.uvl"},
+            headers=headers,
+        )
+        assert response.status_code == 413
+    finally:
+        config["GITHUB_IMPORT_MAX_BYTES"] = 100 * 1024 * 1024
+
+
+def test_github_fetch_refetches_when_cached_copy_is_evicted(test_client, github_stand_in, tmp_path):
+    path = "/jorgomde/prueba-archivos-zip-y-uvl/main/file1.uvl"
+    raw_url = test_client.application.config["GITHUB_RAW_URL"] + path
+
+    with test_client.application.app_context():
+        first = github_import.fetch_raw_file(raw_url, str(tmp_path / "first.uvl"))
+        assert not first.from_cache
+
+        # Another import evicts the entry between the lookup and the 304
+        cached = github_import.read_cached(github_import.get_github_cache(), raw_url)
+        os.remove(cached[0])
+        with patch.object(github_import, "read_cached", return_value=cached):
+            second = github_import.fetch_raw_file(raw_url, str(tmp_path / "second.uvl"))
+
+    assert not second.from_cache
+    assert [validator is None for _, validator in github_stand_in.requests_seen] == [True, False, True]
+    assert (tmp_path / "second.uvl").read_bytes() == GITHUB_FILES[path]
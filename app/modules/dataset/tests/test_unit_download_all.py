@@ -1,5 +1,8 @@
 from datetime import datetime
+import io
 import os
+import shutil
+import time
 import tempfile
 from unittest import mock
 import pytest
@@ -8,6 +11,7 @@ from app import create_app, db
 from app.modules.auth.models import User
 from app.modules.dataset.models import DSMetaData, DataSet, PublicationType
 from app.modules.featuremodel.models import FeatureModel
+from app.modules.flamapy.conversions import ConversionEngine
 from app.modules.hubfile.models import Hubfile
 from flamapy.metamodels.fm_metamodel.transformations import UVLReader, GlencoeWriter, SPLOTWriter
 from flamapy.metamodels.pysat_metamodel.transformations import FmToPysat, DimacsWriter
@@ -74,6 +78,25 @@ def client():
             db.drop_all()
 
 
+def download_all(client, query=""):
+    """Response of GET /dataset/download/all once its job ends: the archive, or the job's status if it failed."""
+    url = f"/dataset/download/all{query}"
+    response = client.get(url)
+    if response.status_code == 202:
+        status_url = response.get_json()["status_url"]
+        deadline = time.monotonic() + 30
+        while response.get_json()["status"] in ("pending", "running") and time.monotonic() < deadline:
+            time.sleep(0.1)
+            response = client.get(status_url)
+        if response.get_json()["status"] != "done":
+            return response
+        response = client.get(url)
+
+    # Con el archivo ya en disco la petición redirige a él
+    assert response.status_code == 302
+    return client.get(response.location)
+
+
 # Test para la descarga de todos los datasets (esperando un archivo ZIP)
 def test_download_all_dataset(client):
     with mock.patch("flask_login.utils._get_user") as mock_get_user:
@@ -138,7 +161,7 @@ def test_download_all_dataset(client):
                         # Verifica el contenido
                         zipf.testzip()  # Esto puede levantar una excepción si el ZIP está dañado
 
-                    response = client.get("/dataset/download/all")
+                    response = download_all(client)
                     assert response.status_code == 200
 
                 finally:
@@ -232,7 +255,7 @@ def test_download_all_dataset_splx(client):
                         # Verificar que al menos un archivo tenga el sufijo '_splot.txt'
                         assert any(name.endswith("_splot.txt") for name in zip_file_names)
                     # Simulamos una llamada a la descarga del archivo ZIP
-                    response = client.get("/dataset/download/all")
+                    response = download_all(client)
                     assert response.status_code == 200
 
                 finally:
@@ -325,7 +348,7 @@ def test_download_all_dataset_glencoe(client):
                         # Verificar que al menos un archivo tenga el sufijo '_glencoe.txt'
                         assert any(name.endswith("_glencoe.txt") for name in zip_file_names)
                     # Simulamos una llamada a la descarga del archivo ZIP
-                    response = client.get("/dataset/download/all")
+                    response = download_all(client)
                     assert response.status_code == 200
 
                 finally:
@@ -419,7 +442,7 @@ def test_download_all_dataset_dimacs(client):
                         # Verificar que al menos un archivo tenga el sufijo '_cnf.txt'
                         assert any(name.endswith("_cnf.txt") for name in zip_file_names)
                     # Simulamos una llamada a la descarga del archivo ZIP
-                    response = client.get("/dataset/download/all")
+                    response = download_all(client)
                     assert response.status_code == 200
 
                 finally:
@@ -441,7 +464,9 @@ def test_download_all_dataset_files_not_found(client):
         ]
 
         # Simulamos un escenario donde el archivo no está presente
-        with mock.patch("app.modules.hubfile.services.HubfileService.get_or_404", side_effect=FileNotFoundError):
+        with mock.patch(
+            "app.modules.hubfile.services.HubfileService.build_path", return_value="uploads/missing/fileX.uvl"
+        ):
             # No deberíamos poder crear archivos si no hay archivos disponibles
             with tempfile.TemporaryDirectory() as tmpdirname:
                 zip_path = os.path.join(tmpdirname, "all_datasets.zip")
@@ -460,17 +485,14 @@ def test_download_all_dataset_files_not_found(client):
                                 pass
             try:
                 # Llamamos a la ruta para descargar todos los datasets
-                response = client.get("/dataset/download/all")
-
-                # Verificamos que el status de la respuesta es 404 (No encontrado)
-                assert response.status_code == 404
+                response = download_all(client)
 
                 # Verificar que la respuesta sea un JSON
                 assert response.content_type == "application/json"
 
-                # Verificar el contenido del JSON (mensaje de error esperado)
+                # El trabajo falla con el mensaje de error esperado
                 json_response = response.get_json()
-                assert "error" in json_response
+                assert json_response["status"] == "failed"
                 assert json_response["error"] == "No se encontraron archivos disponibles para descargar"
             finally:
                 if os.path.exists(zip_path):
@@ -488,8 +510,8 @@ def test_download_all_dataset_empty(client):
             mock.Mock(id=20, user_id=5, files=lambda: []),
         ]
 
-        # Simulamos un escenario donde el archivo no está presente
-        with mock.patch("app.modules.hubfile.services.HubfileService.get_or_404", side_effect=FileNotFoundError):
+        # Simulamos un escenario sin archivos
+        with mock.patch("app.modules.hubfile.services.HubfileService.get_paths", return_value=[]):
             # No deberíamos poder crear archivos si no hay archivos disponibles
             with tempfile.TemporaryDirectory() as tmpdirname:
                 zip_path = os.path.join(tmpdirname, "all_datasets.zip")
@@ -508,18 +530,144 @@ def test_download_all_dataset_empty(client):
                                 pass
             try:
                 # Llamamos a la ruta para descargar todos los datasets
-                response = client.get("/dataset/download/all")
-
-                # Verificamos que el status de la respuesta es 404 (No encontrado)
-                assert response.status_code == 404
+                response = download_all(client)
 
                 # Verificar que la respuesta sea un JSON
                 assert response.content_type == "application/json"
 
-                # Verificar el contenido del JSON (mensaje de error esperado)
+                # El trabajo falla con el mensaje de error esperado
                 json_response = response.get_json()
-                assert "error" in json_response
+                assert json_response["status"] == "failed"
                 assert json_response["error"] == "No se encontraron archivos disponibles para descargar"
             finally:
                 if os.path.exists(zip_path):
                     os.remove(zip_path)
+
+
+# Test para la descarga de todos los datasets en segundo plano
+def test_download_all_dataset_job(client):
+    shutil.rmtree(client.application.config["DOWNLOAD_ALL_DIR"], ignore_errors=True)
+    file_path = os.path.join("uploads", "user_33", "dataset_33", "file33.uvl")
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    with open(file_path, "w") as f:
+        f.write("features\n    Chat\n        optional\n            Video\n")
+
+    response = client.post("/dataset/download/all")
+    assert response.status_code == 202
+    job_id = response.get_json()["job_id"]
+
+    # Una segunda petición se une al mismo trabajo
+    assert client.post("/dataset/download/all").get_json()["job_id"] == job_id
+
+    deadline = time.monotonic() + 30
+    status = client.get(f"/dataset/download/all/{job_id}").get_json()
+    while status["status"] in ("pending", "running") and time.monotonic() < deadline:
+        time.sleep(0.1)
+        status = client.get(f"/dataset/download/all/{job_id}").get_json()
+
+    assert status["status"] == "done"
+    assert status["files_done"] == status["files_total"] == 1
+    assert status["datasets_done"] == status["datasets_total"] == 1
+
+    response = client.get(status["download_url"])
+    assert response.status_code == 200
+    with ZipFile(io.BytesIO(response.data)) as zipf:
+        assert sorted(zipf.namelist()) == [
+            "dataset_33/file33.uvl.txt",
+            "dataset_33/file33.uvl_cnf.txt",
+            "dataset_33/file33.uvl_glencoe.txt",
+            "dataset_33/file33.uvl_splot.txt",
+        ]
+
+    assert client.get("/dataset/download/all/unknown").status_code == 404
+
+
+# Test para comprobar que solo se reconvierten los datasets que cambian
+def test_download_all_dataset_reuses_fragments(client):
+    shutil.rmtree(client.application.config["DOWNLOAD_ALL_DIR"], ignore_errors=True)
+    for dataset_id in (33, 34):
+        file_path = os.path.join("uploads", "user_33", f"dataset_{dataset_id}", f"file{dataset_id}.uvl")
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        with open(file_path, "w") as f:
+            f.write(f"features\n    Chat{dataset_id}\n        optional\n            Video\n")
+
+    convert_all = ConversionEngine.convert_all
+    with mock.patch.object(ConversionEngine, "convert_all", autospec=True, side_effect=convert_all) as spy:
+        assert download_all(client).status_code == 200
+        assert [job[0].name for job in spy.call_args.args[1]] == ["file33.uvl"]
+
+        # Se publica un nuevo dataset
+        dsmetadata = DSMetaData(
+            id=34, title="Dataset 34", description="Dataset 34", publication_type=PublicationType.NONE.name
+        )
+        db.session.add(dsmetadata)
+        db.session.add(DataSet(id=34, user_id=33, ds_meta_data_id=34))
+        db.session.add(FeatureModel(id=2, data_set_id=34))
+        db.session.add(Hubfile(id=2, feature_model_id=2, name="file34.uvl", checksum="checksum_34", size=10))
+        db.session.commit()
+
+        response = download_all(client)
+        assert response.status_code == 200
+        assert [job[0].name for job in spy.call_args.args[1]] == ["file34.uvl"]
+
+    with ZipFile(io.BytesIO(response.data)) as zipf:
+        assert zipf.testzip() is None
+        names = zipf.namelist()
+    assert "dataset_33/file33.uvl_glencoe.txt" in names
+    assert "dataset_34/file34.uvl_glencoe.txt" in names
+
+
+# Test para la descarga de todos los datasets en tar.zst
+def test_download_all_dataset_tar_zst(client):
+    import tarfile
+    import zstandard
+
+    file_path = os.path.join("uploads", "user_33", "dataset_33", "file33.uvl")
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    with open(file_path, "w") as f:
+        f.write("features\n    Chat\n        optional\n            Video\n")
+
+    response = download_all(client, "?format=tar.zst")
+    assert response.status_code == 200
+    assert response.mimetype == "application/zstd"
+
+    reader = zstandard.ZstdDecompressor().stream_reader(io.BytesIO(response.data))
+    with tarfile.open(fileobj=reader, mode="r|") as tar:
+        names = [member.name for member in tar]
+    assert sorted(names) == [
+        "dataset_33/file33.uvl.txt",
+        "dataset_33/file33.uvl_cnf.txt",
+        "dataset_33/file33.uvl_glencoe.txt",
+        "dataset_33/file33.uvl_splot.txt",
+    ]
+
+    assert client.post("/dataset/download/all?compression=zstd").status_code == 400
+
+
+# Un trabajo de un catálogo anterior que termina tarde no borra el archivo del catálogo actual
+def test_download_all_dataset_late_job_keeps_newer_archive(client):
+    from app.modules.dataset.download_all import DownloadAllJob, get_catalogue
+    from core.archives.formats import ArchiveOptions
+
+    shutil.rmtree(client.application.config["DOWNLOAD_ALL_DIR"], ignore_errors=True)
+    file_path = os.path.join("uploads", "user_33", "dataset_33", "file33.uvl")
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    with open(file_path, "w") as f:
+        f.write("features\n    Chat\n        optional\n            Video\n")
+
+    key = ArchiveOptions.parse({}).key
+    older, newer, newest = (DownloadAllJob(f"{letter * 32}-{key}") for letter in "abc")
+    older.created_at -= 10
+    newest.created_at += 10
+    files = get_catalogue()
+
+    newer.run(files)
+    older.run(files)
+    assert older.status == newer.status == "done"
+    assert os.path.exists(newer.path)
+    assert os.path.exists(older.path)
+
+    newest.run(files)
+    assert os.path.exists(newest.path)
+    assert not os.path.exists(newer.path)
+    assert not os.path.exists(older.path)
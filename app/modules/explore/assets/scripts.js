@@ -1,7 +1,41 @@
+// Milliseconds the query box has to stay unchanged before suggestions or results are requested
+const SUGGEST_DELAY = 150;
+const QUERY_DELAY = 400;
+
 document.addEventListener('DOMContentLoaded', () => {
     send_query();
+    const suggestSoon = debounce(suggest, SUGGEST_DELAY);
+    document.querySelector('#query').addEventListener('input', event => suggestSoon(event.target.value));
 });
 
+function debounce(callback, delay) {
+    let timer = null;
+    return (...args) => {
+        clearTimeout(timer);
+        timer = setTimeout(() => callback(...args), delay);
+    };
+}
+
+function suggest(q) {
+    const datalist = document.getElementById('query_suggestions');
+    if (!q.trim()) {
+        datalist.innerHTML = '';
+        return;
+    }
+
+    fetch(`/explore/suggest?q=${encodeURIComponent(q)}`)
+        .then(response => response.json())
+        .then(data => {
+            datalist.innerHTML = '';
+            data.suggestions.forEach(suggestion => {
+                const option = document.createElement('option');
+                option.value = suggestion.text;
+                option.label = suggestion.type.replace('_', ' ');
+                datalist.appendChild(option);
+            });
+        });
+}
+
 function send_query() {
 
     console.log("send query...")
@@ -12,148 +46,173 @@ function send_query() {
 
     const filters = document.querySelectorAll('#filters input, #filters select, #filters [type="radio"]');
 
+    const search = () => {
+        const csrfToken = document.getElementById('csrf_token').value;
+
+        const searchCriteria = {
+            csrf_token: csrfToken,
+            query: document.querySelector('#query').value,
+            publication_type: document.querySelector('#publication_type').value,
+            sorting: document.querySelector('[name="sorting"]:checked').value,
+            min_creation_date: document.querySelector('#min_creation_date').value,
+            max_creation_date: document.querySelector('#max_creation_date').value,
+            min_size: document.querySelector('#min_size').value,
+            max_size: document.querySelector('#max_size').value,
+            min_models: document.querySelector('#min_models').value,
+            max_models: document.querySelector('#max_models').value,
+            min_features: document.querySelector('#min_features').value,
+            max_features: document.querySelector('#max_features').value
+        };
+
+        console.log(document.querySelector('#publication_type').value);
+
+        document.getElementById('results').innerHTML = '';
+        fetch_page(searchCriteria, null);
+    };
+
+    // Typing in the query box searches once the user pauses, other filters search on every change
+    const searchSoon = debounce(search, QUERY_DELAY);
     filters.forEach(filter => {
-        filter.addEventListener('input', () => {
-            const csrfToken = document.getElementById('csrf_token').value;
-
-            const searchCriteria = {
-                csrf_token: csrfToken,
-                query: document.querySelector('#query').value,
-                publication_type: document.querySelector('#publication_type').value,
-                sorting: document.querySelector('[name="sorting"]:checked').value,
-                min_creation_date: document.querySelector('#min_creation_date').value,
-                max_creation_date: document.querySelector('#max_creation_date').value,
-                min_size: document.querySelector('#min_size').value,
-                max_size: document.querySelector('#max_size').value,
-                min_models: document.querySelector('#min_models').value,
-                max_models: document.querySelector('#max_models').value,
-                min_features: document.querySelector('#min_features').value,
-                max_features: document.querySelector('#max_features').value
-            };
-
-            console.log(document.querySelector('#publication_type').value);
-
-            fetch('/explore', {
-                method: 'POST',
-                headers: {
-                    'Content-Type': 'application/json',
-                },
-                body: JSON.stringify(searchCriteria),
-            })
-                .then(response => response.json())
-                .then(data => {
-
-                    console.log(data);
-                    document.getElementById('results').innerHTML = '';
-
-                    // results counter
-                    const resultCount = data.length;
-                    const resultText = resultCount === 1 ? 'dataset' : 'datasets';
-                    document.getElementById('results_number').textContent = `${resultCount} ${resultText} found`;
-
-                    if (resultCount === 0) {
-                        console.log("show not found icon");
-                        document.getElementById("results_not_found").style.display = "block";
-                    } else {
-                        document.getElementById("results_not_found").style.display = "none";
-                    }
-
-
-                    data.forEach(dataset => {
-                        console.log(dataset.url)
-                        let card = document.createElement('div');
-                        card.className = 'col-12';
-                        card.innerHTML = `
-                            <div class="card">
-                                <div class="card-body">
-                                    <div class="d-flex align-items-center justify-content-between">
-                                        <h3><a href="${dataset.url}">${dataset.title}</a></h3>
-                                        <div>
-                                            <span class="badge bg-primary" style="cursor: pointer;" onclick="set_publication_type_as_query('${dataset.publication_type}')">${dataset.publication_type}</span>
-                                        </div>
-                                    </div>
-                                    <p class="text-secondary">${formatDate(dataset.created_at)}</p>
-
-                                    <div class="row mb-2">
-
-                                        <div class="col-md-4 col-12">
-                                            <span class=" text-secondary">
-                                                Description
-                                            </span>
-                                        </div>
-                                        <div class="col-md-8 col-12">
-                                            <p class="card-text">${dataset.description}</p>
-                                        </div>
-
-                                    </div>
-
-                                    <div class="row mb-2">
-
-                                        <div class="col-md-4 col-12">
-                                            <span class=" text-secondary">
-                                                Authors
-                                            </span>
-                                        </div>
-                                        <div class="col-md-8 col-12">
-                                            ${dataset.authors.map(author => `
-                                                <p class="p-0 m-0">${author.name}${author.affiliation ? ` (${author.affiliation})` : ''}${author.orcid ? ` (${author.orcid})` : ''}</p>
-                                            `).join('')}
-                                        </div>
-                                    </div>
-
-                                    ${dataset.community_id ? `
-                                    <div class="row mb-2">
-                                        <div class="col-md-4 col-12">
-                                            <span class="text-secondary">
-                                                Community
-                                            </span>
-                                        </div>
-                                        <div class="col-md-8 col-12">
-                                            <a href="${dataset.community_url}">
-                                                ${dataset.community_name}
-                                            </a>
-                                        </div>
-                                    </div>`: ''}
-
-                                    <div class="row mb-2">
-
-                                        <div class="col-md-4 col-12">
-                                            <span class=" text-secondary">
-                                                Tags
-                                            </span>
-                                        </div>
-                                        <div class="col-md-8 col-12">
-                                            ${dataset.tags.map(tag => `<span class="badge bg-primary me-1" style="cursor: pointer;" onclick="set_tag_as_query('${tag}')">${tag}</span>`).join('')}
-                                        </div>
-
-                                    </div>
-
-                                    <div class="row">
-
-                                        <div class="col-md-4 col-12">
-
-                                        </div>
-                                        <div class="col-md-8 col-12">
-                                            <a href="${dataset.url}" class="btn btn-outline-primary btn-sm" id="search" style="border-radius: 5px;">
-                                                View dataset
-                                            </a>
-                                            <a href="/dataset/download/${dataset.id}" class="btn btn-outline-primary btn-sm" id="search" style="border-radius: 5px;">
-                                                Download (${dataset.total_size_in_human_format})
-                                            </a>
-                                        </div>
-
-
-                                    </div>
+        filter.addEventListener('input', filter.id === 'query' ? searchSoon : search);
+    });
+}
 
+function fetch_page(searchCriteria, cursor) {
+    fetch('/explore', {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+        },
+        body: JSON.stringify({...searchCriteria, cursor: cursor, include_total: cursor === null}),
+    })
+        .then(response => response.json())
+        .then(data => {
+
+            console.log(data);
+
+            const loadMore = document.getElementById('load_more');
+            if (loadMore) {
+                loadMore.remove();
+            }
+
+            if (cursor === null) {
+                document.getElementById('results').innerHTML = '';
+
+                // results counter
+                const resultCount = data.total;
+                const resultText = resultCount === 1 ? 'dataset' : 'datasets';
+                document.getElementById('results_number').textContent = `${resultCount} ${resultText} found`;
+
+                if (resultCount === 0) {
+                    console.log("show not found icon");
+                    document.getElementById("results_not_found").style.display = "block";
+                } else {
+                    document.getElementById("results_not_found").style.display = "none";
+                }
+            }
+
+            data.datasets.forEach(dataset => {
+                console.log(dataset.url)
+                let card = document.createElement('div');
+                card.className = 'col-12';
+                card.innerHTML = `
+                    <div class="card">
+                        <div class="card-body">
+                            <div class="d-flex align-items-center justify-content-between">
+                                <h3><a href="${dataset.url}">${dataset.title}</a></h3>
+                                <div>
+                                    <span class="badge bg-primary" style="cursor: pointer;" onclick="set_publication_type_as_query('${dataset.publication_type}')">${dataset.publication_type}</span>
                                 </div>
                             </div>
-                        `;
+                            <p class="text-secondary">${formatDate(dataset.created_at)}</p>
 
-                        document.getElementById('results').appendChild(card);
-                    });
-                });
+                            <div class="row mb-2">
+
+                                <div class="col-md-4 col-12">
+                                    <span class=" text-secondary">
+                                        Description
+                                    </span>
+                                </div>
+                                <div class="col-md-8 col-12">
+                                    <p class="card-text">${dataset.description}</p>
+                                </div>
+
+                            </div>
+
+                            <div class="row mb-2">
+
+                                <div class="col-md-4 col-12">
+                                    <span class=" text-secondary">
+                                        Authors
+                                    </span>
+                                </div>
+                                <div class="col-md-8 col-12">
+                                    ${dataset.authors.map(author => `
+                                        <p class="p-0 m-0">${author.name}${author.affiliation ? ` (${author.affiliation})` : ''}${author.orcid ? ` (${author.orcid})` : ''}</p>
+                                    `).join('')}
+                                </div>
+                            </div>
+
+                            ${dataset.community_id ? `
+                            <div class="row mb-2">
+                                <div class="col-md-4 col-12">
+                                    <span class="text-secondary">
+                                        Community
+                                    </span>
+                                </div>
+                                <div class="col-md-8 col-12">
+                                    <a href="${dataset.community_url}">
+                                        ${dataset.community_name}
+                                    </a>
+                                </div>
+                            </div>`: ''}
+
+                            <div class="row mb-2">
+
+                                <div class="col-md-4 col-12">
+                                    <span class=" text-secondary">
+                                        Tags
+                                    </span>
+                                </div>
+                                <div class="col-md-8 col-12">
+                                    ${dataset.tags.map(tag => `<span class="badge bg-primary me-1" style="cursor: pointer;" onclick="set_tag_as_query('${tag}')">${tag}</span>`).join('')}
+                                </div>
+
+                            </div>
+
+                            <div class="row">
+
+                                <div class="col-md-4 col-12">
+
+                                </div>
+                                <div class="col-md-8 col-12">
+                                    <a href="${dataset.url}" class="btn btn-outline-primary btn-sm" id="search" style="border-radius: 5px;">
+                                        View dataset
+                                    </a>
+                                    <a href="/dataset/download/${dataset.id}" class="btn btn-outline-primary btn-sm" id="search" style="border-radius: 5px;">
+                                        Download (${dataset.total_size_in_human_format})
+                                    </a>
+                                </div>
+
+
+                            </div>
+
+                        </div>
+                    </div>
+                `;
+
+                document.getElementById('results').appendChild(card);
+            });
+
+            if (data.next_cursor) {
+                let button = document.createElement('button');
+                button.id = 'load_more';
+                button.className = 'btn btn-outline-primary mb-3';
+                button.textContent = 'Load more';
+                button.addEventListener('click', () => fetch_page(searchCriteria, data.next_cursor));
+                document.getElementById('results').appendChild(button);
+            }
         });
-    });
 }
 
 function formatDate(dateString) {
@@ -0,0 +1,44 @@
+from app import db
+
+
+class SearchDocument(db.Model):
+    """Length (in terms) of each indexed field of a dataset, used by the BM25 length normalization."""
+    data_set_id = db.Column(db.Integer, db.ForeignKey("data_set.id"), primary_key=True)
+    field = db.Column(db.String(32), primary_key=True)
+    length = db.Column(db.Integer, nullable=False)
+
+    data_set = db.relationship("DataSet", backref=db.backref("search_documents", lazy=True, cascade="all, delete"))
+
+
+class SearchTerm(db.Model):
+    """Term frequency of a term in a field of a dataset."""
+    __table_args__ = (
+        db.Index("ix_search_term_term_data_set_id", "term", "data_set_id"),
+    )
+
+    data_set_id = db.Column(db.Integer, db.ForeignKey("data_set.id"), primary_key=True)
+    field = db.Column(db.String(32), primary_key=True)
+    term = db.Column(db.String(64), primary_key=True)
+    tf = db.Column(db.Integer, nullable=False)
+
+    data_set = db.relationship("DataSet", backref=db.backref("search_terms", lazy=True, cascade="all, delete"))
+
+    def __repr__(self):
+        return f"SearchTerm<{self.data_set_id}, {self.field}, {self.term}>"
+
+
+class SearchTermStats(db.Model):
+    """Number of datasets with a term in a field, kept up to date as datasets are (re)indexed."""
+    term = db.Column(db.String(64), primary_key=True)
+    field = db.Column(db.String(32), primary_key=True)
+    df = db.Column(db.Integer, nullable=False)
+
+    def __repr__(self):
+        return f"SearchTermStats<{self.term}, {self.field}, {self.df}>"
+
+
+class SearchFieldStats(db.Model):
+    """Number of indexed datasets and sum of their lengths in a field, the BM25 corpus statistics."""
+    field = db.Column(db.String(32), primary_key=True)
+    documents = db.Column(db.Integer, nullable=False)
+    total_length = db.Column(db.BigInteger, nullable=False)
@@ -1,18 +1,95 @@
 import re
+from collections import Counter, defaultdict
 from datetime import datetime as dt, timedelta
-from sqlalchemy import any_, or_, func
+from flask import current_app
+from sqlalchemy import and_, case, delete, func, insert, or_, select, tuple_, union
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload, selectinload
+from sqlalchemy.dialects.mysql import match
 import unidecode
-from app.modules.dataset.models import Author, DSMetaData, DataSet, PublicationType, DSMetrics
+from app.modules.dataset.models import (
+    Author, Community, DSMetaData, DataSet, PublicationType, DSMetrics, Tag, ds_meta_data_tag
+)
+from app.modules.explore.models import SearchDocument, SearchFieldStats, SearchTerm, SearchTermStats
 from app.modules.featuremodel.models import FMMetaData, FeatureModel
-from app.modules.hubfile.models import Hubfile
 from core.repositories.BaseRepository import BaseRepository
 from flask_sqlalchemy import query
 
+FULLTEXT_DIALECTS = ("mysql", "mariadb")
+
+# InnoDB's default FULLTEXT stopwords, they are never indexed so MATCH would not find them
+FULLTEXT_STOPWORDS = frozenset(
+    "a about an are as at be by com de en for from how i in is it la of on or that the this to was what when where "
+    "who will with und www".split()
+)
+
+# Lower bounds of the facet buckets, each bucket ends right before the next one starts
+SIZE_BUCKETS = [0, 1024, 10 * 1024, 100 * 1024, 1024 ** 2]
+FEATURES_BUCKETS = [0, 10, 20, 50, 100]
+
+
+def tokenize(text: str) -> list[str]:
+    """Terms stored in the search index (and looked up for relevance ranking)."""
+    return [term[:64] for term in re.findall(r"[a-z0-9]+", unidecode.unidecode(text or "").lower())]
+
 
 class ExploreRepository(BaseRepository):
     def __init__(self):
         super().__init__(DataSet)
 
+    def supports_fulltext(self) -> bool:
+        return self.session.get_bind().dialect.name in FULLTEXT_DIALECTS
+
+    def like_filters(self, words):
+        filters = []
+        for word in words:
+            filters.append(DSMetaData.title.ilike(f"%{word}%"))
+            filters.append(DSMetaData.description.ilike(f"%{word}%"))
+            filters.append(Author.name.ilike(f"%{word}%"))
+            filters.append(Author.affiliation.ilike(f"%{word}%"))
+            filters.append(Author.orcid.ilike(f"%{word}%"))
+            filters.append(FMMetaData.uvl_filename.ilike(f"%{word}%"))
+            filters.append(FMMetaData.title.ilike(f"%{word}%"))
+            filters.append(FMMetaData.description.ilike(f"%{word}%"))
+            filters.append(FMMetaData.publication_doi.ilike(f"%{word}%"))
+            filters.append(FMMetaData.tags.ilike(f"%{word}%"))
+            filters.append(DSMetaData.tags.ilike(f"%{word}%"))
+        return filters
+
+    def fulltext_filters(self, words):
+        # Words shorter than the server's minimum token size, and stopwords, are never indexed, so they keep using
+        # ILIKE (and a full scan) as before
+        min_token_size = current_app.config.get("FULLTEXT_MIN_TOKEN_SIZE", 3)
+        terms = re.sub(r"[+\-<>~*@]", " ", " ".join(words)).split()
+        indexed_words = [term for term in terms if len(term) >= min_token_size and term not in FULLTEXT_STOPWORDS]
+        short_words = [term for term in terms if term not in indexed_words]
+
+        filters = self.like_filters(short_words)
+        if indexed_words:
+            # Boolean mode without operators ORs the words, and the trailing * matches them as prefixes
+            against = " ".join(f"{word}*" for word in indexed_words)
+            # MATCH can only use its FULLTEXT index on the table it is on, not ORed across joined tables. Each one
+            # resolves the matching DSMetaData ids from its own index, and the union is materialized once and probed
+            # by primary key. EXPLAIN shows one "fulltext" access per branch (see test_fulltext_uses_indexes)
+            hits = union(
+                select(DSMetaData.id.label("id")).where(
+                    match(DSMetaData.title, DSMetaData.description, DSMetaData.tags, against=against)
+                    .in_boolean_mode()
+                ),
+                select(Author.ds_meta_data_id.label("id")).where(
+                    match(Author.name, Author.affiliation, Author.orcid, against=against).in_boolean_mode()
+                ),
+                select(DataSet.ds_meta_data_id.label("id"))
+                .join(FeatureModel, FeatureModel.data_set_id == DataSet.id)
+                .join(FMMetaData, FMMetaData.id == FeatureModel.fm_meta_data_id)
+                .where(
+                    match(FMMetaData.uvl_filename, FMMetaData.title, FMMetaData.description,
+                          FMMetaData.publication_doi, FMMetaData.tags, against=against).in_boolean_mode()
+                ),
+            ).subquery("fulltext_hits")
+            filters.append(DSMetaData.id.in_(select(hits.c.id)))
+        return filters
+
     def advanced_filter(self, query: query.Query, min_creation_date=None, max_creation_date=None,
                         min_size=None, max_size=None, min_features=None, max_features=None,
                         min_models=None, max_models=None, **kwargs):
@@ -33,32 +110,29 @@ class ExploreRepository(BaseRepository):
             query = query.filter(DSMetrics.number_of_models >= int(min_models))
         if max_models:
             query = query.filter(DSMetrics.number_of_models <= int(max_models))
-        # GROUP BY DATASET
-        query = query.group_by(DataSet.id)
+        # DataSet summary (indexed, denormalized from the files)
         if min_size:
-            query = query.having(func.sum(Hubfile.size) >= min_size)
+            query = query.filter(DataSet.total_size_bytes >= int(min_size))
         if max_size:
-            query = query.having(func.sum(Hubfile.size) <= max_size)
+            query = query.filter(DataSet.total_size_bytes <= int(max_size))
+        # GROUP BY DATASET
+        query = query.group_by(DataSet.id)
         return query
 
-    def filter(self, query="", sorting="newest", publication_type="any", tags=[], **kwargs):
+    def build_query(self, query="", publication_type="any", tags=[], search_mode=None, **kwargs):
         # Normalize and remove unwanted characters
         normalized_query = unidecode.unidecode(query).lower()
         cleaned_query = re.sub(r'[,.":\'()\[\]^;!¡¿?]', "", normalized_query)
+        words = cleaned_query.split()
 
-        filters = []
-        for word in cleaned_query.split():
-            filters.append(DSMetaData.title.ilike(f"%{word}%"))
-            filters.append(DSMetaData.description.ilike(f"%{word}%"))
-            filters.append(Author.name.ilike(f"%{word}%"))
-            filters.append(Author.affiliation.ilike(f"%{word}%"))
-            filters.append(Author.orcid.ilike(f"%{word}%"))
-            filters.append(FMMetaData.uvl_filename.ilike(f"%{word}%"))
-            filters.append(FMMetaData.title.ilike(f"%{word}%"))
-            filters.append(FMMetaData.description.ilike(f"%{word}%"))
-            filters.append(FMMetaData.publication_doi.ilike(f"%{word}%"))
-            filters.append(FMMetaData.tags.ilike(f"%{word}%"))
-            filters.append(DSMetaData.tags.ilike(f"%{word}%"))
+        if search_mode is None:
+            search_mode = current_app.config.get("EXPLORE_SEARCH_MODE", "fulltext")
+
+        # FULLTEXT indexes only exist on MySQL/MariaDB, any other backend falls back to ILIKE
+        if search_mode == "fulltext" and self.supports_fulltext():
+            filters = self.fulltext_filters(words)
+        else:
+            filters = self.like_filters(words)
 
         datasets = (
             self.model.query
@@ -66,7 +140,6 @@ class ExploreRepository(BaseRepository):
             .join(DSMetaData.authors)
             .join(DataSet.feature_models)
             .join(FeatureModel.fm_meta_data)
-            .join(FeatureModel.files)
             .join(DSMetaData.ds_metrics)
             .filter(or_(*filters))
             .filter(DSMetaData.dataset_doi.isnot(None))  # Exclude datasets with empty dataset_doi
@@ -83,14 +156,294 @@ class ExploreRepository(BaseRepository):
                 datasets = datasets.filter(DSMetaData.publication_type == matching_type.name)
 
         if tags:
-            datasets = datasets.filter(DSMetaData.tags.ilike(any_(f"%{tag}%" for tag in tags)))
+            tagged = (
+                select(ds_meta_data_tag.c.ds_meta_data_id)
+                .join(Tag, Tag.id == ds_meta_data_tag.c.tag_id)
+                .where(Tag.name.in_(Tag.parse(",".join(tags))))
+            )
+            datasets = datasets.filter(DSMetaData.id.in_(tagged))
+
+        return self.advanced_filter(datasets, **kwargs)
+
+    def filter(self, query="", sorting="newest", publication_type="any", tags=[], search_mode=None,
+               cursor=None, limit=None, **kwargs):
+        return self.filter_query(query, sorting, publication_type, tags, search_mode,
+                                 cursor=cursor, limit=limit, **kwargs).all()
 
-        datasets = self.advanced_filter(datasets, **kwargs)
+    def filter_query(self, query="", sorting="newest", publication_type="any", tags=[], search_mode=None,
+                     cursor=None, limit=None, **kwargs):
+        datasets = self.build_query(query, publication_type, tags, search_mode, **kwargs)
 
-        # Order by created_at
+        # Keyset pagination: the cursor is the (created_at, id) pair of the last dataset already served
         if sorting == "oldest":
-            datasets = datasets.order_by(self.model.created_at.asc())
+            if cursor:
+                created_at, id = cursor
+                datasets = datasets.filter(or_(
+                    self.model.created_at > created_at,
+                    and_(self.model.created_at == created_at, self.model.id > id)
+                ))
+            datasets = datasets.order_by(self.model.created_at.asc(), self.model.id.asc())
         else:
-            datasets = datasets.order_by(self.model.created_at.desc())
+            if cursor:
+                created_at, id = cursor
+                datasets = datasets.filter(or_(
+                    self.model.created_at < created_at,
+                    and_(self.model.created_at == created_at, self.model.id < id)
+                ))
+            datasets = datasets.order_by(self.model.created_at.desc(), self.model.id.desc())
 
-        return datasets.all()
+        if limit:
+            datasets = datasets.limit(limit)
+
+        return datasets
+
+    def count_filtered(self, query="", publication_type="any", tags=[], search_mode=None, **kwargs) -> int:
+        return self.build_query(query, publication_type, tags, search_mode, **kwargs).order_by(None).count()
+
+    def bucket_counts(self, column, bounds, matching) -> list[dict]:
+        bucket = case(
+            *((column < upper, index) for index, upper in enumerate(bounds[1:])),
+            else_=len(bounds) - 1,
+        ).label("bucket")
+        rows = (
+            self.session.query(bucket, func.count(DataSet.id))
+            .select_from(DataSet)
+            .join(DataSet.ds_meta_data)
+            .join(DSMetaData.ds_metrics)
+            .filter(matching, column.isnot(None))
+            .group_by(bucket)
+            .all()
+        )
+        counts = dict(rows)
+        # Bounds are inclusive so they can be sent back as min_*/max_* filters
+        return [
+            {"min": lower, "max": bounds[index + 1] - 1 if index + 1 < len(bounds) else None,
+             "count": counts.get(index, 0)}
+            for index, lower in enumerate(bounds)
+        ]
+
+    def facets(self, query="", publication_type="any", tags=[], search_mode=None, **kwargs) -> dict:
+        ids = self.build_query(query, publication_type, tags, search_mode, **kwargs)
+        ids = ids.with_entities(DataSet.id).order_by(None).subquery()
+        matching = DataSet.id.in_(select(ids.c.id))
+
+        publication_types = (
+            self.session.query(DSMetaData.publication_type, func.count(DataSet.id))
+            .select_from(DataSet)
+            .join(DataSet.ds_meta_data)
+            .filter(matching)
+            .group_by(DSMetaData.publication_type)
+            .order_by(func.count(DataSet.id).desc())
+            .all()
+        )
+        tag_counts = (
+            self.session.query(Tag.name, func.count(DataSet.id))
+            .select_from(DataSet)
+            .join(ds_meta_data_tag, ds_meta_data_tag.c.ds_meta_data_id == DataSet.ds_meta_data_id)
+            .join(Tag, Tag.id == ds_meta_data_tag.c.tag_id)
+            .filter(matching)
+            .group_by(Tag.id, Tag.name)
+            .order_by(func.count(DataSet.id).desc(), Tag.name)
+            .all()
+        )
+        communities = (
+            self.session.query(Community.id, Community.name, func.count(DataSet.id))
+            .select_from(DataSet)
+            .join(DataSet.community)
+            .filter(matching)
+            .group_by(Community.id, Community.name)
+            .order_by(func.count(DataSet.id).desc(), Community.name)
+            .all()
+        )
+
+        return {
+            "publication_type": [
+                {"value": publication_type.value, "count": count} for publication_type, count in publication_types
+            ],
+            "tags": [{"name": name, "count": count} for name, count in tag_counts],
+            "communities": [{"id": id, "name": name, "count": count} for id, name, count in communities],
+            "size": self.bucket_counts(DataSet.total_size_bytes, SIZE_BUCKETS, matching),
+            "features": self.bucket_counts(DSMetrics.number_of_features, FEATURES_BUCKETS, matching),
+        }
+
+    def suggestion_sources(self, ds_meta_data_ids=None) -> list[tuple[str, str]]:
+        """(kind, text) pairs of the published datasets (optionally only some of them) for the suggestion index."""
+        def published(query):
+            query = query.filter(DSMetaData.dataset_doi.isnot(None))
+            if ds_meta_data_ids is not None:
+                query = query.filter(DSMetaData.id.in_(ds_meta_data_ids))
+            return query.all()
+
+        titles = published(self.session.query(DSMetaData.title))
+        authors = published(self.session.query(Author.name).join(DSMetaData, Author.ds_meta_data_id == DSMetaData.id))
+        tag_names = published(
+            self.session.query(Tag.name)
+            .join(ds_meta_data_tag, ds_meta_data_tag.c.tag_id == Tag.id)
+            .join(DSMetaData, DSMetaData.id == ds_meta_data_tag.c.ds_meta_data_id)
+        )
+        uvl_filenames = published(
+            self.session.query(FMMetaData.uvl_filename)
+            .join(FeatureModel, FeatureModel.fm_meta_data_id == FMMetaData.id)
+            .join(DataSet, DataSet.id == FeatureModel.data_set_id)
+            .join(DSMetaData, DSMetaData.id == DataSet.ds_meta_data_id)
+        )
+
+        return (
+            [("title", title) for title, in titles]
+            + [("author", name) for name, in authors]
+            + [("tag", name) for name, in tag_names]
+            + [("uvl_filename", filename) for filename, in uvl_filenames]
+        )
+
+    def search_fields(self, dataset: DataSet) -> dict:
+        ds_meta_data = dataset.ds_meta_data
+        fm_meta_data = [fm.fm_meta_data for fm in dataset.feature_models if fm.fm_meta_data]
+        return {
+            "title": ds_meta_data.title,
+            "description": ds_meta_data.description,
+            "tags": ds_meta_data.tags,
+            "authors": " ".join(f"{author.name} {author.affiliation or ''}" for author in ds_meta_data.authors),
+            "feature_models": " ".join(
+                f"{fm.uvl_filename} {fm.title} {fm.description} {fm.tags or ''}" for fm in fm_meta_data
+            ),
+        }
+
+    def index_datasets(self, dataset_ids: list[int], commit: bool = True):
+        """(Re)builds the search index rows (term frequencies and field lengths) of the given datasets."""
+        if not dataset_ids:
+            return
+        datasets = (
+            self.model.query.options(
+                joinedload(DataSet.ds_meta_data).selectinload(DSMetaData.authors),
+                selectinload(DataSet.feature_models).joinedload(FeatureModel.fm_meta_data),
+            )
+            .filter(DataSet.id.in_(dataset_ids))
+            .all()
+        )
+
+        documents, terms = [], []
+        for dataset in datasets:
+            for field, text in self.search_fields(dataset).items():
+                tokens = tokenize(text)
+                documents.append({"data_set_id": dataset.id, "field": field, "length": len(tokens)})
+                terms.extend(
+                    {"data_set_id": dataset.id, "field": field, "term": term, "tf": tf}
+                    for term, tf in Counter(tokens).items()
+                )
+
+        self.replace_index_rows(dataset_ids, documents, terms)
+        if commit:
+            self.session.commit()
+
+    def unindex_datasets(self, dataset_ids: list[int], commit: bool = True):
+        """Removes the search index rows of datasets about to be deleted."""
+        if not dataset_ids:
+            return
+        self.replace_index_rows(dataset_ids, [], [])
+        if commit:
+            self.session.commit()
+
+    def replace_index_rows(self, dataset_ids, documents, terms):
+        """Swaps the index rows of dataset_ids for the given ones, applying the difference to the statistics."""
+        df_deltas = Counter((term["term"], term["field"]) for term in terms)
+        df_deltas.subtract(
+            dict(
+                ((term, field), count)
+                for term, field, count in self.session.query(SearchTerm.term, SearchTerm.field, func.count())
+                .filter(SearchTerm.data_set_id.in_(dataset_ids))
+                .group_by(SearchTerm.term, SearchTerm.field)
+            )
+        )
+        field_deltas = defaultdict(Counter)
+        for document in documents:
+            field_deltas[(document["field"],)].update(documents=1, total_length=document["length"])
+        old_fields = (
+            self.session.query(SearchDocument.field, func.count(), func.sum(SearchDocument.length))
+            .filter(SearchDocument.data_set_id.in_(dataset_ids))
+            .group_by(SearchDocument.field)
+        )
+        for field, count, length in old_fields:
+            field_deltas[(field,)].subtract(documents=count, total_length=int(length or 0))
+
+        self.session.execute(delete(SearchTerm).where(SearchTerm.data_set_id.in_(dataset_ids)))
+        self.session.execute(delete(SearchDocument).where(SearchDocument.data_set_id.in_(dataset_ids)))
+        if documents:
+            self.session.execute(insert(SearchDocument), documents)
+        if terms:
+            self.session.execute(insert(SearchTerm), terms)
+
+        self.add_to_statistics(SearchTermStats, {key: {"df": delta} for key, delta in df_deltas.items()}, "df")
+        self.add_to_statistics(SearchFieldStats, field_deltas, "documents")
+
+    def add_to_statistics(self, model, deltas: dict, count_column: str):
+        """Adds deltas ({primary key: {column: delta}}) to the rows of model, creating the missing ones.
+
+        Rows whose count_column drops to zero are deleted. The rows are locked while they change, so concurrent
+        indexing adds up instead of overwriting each other.
+        """
+        deltas = {key: delta for key, delta in deltas.items() if any(delta.values())}
+        if not deltas:
+            return
+        key_columns = model.__mapper__.primary_key
+        in_keys = tuple_(*key_columns).in_(list(deltas))
+
+        existing = {tuple(key) for key in self.session.query(*key_columns).filter(in_keys)}
+        missing = [
+            {**{column.key: value for column, value in zip(key_columns, key)}, **{column: 0 for column in delta}}
+            for key, delta in deltas.items()
+            if key not in existing
+        ]
+        if missing:
+            try:
+                with self.session.begin_nested():
+                    self.session.execute(insert(model), missing)
+            except IntegrityError:
+                # Another worker created some of them first
+                return self.add_to_statistics(model, deltas, count_column)
+
+        rows = self.session.query(model).filter(in_keys).order_by(*key_columns).with_for_update().populate_existing()
+        updated = set()
+        for row in rows:
+            key = tuple(getattr(row, column.key) for column in key_columns)
+            for name, delta in deltas[key].items():
+                setattr(row, name, getattr(row, name) + delta)
+            if getattr(row, count_column) <= 0:
+                self.session.delete(row)
+            updated.add(key)
+
+        deleted = {key: delta for key, delta in deltas.items() if key not in updated}
+        if deleted:
+            # Another worker dropped them since they were looked up
+            self.add_to_statistics(model, deleted, count_column)
+
+    def corpus_statistics(self) -> tuple[int, dict]:
+        stats = self.session.query(SearchFieldStats).all()
+        total_documents = max((field.documents for field in stats), default=0)
+        return total_documents, {field.field: field.total_length / field.documents for field in stats}
+
+    def document_frequencies(self, terms: list[str]) -> dict:
+        """Number of datasets with each term, per field: {(term, field): df}."""
+        return {
+            (term, field): df
+            for term, field, df in self.session.query(SearchTermStats.term, SearchTermStats.field, SearchTermStats.df)
+            .filter(SearchTermStats.term.in_(terms))
+        }
+
+    def relevance_candidates(self, query="", publication_type="any", tags=[], search_mode=None, **kwargs):
+        """Ids (and creation dates) of the datasets matching the criteria, plus the postings of `terms` in them."""
+        candidates = self.build_query(query, publication_type, tags, search_mode, **kwargs)
+        candidates = candidates.with_entities(DataSet.id, DataSet.created_at).order_by(None)
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return candidates.all(), []
+
+        candidate_ids = candidates.with_entities(DataSet.id).subquery()
+        postings = (
+            self.session.query(SearchTerm.data_set_id, SearchTerm.field, SearchTerm.term, SearchTerm.tf,
+                               SearchDocument.length)
+            .join(SearchDocument, and_(SearchDocument.data_set_id == SearchTerm.data_set_id,
+                                       SearchDocument.field == SearchTerm.field))
+            .filter(SearchTerm.term.in_(terms), SearchTerm.data_set_id.in_(select(candidate_ids.c.id)))
+            .all()
+        )
+        return candidates.all(), postings
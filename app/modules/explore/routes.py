@@ -1,8 +1,10 @@
-from flask import render_template, request, jsonify
+from flask import current_app, render_template, request, jsonify
 
+from app.modules.dataset.services import DataSetService, TagService
 from app.modules.explore import explore_bp
 from app.modules.explore.forms import ExploreForm
 from app.modules.explore.services import ExploreService
+from core.serialisers.ndjson import ndjson_response, wants_ndjson
 
 
 @explore_bp.route('/explore', methods=['GET', 'POST'])
@@ -14,5 +16,46 @@ def index():
 
     if request.method == 'POST':
         criteria = request.get_json(cache=False, force=True)
-        datasets = ExploreService().filter(**criteria)
-        return jsonify([dataset.to_dict() for dataset in datasets])
+
+        if wants_ndjson():
+            # Every matching dataset, one per line, without building the whole result in memory
+            try:
+                dataset_ids = ExploreService().stream_ids(**criteria)
+            except ValueError as exc:
+                return jsonify({"message": str(exc)}), 400
+            batch_size = current_app.config.get("STREAM_BATCH_SIZE", 100)
+            return ndjson_response(DataSetService().serialize_stream(dataset_ids, batch_size))
+
+        try:
+            page = ExploreService().paginate(**criteria)
+        except ValueError as exc:
+            return jsonify({"message": str(exc)}), 400
+
+        return jsonify({
+            "datasets": DataSetService().serialize_many(page["dataset_ids"]),
+            "next_cursor": page["next_cursor"],
+            "total": page["total"],
+        })
+
+
+@explore_bp.route('/explore/facets', methods=['POST'])
+def facets():
+    criteria = request.get_json(cache=False, force=True)
+    try:
+        return jsonify(ExploreService().facets(**criteria))
+    except ValueError as exc:
+        return jsonify({"message": str(exc)}), 400
+
+
+@explore_bp.route('/explore/tags', methods=['GET'])
+def tags():
+    return jsonify(TagService().count_by_dataset())
+
+
+@explore_bp.route('/explore/suggest', methods=['GET'])
+def suggest():
+    try:
+        suggestions = ExploreService().suggest(request.args.get('q', ''), request.args.get('limit'))
+    except ValueError as exc:
+        return jsonify({"message": str(exc)}), 400
+    return jsonify({"suggestions": suggestions})
@@ -1,10 +1,216 @@
-from app.modules.explore.repositories import ExploreRepository
+import base64
+import json
+import math
+import time
+from collections import defaultdict
+from datetime import datetime
+
+from flask import current_app
+
+from app.modules.dataset.models import DataSet, Tag
+from app.modules.explore.repositories import ExploreRepository, tokenize
+from core.caches.lru_cache import LRUCache
+from core.caches.prefix_index import PrefixIndex
 from core.services.BaseService import BaseService
 
 
+def encode_cursor(created_at: datetime, id: int) -> str:
+    payload = json.dumps([created_at.isoformat(), id])
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+
+def decode_cursor(cursor: str):
+    try:
+        created_at, id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(created_at), int(id)
+    except (ValueError, TypeError) as exc:
+        raise ValueError("Invalid cursor") from exc
+
+
+def encode_offset_cursor(offset: int) -> str:
+    return base64.urlsafe_b64encode(json.dumps([offset]).encode()).decode()
+
+
+def decode_offset_cursor(cursor: str) -> int:
+    try:
+        offset, = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return max(int(offset), 0)
+    except (ValueError, TypeError) as exc:
+        raise ValueError("Invalid cursor") from exc
+
+
+def normalize_criteria(criteria: dict) -> str:
+    """Builds a cache key that is equal for criteria returning the same results (case, spacing, tag order...)."""
+    normalized = {
+        key: value for key, value in criteria.items() if value not in (None, "", []) and key != "csrf_token"
+    }
+    if "query" in normalized:
+        normalized["query"] = " ".join(str(normalized["query"]).lower().split())
+    if "tags" in normalized:
+        normalized["tags"] = sorted(Tag.parse(",".join(normalized["tags"])))
+    if normalized.get("publication_type") == "any":
+        del normalized["publication_type"]
+    return json.dumps(normalized, sort_keys=True, default=str)
+
+
+def get_explore_cache() -> LRUCache:
+    if "explore_cache" not in current_app.extensions:
+        current_app.extensions["explore_cache"] = LRUCache(
+            max_size=current_app.config.get("EXPLORE_CACHE_SIZE", 256),
+            ttl=current_app.config.get("EXPLORE_CACHE_TTL", 60),
+        )
+    return current_app.extensions["explore_cache"]
+
+
+def invalidate_explore_cache():
+    get_explore_cache().clear()
+
+
+def get_suggestion_index() -> PrefixIndex:
+    # Built on first use, then kept up to date by add_to_suggestion_index. That only reaches this process, so the
+    # index is rebuilt from the database once it is older than EXPLORE_CACHE_TTL to pick up other workers' changes
+    entry = current_app.extensions.get("explore_suggestions")
+    if entry is None or time.monotonic() >= entry[1]:
+        index = PrefixIndex()
+        index.extend(ExploreRepository().suggestion_sources())
+        entry = (index, time.monotonic() + current_app.config.get("EXPLORE_CACHE_TTL", 60))
+        current_app.extensions["explore_suggestions"] = entry
+    return entry[0]
+
+
+def add_to_suggestion_index(ds_meta_data_id: int):
+    if "explore_suggestions" in current_app.extensions:
+        index, _ = current_app.extensions["explore_suggestions"]
+        index.extend(ExploreRepository().suggestion_sources([ds_meta_data_id]))
+
+
+def invalidate_suggestion_index():
+    current_app.extensions.pop("explore_suggestions", None)
+
+
+# BM25 parameters and per-field weights for sorting="relevance"
+BM25_K1 = 1.2
+BM25_B = 0.75
+BM25_FIELD_WEIGHTS = {"title": 3.0, "tags": 2.0, "authors": 2.0, "description": 1.0, "feature_models": 1.0}
+
+
 class ExploreService(BaseService):
     def __init__(self):
         super().__init__(ExploreRepository())
 
-    def filter(self, query="", sorting="newest", publication_type="any", tags=[], **kwargs):
-        return self.repository.filter(query, sorting, publication_type, tags, **kwargs)
+    def filter(self, query="", sorting="newest", publication_type="any", tags=[], search_mode=None,
+               cursor=None, limit=None, **kwargs):
+        return self.repository.filter(query, sorting, publication_type, tags, search_mode,
+                                      cursor=cursor, limit=limit, **kwargs)
+
+    def cached(self, key, compute):
+        # A TTL of 0 disables the cache
+        if not current_app.config.get("EXPLORE_CACHE_TTL", 60):
+            return compute()
+
+        cache = get_explore_cache()
+        value = cache.get(key)
+        if value is None:
+            value = compute()
+            cache.set(key, value)
+        return value
+
+    def paginate(self, cursor=None, limit=None, include_total=False, sorting="newest", **criteria) -> dict:
+        page_size = current_app.config.get("EXPLORE_PAGE_SIZE", 50)
+        max_page_size = current_app.config.get("EXPLORE_MAX_PAGE_SIZE", 200)
+        limit = min(int(limit), max_page_size) if limit else page_size
+        if limit < 1:
+            raise ValueError("Invalid limit")
+        key = normalize_criteria(criteria)
+
+        if sorting == "relevance" and tokenize(criteria.get("query", "")):
+            return self.paginate_by_relevance(key, cursor, limit, include_total, **criteria)
+
+        decoded_cursor = decode_cursor(cursor) if cursor else None
+
+        # Only (id, created_at) pairs are cached, datasets are hydrated in bulk by the caller.
+        # One extra row is fetched to know whether there is a next page without counting
+        rows = self.cached(("page", key, sorting, cursor, limit), lambda: [
+            (dataset.id, dataset.created_at)
+            for dataset in self.filter(sorting=sorting, cursor=decoded_cursor, limit=limit + 1, **criteria)
+        ])
+        has_next = len(rows) > limit
+        rows = rows[:limit]
+
+        return {
+            "dataset_ids": [id for id, _ in rows],
+            "next_cursor": encode_cursor(rows[-1][1], rows[-1][0]) if has_next else None,
+            "total": self.cached(("total", key), lambda: self.repository.count_filtered(**criteria))
+            if include_total else None,
+        }
+
+    def stream_ids(self, cursor=None, limit=None, include_total=False, sorting="newest", **criteria):
+        """
+        Ids of every matching dataset (from the cursor on, up to limit), fetched in keyset batches so memory is
+        bounded by the batch size. Arguments are validated before the first batch is requested.
+        """
+        batch_size = current_app.config.get("STREAM_BATCH_SIZE", 100)
+        limit = int(limit) if limit else None
+
+        if sorting == "relevance" and tokenize(criteria.get("query", "")):
+            offset = decode_offset_cursor(cursor) if cursor else 0
+            ranking = self.cached(("ranking", normalize_criteria(criteria)), lambda: self.rank(**criteria))
+            return iter(ranking[offset:offset + limit if limit else None])
+
+        def generate(cursor, remaining):
+            while remaining is None or remaining > 0:
+                size = batch_size if remaining is None else min(batch_size, remaining)
+                rows = (
+                    self.repository.filter_query(sorting=sorting, cursor=cursor, limit=size, **criteria)
+                    .with_entities(DataSet.id, DataSet.created_at)
+                    .all()
+                )
+                yield from (id for id, _ in rows)
+                if len(rows) < size:
+                    return
+                cursor = (rows[-1][1], rows[-1][0])
+                if remaining is not None:
+                    remaining -= len(rows)
+
+        return generate(decode_cursor(cursor) if cursor else None, limit)
+
+    def paginate_by_relevance(self, key, cursor, limit, include_total, **criteria) -> dict:
+        # The whole ranking is cached, pages are slices of it and the cursor is an offset
+        offset = decode_offset_cursor(cursor) if cursor else 0
+        ranking = self.cached(("ranking", key), lambda: self.rank(**criteria))
+
+        return {
+            "dataset_ids": ranking[offset:offset + limit],
+            "next_cursor": encode_offset_cursor(offset + limit) if len(ranking) > offset + limit else None,
+            "total": len(ranking) if include_total else None,
+        }
+
+    def rank(self, query="", **criteria) -> list[int]:
+        """Ids of the datasets matching the criteria, best BM25 score first (newest first on ties)."""
+        candidates, postings = self.repository.relevance_candidates(query, **criteria)
+        total_documents, average_lengths = self.cached(("corpus_statistics",), self.repository.corpus_statistics)
+        document_frequencies = self.repository.document_frequencies(list({posting.term for posting in postings}))
+
+        scores = defaultdict(float)
+        for data_set_id, field, term, tf, length in postings:
+            df = document_frequencies.get((term, field), 0)
+            idf = math.log(1 + (total_documents - df + 0.5) / (df + 0.5))
+            norm = 1 - BM25_B + BM25_B * length / (average_lengths.get(field) or 1)
+            scores[data_set_id] += BM25_FIELD_WEIGHTS.get(field, 1.0) * idf * tf * (BM25_K1 + 1) / (tf + BM25_K1 * norm)
+
+        candidates = sorted(candidates, key=lambda candidate: (candidate[1], candidate[0]), reverse=True)
+        return [id for id, _ in sorted(candidates, key=lambda candidate: scores[candidate[0]], reverse=True)]
+
+    def index_datasets(self, dataset_ids: list[int]):
+        self.repository.index_datasets(dataset_ids)
+
+    def facets(self, cursor=None, limit=None, include_total=False, sorting=None, **criteria) -> dict:
+        # Facets describe the whole result set, so paging arguments are accepted and ignored
+        return self.repository.facets(**criteria)
+
+    def suggest(self, q: str, limit=None) -> list[dict]:
+        default_limit = current_app.config.get("EXPLORE_SUGGEST_LIMIT", 10)
+        limit = min(int(limit), default_limit) if limit else default_limit
+        if limit < 1:
+            raise ValueError("Invalid limit")
+        return [{"text": text, "type": kind} for text, kind in get_suggestion_index().search(q, limit)]
@@ -1,9 +1,15 @@
+import json
 import os
+import time
 from dotenv import load_dotenv
 import pytest
+from sqlalchemy import event, text
 from app import db
 from app.modules.auth.models import User
-from app.modules.dataset.models import Author, DSMetaData, DSMetrics, DataSet, PublicationType
+from app.modules.dataset.models import Author, DSMetaData, DSMetrics, DataSet, PublicationType, Tag
+from app.modules.dataset.repositories import DataSetRepository
+from app.modules.dataset.services import TagService
+from app.modules.explore.repositories import ExploreRepository
 from datetime import datetime
 
 from app.modules.featuremodel.models import FMMetaData, FeatureModel
@@ -41,7 +47,7 @@ def test_client(test_client):
                 publication_type=PublicationType.DATA_MANAGEMENT_PLAN,
                 publication_doi=f'10.1234/dataset{i+1}',
                 dataset_doi=f'10.1234/dataset{i+1}',
-                tags='tag1, tag2',
+                tags='tag1, tag2, Featured' if i == 0 else 'tag1, tag2',
                 ds_metrics_id=ds_metrics_list[i-2].id if i in range(3, 7) else ds_metrics_list[0].id
             ) for i in range(7)
         ]
@@ -130,6 +136,10 @@ def test_client(test_client):
         db.session.add_all(uvl_files)
         db.session.commit()
 
+        DataSetRepository().refresh_summaries()
+        TagService().backfill()
+        ExploreRepository().index_datasets([dataset.id for dataset in datasets])
+
     yield test_client
 
 
@@ -141,61 +151,468 @@ def got_all_datasets_except(json, *args):
 def test_no_filters(test_client):
     response = test_client.post("/explore", data='{}')
     assert response.status_code == 200
-    json = response.json
+    json = response.json["datasets"]
     assert len(json) == 7
 
 
 def test_filter_by_start_date(test_client):
     response = test_client.post("/explore", data='{"min_creation_date":"2024-12-10"}')
     assert response.status_code == 200
-    json = response.json
+    json = response.json["datasets"]
     assert got_all_datasets_except(json, 2)
 
 
 def test_filter_by_end_date(test_client):
     response = test_client.post("/explore", data='{"max_creation_date":"2024-12-10"}')
     assert response.status_code == 200
-    json = response.json
+    json = response.json["datasets"]
     assert got_all_datasets_except(json, 3)
 
 
 def test_filter_by_min_size(test_client):
     response = test_client.post("/explore", data='{"min_size":751}')
     assert response.status_code == 200
-    json = response.json
+    json = response.json["datasets"]
     assert got_all_datasets_except(json, 6)
 
 
 def test_filter_by_max_size(test_client):
     response = test_client.post("/explore", data='{"max_size":1242}')
     assert response.status_code == 200
-    json = response.json
+    json = response.json["datasets"]
     assert got_all_datasets_except(json, 7)
 
 
 def test_filter_by_min_models(test_client):
     response = test_client.post("/explore", data='{"min_models":2}')
     assert response.status_code == 200
-    json = response.json
+    json = response.json["datasets"]
     assert got_all_datasets_except(json, 4)
 
 
 def test_filter_by_max_models(test_client):
     response = test_client.post("/explore", data='{"max_models":2}')
     assert response.status_code == 200
-    json = response.json
+    json = response.json["datasets"]
     assert got_all_datasets_except(json, 5)
 
 
 def test_filter_by_min_features(test_client):
     response = test_client.post("/explore", data='{"min_features":20}')
     assert response.status_code == 200
-    json = response.json
+    json = response.json["datasets"]
     assert got_all_datasets_except(json, 6)
 
 
 def test_filter_by_max_features(test_client):
     response = test_client.post("/explore", data='{"max_features":20}')
     assert response.status_code == 200
-    json = response.json
+    json = response.json["datasets"]
     assert got_all_datasets_except(json, 5, 7)
+
+
+def test_search_by_query(test_client):
+    response = test_client.post("/explore", data='{"query":"sample"}')
+    assert response.status_code == 200
+    json = response.json["datasets"]
+    assert got_all_datasets_except(json)
+
+
+def test_search_by_query_without_matches(test_client):
+    response = test_client.post("/explore", data='{"query":"nonexistentword"}')
+    assert response.status_code == 200
+    assert response.json["datasets"] == []
+
+
+def test_search_by_stopword(test_client):
+    # "for" is an InnoDB stopword, only in descriptions ("Description for dataset N")
+    response = test_client.post("/explore", data='{"query":"for"}')
+    assert response.status_code == 200
+    assert got_all_datasets_except(response.json["datasets"])
+
+
+def test_fulltext_uses_indexes(test_client):
+    repository = ExploreRepository()
+    if not repository.supports_fulltext():
+        pytest.skip("FULLTEXT indexes need MySQL/MariaDB")
+
+    statement = repository.filter_query(query="sample author").statement
+    sql = str(statement.compile(dialect=db.engine.dialect, compile_kwargs={"literal_binds": True}))
+    plan = db.session.execute(text(f"EXPLAIN {sql}")).mappings().all()
+    # One FULLTEXT index access per table with a MATCH, instead of evaluating it on every joined row
+    fulltext_tables = sorted(row["table"] for row in plan if row["type"] == "fulltext")
+    assert fulltext_tables == ["author", "ds_meta_data", "fm_meta_data"]
+
+
+def test_search_by_query_like_fallback(test_client):
+    response = test_client.post("/explore", data='{"query":"sample", "search_mode":"like"}')
+    assert response.status_code == 200
+    json = response.json["datasets"]
+    assert got_all_datasets_except(json)
+
+
+def test_paginate_with_cursor(test_client):
+    response = test_client.post("/explore", data='{"limit":3, "include_total":true}')
+    assert response.status_code == 200
+    json = response.json
+    assert [ds["id"] for ds in json["datasets"]] == [3, 7, 6]
+    assert json["total"] == 7
+    assert json["next_cursor"]
+
+    response = test_client.post("/explore", data=f'{{"limit":3, "cursor":"{json["next_cursor"]}"}}')
+    assert response.status_code == 200
+    json = response.json
+    assert [ds["id"] for ds in json["datasets"]] == [5, 4, 1]
+    assert json["total"] is None
+
+    response = test_client.post("/explore", data=f'{{"limit":3, "cursor":"{json["next_cursor"]}"}}')
+    assert response.status_code == 200
+    json = response.json
+    assert [ds["id"] for ds in json["datasets"]] == [2]
+    assert json["next_cursor"] is None
+
+
+def test_paginate_oldest_first(test_client):
+    response = test_client.post("/explore", data='{"limit":2, "sorting":"oldest"}')
+    assert response.status_code == 200
+    json = response.json
+    assert [ds["id"] for ds in json["datasets"]] == [2, 1]
+
+    response = test_client.post("/explore", data=f'{{"limit":2, "sorting":"oldest", "cursor":"{json["next_cursor"]}"}}')
+    assert response.status_code == 200
+    assert [ds["id"] for ds in response.json["datasets"]] == [4, 5]
+
+
+def test_paginate_invalid_cursor(test_client):
+    response = test_client.post("/explore", data='{"cursor":"not-a-cursor"}')
+    assert response.status_code == 400
+
+
+def test_dataset_summaries(test_client):
+    dataset = DataSet.query.get(5)
+    assert dataset.feature_models_count == 3
+    assert dataset.files_count == 3
+    assert dataset.total_size_bytes == sum(file.size for fm in dataset.feature_models for file in fm.files)
+
+
+def test_filter_by_tags(test_client):
+    response = test_client.post("/explore", data='{"tags":["featured"]}')
+    assert response.status_code == 200
+    assert [ds["id"] for ds in response.json["datasets"]] == [1]
+    assert response.json["datasets"][0]["tags"] == ["featured", "tag1", "tag2"]
+
+    response = test_client.post("/explore", data='{"tags":["Featured", "tag2"]}')
+    assert response.status_code == 200
+    assert got_all_datasets_except(response.json["datasets"])
+
+
+def test_tag_counts(test_client):
+    response = test_client.get("/explore/tags")
+    assert response.status_code == 200
+    assert response.json == [
+        {"name": "tag1", "count": 7},
+        {"name": "tag2", "count": 7},
+        {"name": "featured", "count": 1},
+    ]
+
+
+def test_tag_created_concurrently(test_client):
+    from unittest import mock
+    from sqlalchemy import insert
+    from app.modules.dataset.repositories import TagRepository
+
+    repository = TagRepository()
+    create = repository.create
+
+    def create_after_another_worker(commit=True, **kwargs):
+        # Another worker commits the same tag between the lookup and the insert
+        with db.engine.begin() as connection:
+            connection.execute(insert(Tag).values(name=kwargs["name"]))
+        return create(commit=commit, **kwargs)
+
+    with mock.patch.object(repository, "create", side_effect=create_after_another_worker) as spy:
+        tags = repository.get_or_create_many(["tag1", "concurrent"])
+    assert [tag.name for tag in tags] == ["tag1", "concurrent"]
+    assert spy.call_count == 1
+    assert Tag.query.filter_by(name="concurrent").count() == 1
+
+    Tag.query.filter_by(name="concurrent").delete()
+    db.session.commit()
+
+
+def test_facets(test_client):
+    response = test_client.post("/explore/facets", data='{}')
+    assert response.status_code == 200
+    facets = response.json
+    assert facets["publication_type"] == [{"value": "datamanagementplan", "count": 7}]
+    assert facets["tags"][-1] == {"name": "featured", "count": 1}
+    assert facets["communities"] == []
+
+    sizes = [dataset.total_size_bytes for dataset in DataSet.query.all()]
+    for bucket in facets["size"]:
+        upper = bucket["max"] if bucket["max"] is not None else max(sizes)
+        assert bucket["count"] == len([size for size in sizes if bucket["min"] <= size <= upper])
+    assert sum(bucket["count"] for bucket in facets["features"]) == 7
+
+
+def test_facets_follow_criteria(test_client):
+    response = test_client.post("/explore/facets", data='{"min_size":751, "limit":1, "cursor":"ignored"}')
+    assert response.status_code == 200
+    assert response.json["publication_type"] == [{"value": "datamanagementplan", "count": 6}]
+    assert sum(bucket["count"] for bucket in response.json["size"]) == 6
+
+
+def test_sort_by_relevance(test_client):
+    response = test_client.post("/explore", data='{"query":"featured dataset", "sorting":"relevance", "limit":3, '
+                                                 '"include_total":true}')
+    assert response.status_code == 200
+    json = response.json
+    # Ties (every other dataset matches "dataset" the same way) keep newest first
+    assert [ds["id"] for ds in json["datasets"]] == [1, 3, 7]
+    assert json["total"] == 7
+
+    response = test_client.post("/explore", data=f'{{"query":"featured dataset", "sorting":"relevance", "limit":3, '
+                                                 f'"cursor":"{json["next_cursor"]}"}}')
+    assert [ds["id"] for ds in response.json["datasets"]] == [6, 5, 4]
+    assert response.json["next_cursor"] is not None
+
+    response = test_client.post("/explore", data='{"query":"sample 4", "sorting":"relevance"}')
+    assert [ds["id"] for ds in response.json["datasets"]][0] == 4
+
+
+def test_sort_by_relevance_without_query_is_newest_first(test_client):
+    response = test_client.post("/explore", data='{"sorting":"relevance"}')
+    assert [ds["id"] for ds in response.json["datasets"]] == [3, 7, 6, 5, 4, 1, 2]
+
+
+def test_search_index_rows(test_client):
+    from app.modules.explore.models import SearchTerm
+
+    term = SearchTerm.query.filter_by(data_set_id=1, field="tags", term="featured").one()
+    assert term.tf == 1
+    assert SearchTerm.query.filter_by(data_set_id=5, field="feature_models", term="uvl").one().tf == 3
+
+
+def test_search_statistics_follow_the_index(test_client):
+    from sqlalchemy import func
+    from app.modules.explore.models import SearchFieldStats, SearchTerm, SearchTermStats
+
+    def term_stats():
+        return {(stats.term, stats.field): stats.df for stats in SearchTermStats.query}
+
+    def aggregated_term_stats():
+        rows = (
+            db.session.query(SearchTerm.term, SearchTerm.field, func.count())
+            .group_by(SearchTerm.term, SearchTerm.field)
+        )
+        return {(term, field): df for term, field, df in rows}
+
+    assert term_stats() == aggregated_term_stats()
+    assert term_stats()[("featured", "tags")] == 1
+    assert term_stats()[("dataset", "title")] == 7
+    assert db.session.get(SearchFieldStats, "title").documents == 7
+    assert ExploreRepository().corpus_statistics()[1]["title"] == 3.0
+
+    repository = ExploreRepository()
+    repository.unindex_datasets([1])
+    assert ("featured", "tags") not in term_stats()
+    assert term_stats()[("dataset", "title")] == 6
+    assert db.session.get(SearchFieldStats, "title").documents == 6
+
+    # Reindexing adds back only what changed
+    repository.index_datasets([1, 2])
+    assert term_stats() == aggregated_term_stats()
+    assert term_stats()[("featured", "tags")] == 1
+    assert db.session.get(SearchFieldStats, "title").documents == 7
+
+
+@pytest.fixture
+def small_batches(test_client):
+    test_client.application.config["STREAM_BATCH_SIZE"] = 2
+    yield
+    test_client.application.config["STREAM_BATCH_SIZE"] = 100
+
+
+def read_ndjson(response):
+    assert response.mimetype == "application/x-ndjson"
+    return [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+
+def test_stream_ndjson(test_client, small_batches):
+    headers = {"Accept": "application/x-ndjson"}
+    response = test_client.post("/explore", data='{}', headers=headers)
+    assert response.status_code == 200
+    datasets = read_ndjson(response)
+    assert [ds["id"] for ds in datasets] == [3, 7, 6, 5, 4, 1, 2]
+    assert datasets[0]["title"] == "Sample dataset 3"
+
+    response = test_client.post("/explore", data='{"sorting":"oldest", "limit":3}', headers=headers)
+    assert [ds["id"] for ds in read_ndjson(response)] == [2, 1, 4]
+
+    response = test_client.post("/explore", data='{"cursor":"not-a-cursor"}', headers=headers)
+    assert response.status_code == 400
+
+
+def test_stream_ndjson_api(test_client, small_batches):
+    response = test_client.get("/api/v1/datasets/", headers={"Accept": "application/x-ndjson"})
+    assert response.status_code == 200
+    datasets = read_ndjson(response)
+    assert [ds["dataset_id"] for ds in datasets] == list(range(1, 8))
+    assert response.get_json(silent=True) is None
+
+    response = test_client.get("/api/v1/datasets/")
+    assert [ds["dataset_id"] for ds in response.json["items"]] == list(range(1, 8))
+
+
+def test_parse_tags():
+    assert Tag.parse(" Tag1,tag2, ,TAG1 ") == ["tag1", "tag2"]
+    assert Tag.parse(None) == []
+
+
+def count_queries(test_client, data):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    db.session.expire_all()
+    event.listen(db.engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        response = test_client.post("/explore", data=data)
+    finally:
+        event.remove(db.engine, "before_cursor_execute", before_cursor_execute)
+    assert response.status_code == 200
+    return len(statements)
+
+
+def test_serialization_query_count_is_constant(test_client):
+    assert count_queries(test_client, '{"limit":1}') == count_queries(test_client, '{"limit":7}')
+
+
+def test_serialize_many_matches_to_dict(test_client):
+    from app.modules.dataset.services import DataSetService
+
+    with test_client.application.test_request_context():
+        serialized = DataSetService().serialize_many([3, 1, 2])
+        assert [ds["id"] for ds in serialized] == [3, 1, 2]
+        assert serialized == [DataSet.query.get(id).to_dict() for id in [3, 1, 2]]
+
+
+@pytest.fixture
+def explore_cache(test_client):
+    from app.modules.explore.services import get_explore_cache
+
+    app = test_client.application
+    app.config["EXPLORE_CACHE_TTL"] = 60
+    get_explore_cache().clear()
+    yield get_explore_cache()
+    get_explore_cache().clear()
+    app.config["EXPLORE_CACHE_TTL"] = 0
+
+
+def test_cache_reuses_normalized_criteria(test_client, explore_cache):
+    from app.modules.explore.services import normalize_criteria
+
+    assert normalize_criteria({"query": " Sample  Dataset", "tags": ["b", "A"], "publication_type": "any"}) == \
+        normalize_criteria({"query": "sample dataset", "tags": ["a", "b"], "min_size": ""})
+
+    first = test_client.post("/explore", data='{"query":"Sample", "limit":3}')
+    queries = count_queries(test_client, '{"query":" sample ", "limit":3}')
+    second = test_client.post("/explore", data='{"query":"sample", "limit":3}')
+    assert first.json == second.json
+    # Only the batch hydrate runs: datasets, authors, tags, feature models and files
+    assert queries == 5
+
+
+def test_cache_invalidated_on_metadata_update(test_client, explore_cache):
+    from app.modules.dataset.services import DataSetService
+
+    response = test_client.post("/explore", data='{"tags":["featured"]}')
+    assert [ds["id"] for ds in response.json["datasets"]] == [1]
+
+    dataset = DataSet.query.get(2)
+    DataSetService().update_dsmetadata(dataset.ds_meta_data_id, tags="tag1, tag2, featured")
+    try:
+        response = test_client.post("/explore", data='{"tags":["featured"]}')
+        assert {ds["id"] for ds in response.json["datasets"]} == {1, 2}
+    finally:
+        DataSetService().update_dsmetadata(dataset.ds_meta_data_id, tags="tag1, tag2")
+
+
+def test_lru_cache_eviction_and_ttl():
+    from core.caches.lru_cache import LRUCache
+
+    cache = LRUCache(max_size=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert "a" in cache and "c" in cache and "b" not in cache
+
+    cache = LRUCache(ttl=-1)
+    cache.set("a", 1)
+    assert cache.get("a") is None
+
+
+def test_suggest(test_client):
+    from app.modules.explore.services import invalidate_suggestion_index
+
+    invalidate_suggestion_index()
+    response = test_client.get("/explore/suggest?q=Sampl&limit=3")
+    assert response.status_code == 200
+    suggestions = response.json["suggestions"]
+    assert len(suggestions) == 3
+    assert all(s["type"] == "title" and s["text"].startswith("Sample dataset") for s in suggestions)
+
+    response = test_client.get("/explore/suggest?q=feat")
+    assert {"text": "featured", "type": "tag"} in response.json["suggestions"]
+
+    response = test_client.get("/explore/suggest?q=file1")
+    assert {"text": "file1.uvl", "type": "uvl_filename"} in response.json["suggestions"]
+
+    response = test_client.get("/explore/suggest?q=")
+    assert response.json["suggestions"] == []
+
+    for limit in ("-1", "0", "abc"):
+        assert test_client.get(f"/explore/suggest?q=Sampl&limit={limit}").status_code == 400
+
+
+def test_suggestion_index_expires(test_client):
+    from unittest import mock
+    from app.modules.explore import services
+
+    config = test_client.application.config
+    config["EXPLORE_CACHE_TTL"] = 60
+    try:
+        services.invalidate_suggestion_index()
+        assert test_client.get("/explore/suggest?q=zebr").json["suggestions"] == []
+
+        # Published by another worker, whose additions never reach this process' index
+        ds_meta_data = DSMetaData(title="Zebra crossings", description="Published elsewhere",
+                                  publication_type=PublicationType.NONE, dataset_doi="10.1234/zebra")
+        db.session.add(ds_meta_data)
+        db.session.commit()
+        assert test_client.get("/explore/suggest?q=zebr").json["suggestions"] == []
+
+        with mock.patch.object(services, "time") as clock:
+            clock.monotonic.return_value = time.monotonic() + 61
+            response = test_client.get("/explore/suggest?q=zebr")
+        assert response.json["suggestions"] == [{"text": "Zebra crossings", "type": "title"}]
+    finally:
+        config["EXPLORE_CACHE_TTL"] = 0
+        services.invalidate_suggestion_index()
+        db.session.delete(ds_meta_data)
+        db.session.commit()
+
+
+def test_prefix_index():
+    from core.caches.prefix_index import PrefixIndex
+
+    index = PrefixIndex()
+    index.extend([("title", "Feature Model"), ("author", "Fernández, Ana"), ("tag", "fm")])
+    index.add("title", "Feature Model")
+
+    assert index.search("mod") == [("Feature Model", "title")]
+    assert index.search("fe") == [("Feature Model", "title"), ("Fernández, Ana", "author")]
+    assert index.search("ferna") == [("Fernández, Ana", "author")]
+    assert index.search("f", limit=1) == [("Feature Model", "title")]
@@ -98,6 +98,9 @@ class FakenodoService(BaseService):
         uvl_filename = feature_model.fm_meta_data.uvl_filename
         user_id = current_user.id if user is None else user.id
         file_path = os.path.join(uploads_folder_name(), f"user_{str(user_id)}", f"dataset_{dataset.id}/", uvl_filename)
+        if feature_model.files and feature_model.files[0].sha256:
+            # Stored in the blob store, possibly shared with other datasets
+            file_path = feature_model.files[0].get_path()
 
         return {
             "id": deposition_id,
@@ -1,7 +1,7 @@
 from app import db
 from sqlalchemy import Enum as SQLAlchemyEnum
 
-from app.modules.dataset.models import Author, PublicationType
+from app.modules.dataset.models import Author, PublicationType, fm_meta_data_tag
 
 
 class FeatureModel(db.Model):
@@ -16,6 +16,11 @@ class FeatureModel(db.Model):
 
 
 class FMMetaData(db.Model):
+    __table_args__ = (
+        db.Index('ix_fm_meta_data_fulltext', 'uvl_filename', 'title', 'description', 'publication_doi', 'tags',
+                 mysql_prefix='FULLTEXT'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     uvl_filename = db.Column(db.String(120), nullable=False)
     title = db.Column(db.String(120), nullable=False)
@@ -28,6 +33,8 @@ class FMMetaData(db.Model):
     fm_metrics = db.relationship('FMMetrics', uselist=False, backref='fm_meta_data')
     authors = db.relationship('Author', backref='fm_metadata', lazy=True, cascade="all, delete",
                               foreign_keys=[Author.fm_meta_data_id])
+    # Normalized copy of `tags`, kept in sync by TagService
+    tag_list = db.relationship('Tag', secondary=fm_meta_data_tag, order_by='Tag.name', lazy=True)
 
     def __repr__(self):
         return f'FMMetaData<{self.title}'
@@ -1,3 +1,4 @@
+from app.modules.dataset.services import DataSetService
 from app.modules.featuremodel.repositories import FMMetaDataRepository, FeatureModelRepository
 from app.modules.hubfile.services import HubfileService
 from core.services.BaseService import BaseService
@@ -17,6 +18,17 @@ class FeatureModelService(BaseService):
     def count_feature_models(self):
         return self.repository.count_feature_models()
 
+    def delete(self, id):
+        feature_model = self.repository.get_by_id(id)
+        if feature_model is None:
+            return False
+        dataset_id = feature_model.data_set_id
+        self.hubfile_service.delete_with_files(feature_model, feature_model.files)
+        dataset_service = DataSetService()
+        dataset_service.refresh_summaries([dataset_id])
+        dataset_service.index_for_search([dataset_id])
+        return True
+
     class FMMetaDataService(BaseService):
         def __init__(self):
             super().__init__(FMMetaDataRepository())
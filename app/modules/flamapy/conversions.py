@@ -0,0 +1,283 @@
+import os
+import signal
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from importlib.metadata import PackageNotFoundError, version
+
+from flask import current_app
+from flamapy.metamodels.fm_metamodel.transformations import UVLReader, GlencoeWriter, SPLOTWriter
+from flamapy.metamodels.pysat_metamodel.transformations import FmToPysat, DimacsWriter
+
+from core.caches.disk_cache import DiskLRUCache
+
+
+# Writers get no path so they only render the model in memory
+
+
+def render_glencoe(fm):
+    return GlencoeWriter(None, fm).transform()
+
+
+def render_dimacs(fm):
+    return DimacsWriter(None, FmToPysat(fm).transform()).transform()
+
+
+def render_splot(fm):
+    return SPLOTWriter(None, fm).transform()
+
+
+# format -> (cached file suffix, download name suffix, renderer)
+CONVERSIONS = {
+    "glencoe": (".json", "_glencoe.txt", render_glencoe),
+    "dimacs": (".cnf", "_cnf.txt", render_dimacs),
+    "splot": (".splx", "_splot.txt", render_splot),
+}
+
+
+def flamapy_version():
+    try:
+        return version("flamapy-fw")
+    except PackageNotFoundError:
+        return "unknown"
+
+
+def get_conversion_cache() -> DiskLRUCache:
+    if "flamapy_conversions" not in current_app.extensions:
+        current_app.extensions["flamapy_conversions"] = DiskLRUCache(
+            current_app.config.get("FLAMAPY_CACHE_DIR", "cache/flamapy"),
+            max_bytes=current_app.config.get("FLAMAPY_CACHE_MAX_BYTES", 512 * 1024 * 1024),
+        )
+    return current_app.extensions["flamapy_conversions"]
+
+
+def download_name(hubfile, format):
+    return f"{hubfile.name}{CONVERSIONS[format][1]}"
+
+
+def render_file(path, formats):
+    """Parses the UVL at path once and renders it to every format.
+
+    Runs in the worker processes, so errors are returned as messages instead of raised.
+    """
+    rendered, errors = {}, {}
+    try:
+        fm = UVLReader(path).transform()
+    except Exception as e:
+        return rendered, {format: str(e) for format in formats}
+
+    for format in formats:
+        try:
+            rendered[format] = CONVERSIONS[format][2](fm)
+        except Exception as e:
+            errors[format] = str(e)
+    return rendered, errors
+
+
+class ConversionError(Exception):
+    pass
+
+
+class Deadline(BaseException):
+    # Not an Exception, so the except clauses of render_file and flamapy do not swallow it
+    pass
+
+
+def raise_deadline(signum, frame):
+    raise Deadline()
+
+
+def render_before_deadline(path, formats, timeout):
+    """render_file in a worker process, interrupted once it has run for timeout seconds.
+
+    The clock starts when the worker picks the task up, not when it was submitted, and an interrupted task frees
+    its worker for the next one.
+    """
+    signal.signal(signal.SIGALRM, raise_deadline)
+    signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        return render_file(path, formats)
+    except Deadline:
+        raise TimeoutError(f"Conversion timed out after {timeout}s")
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+
+
+class ConversionEngine:
+    """Runs UVL conversions on a bounded process pool, shared by the flamapy routes and the bulk downloads.
+
+    With max_workers=0 conversions run in the calling thread. A conversion that runs longer than the timeout is
+    interrupted in its worker and reported as failed. One still running grace seconds later (stuck outside Python
+    code, where the interruption cannot reach) gets the pool recycled, failing the tasks it had in flight.
+    """
+
+    # Seconds between checks for tasks that started running
+    POLL_INTERVAL = 0.5
+
+    def __init__(self, max_workers=None, timeout=None, grace=5):
+        self.max_workers = (os.cpu_count() or 1) if max_workers is None else max_workers
+        self.timeout = timeout
+        self.grace = grace
+        self._pool = None
+        self._lock = threading.Lock()
+
+    @property
+    def pool(self):
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.max_workers)
+            return self._pool
+
+    def shutdown(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+    def recycle(self, pool):
+        """Kills the workers of pool, if it is still the current one, so the next submission starts a fresh pool."""
+        with self._lock:
+            if self._pool is not pool:
+                return
+            self._pool = None
+        # Tasks of a killed worker fail with BrokenProcessPool
+        for process in list((getattr(pool, "_processes", None) or {}).values()):
+            process.kill()
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def submit(self, path, formats):
+        pool = self.pool
+        if self.timeout:
+            return pool, pool.submit(render_before_deadline, path, formats, self.timeout)
+        return pool, pool.submit(render_file, path, formats)
+
+    def convert_all(self, jobs, formats=tuple(CONVERSIONS), on_error=None):
+        """Yields (tag, {format: cached path}) for jobs of (tag, path, checksum), in completion order.
+
+        Models are parsed at most once and only for formats missing from the cache. If on_error is given, a
+        failing format is reported to on_error(tag, format, exception) and left out instead of raising.
+        """
+        cache = get_conversion_cache()
+        tool_version = flamapy_version()
+
+        def fail(tag, format, error):
+            if on_error is None:
+                raise error
+            on_error(tag, format, error)
+
+        def store(tag, converted, checksum, rendered, errors):
+            for format, content in rendered.items():
+                suffix = CONVERSIONS[format][0]
+                converted[format] = cache.get_or_create(
+                    (checksum, format, tool_version), lambda target: write_text(target, content), suffix=suffix
+                )
+            for format, message in errors.items():
+                fail(tag, format, ConversionError(message))
+            return converted
+
+        pending = {}
+        # When each pending task was first seen running, its worker deadline runs from about then
+        started = {}
+        expired = set()
+        jobs = iter(jobs)
+        exhausted = False
+
+        while not exhausted or pending:
+            # Keep at most one task per worker in flight
+            while not exhausted and len(pending) < max(self.max_workers, 1):
+                job = next(jobs, None)
+                if job is None:
+                    exhausted = True
+                    break
+                tag, path, checksum = job
+
+                converted, missing = {}, []
+                for format in formats:
+                    cached_path = cache.get((checksum, format, tool_version), CONVERSIONS[format][0])
+                    if cached_path is None:
+                        missing.append(format)
+                    else:
+                        converted[format] = cached_path
+
+                if not missing:
+                    yield tag, converted
+                elif self.max_workers == 0:
+                    yield tag, store(tag, converted, checksum, *render_file(path, missing))
+                else:
+                    pool, future = self.submit(path, missing)
+                    pending[future] = (tag, checksum, converted, missing, pool)
+
+            if not pending:
+                continue
+
+            timeout = None
+            if self.timeout:
+                now = time.monotonic()
+                for future in pending:
+                    if future not in started and future.running():
+                        started[future] = now
+                limit = self.timeout + self.grace
+                deadlines = [started[future] + limit for future in pending if future in started]
+                timeout = max(min(deadlines) - now, 0) if deadlines else None
+                if len(deadlines) < len(pending):
+                    timeout = min(timeout, self.POLL_INTERVAL) if timeout is not None else self.POLL_INTERVAL
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                tag, checksum, converted, missing, pool = pending.pop(future)
+                started.pop(future, None)
+                try:
+                    rendered, errors = future.result()
+                except TimeoutError as e:
+                    for format in missing:
+                        fail(tag, format, e)
+                    yield tag, converted
+                    continue
+                except Exception as e:
+                    if future in expired:
+                        expired.discard(future)
+                        for format in missing:
+                            fail(tag, format, TimeoutError(f"Conversion to {format} timed out after {self.timeout}s"))
+                        yield tag, converted
+                        continue
+                    if isinstance(e, BrokenProcessPool):
+                        # A worker died, the next submission starts a fresh pool
+                        self.recycle(pool)
+                    rendered, errors = {}, {format: str(e) for format in missing}
+                yield tag, store(tag, converted, checksum, rendered, errors)
+
+            if self.timeout:
+                now = time.monotonic()
+                for future, (_, _, _, _, pool) in list(pending.items()):
+                    if future in started and future not in expired and started[future] + limit <= now:
+                        # Its worker ignored the deadline, killing it is the only way to get the slot back
+                        expired.add(future)
+                        self.recycle(pool)
+
+
+def get_conversion_engine() -> ConversionEngine:
+    if "flamapy_engine" not in current_app.extensions:
+        current_app.extensions["flamapy_engine"] = ConversionEngine(
+            max_workers=current_app.config.get("FLAMAPY_MAX_WORKERS"),
+            timeout=current_app.config.get("FLAMAPY_CONVERSION_TIMEOUT", 60),
+            grace=current_app.config.get("FLAMAPY_CONVERSION_GRACE", 5),
+        )
+    return current_app.extensions["flamapy_engine"]
+
+
+def convert_many(path, checksum, formats=tuple(CONVERSIONS), on_error=None):
+    """Returns {format: cached path} for the UVL file at path, see ConversionEngine.convert_all."""
+    report = None if on_error is None else (lambda tag, format, e: on_error(format, e))
+    for _, converted in get_conversion_engine().convert_all([(None, path, checksum)], formats, report):
+        return converted
+
+
+def convert(hubfile, format):
+    """Returns the path of the hubfile converted to format, the UVL is only parsed on a cache miss."""
+    return convert_many(hubfile.get_path(), hubfile.checksum, [format])[format]
+
+
+def write_text(path, content):
+    with open(path, "w", encoding="utf8") as file:
+        file.write(content)
@@ -1,4 +1,14 @@
+import os
+import signal
+import time
+from unittest import mock
+
 import pytest
+from flamapy.metamodels.fm_metamodel.transformations import UVLReader
+
+from app.modules.flamapy import conversions
+from app.modules.flamapy.conversions import ConversionEngine
+from core.caches.disk_cache import DiskLRUCache
 
 
 @pytest.fixture(scope='module')
@@ -22,3 +32,204 @@ def test_sample_assertion(test_client):
     """
     greeting = "Hello, World!"
     assert greeting == "Hello, World!", "The greeting does not coincide with 'Hello, World!'"
+
+
+UVL_MODEL = """features
+    Chat
+        mandatory
+            Connection
+        optional
+            Video
+"""
+
+
+@pytest.fixture
+def hubfile(tmp_path):
+    path = tmp_path / "chat.uvl"
+    path.write_text(UVL_MODEL)
+    hubfile_mock = mock.Mock(checksum="chat_checksum", get_path=lambda: str(path))
+    hubfile_mock.name = "chat.uvl"
+    return hubfile_mock
+
+
+def test_disk_cache_evicts_least_recently_used(tmp_path):
+    cache = DiskLRUCache(str(tmp_path), max_bytes=10)
+
+    first = cache.get_or_create(("a",), lambda path: open(path, "w").write("12345"))
+    os.utime(first, (1, 1))
+    second = cache.get_or_create(("b",), lambda path: open(path, "w").write("12345"))
+    os.utime(second, (2, 2))
+    assert cache.get(("a",)) == first
+
+    cache.get_or_create(("c",), lambda path: open(path, "w").write("12345"))
+
+    assert cache.get(("a",)) == first
+    assert cache.get(("b",)) is None
+    assert cache.get(("c",)) is not None
+
+
+def test_disk_cache_scans_only_over_the_limit(tmp_path):
+    cache = DiskLRUCache(str(tmp_path), max_bytes=10)
+    cache.get_or_create(("a",), lambda path: open(path, "w").write("12345"))
+
+    with mock.patch("core.caches.disk_cache.os.walk", wraps=os.walk) as walk:
+        cache.get_or_create(("b",), lambda path: open(path, "w").write("12345"))
+        assert walk.call_count == 0
+
+        cache.get_or_create(("c",), lambda path: open(path, "w").write("12345"))
+        assert walk.call_count == 1
+    assert cache.total_bytes == 10
+
+
+def test_disk_cache_discards_failed_entries(tmp_path):
+    cache = DiskLRUCache(str(tmp_path))
+
+    def produce(path):
+        raise ValueError("conversion failed")
+
+    with pytest.raises(ValueError):
+        cache.get_or_create(("broken",), produce)
+
+    assert cache.get(("broken",)) is None
+    assert not [name for _, _, files in os.walk(tmp_path) for name in files]
+
+
+@pytest.fixture
+def inline_engine(test_client):
+    with test_client.application.app_context():
+        conversions.get_conversion_cache().clear()
+        with mock.patch.dict(test_client.application.extensions, {"flamapy_engine": ConversionEngine(max_workers=0)}):
+            yield
+        conversions.get_conversion_cache().clear()
+
+
+def slow_render(path, formats):
+    time.sleep(3)
+    return {}, {}
+
+
+def paused_render(path, formats):
+    time.sleep(0.7)
+    return {}, {}
+
+
+def stuck_render(path, formats):
+    # Ignores the worker deadline, like a conversion stuck outside Python code
+    signal.signal(signal.SIGALRM, signal.SIG_IGN)
+    time.sleep(10)
+    return {}, {}
+
+
+def test_convert_parses_the_model_once(inline_engine, hubfile):
+    with mock.patch("app.modules.flamapy.conversions.UVLReader", wraps=UVLReader) as reader:
+        first = conversions.convert(hubfile, "glencoe")
+        second = conversions.convert(hubfile, "glencoe")
+        conversions.convert(hubfile, "dimacs")
+
+    assert first == second
+    assert reader.call_count == 2
+    with open(first) as f:
+        assert "Chat" in f.read()
+
+
+def test_convert_many_shares_one_parse(inline_engine, hubfile):
+    errors = []
+
+    with mock.patch("app.modules.flamapy.conversions.UVLReader", wraps=UVLReader) as reader:
+        converted = conversions.convert_many(
+            hubfile.get_path(), hubfile.checksum, on_error=lambda format, e: errors.append(format)
+        )
+
+    assert reader.call_count == 1
+    assert sorted(converted) == ["dimacs", "glencoe", "splot"]
+    assert not errors
+    assert all(os.path.exists(path) for path in converted.values())
+
+
+def test_engine_converts_in_worker_processes(test_client, tmp_path):
+    jobs = []
+    for i in range(4):
+        path = tmp_path / f"model{i}.uvl"
+        path.write_text(UVL_MODEL.replace("Video", f"Video{i}"))
+        jobs.append((i, str(path), f"engine_checksum_{i}"))
+    broken = tmp_path / "broken.uvl"
+    broken.write_text("features\n    (((\n")
+    jobs.append(("broken", str(broken), "engine_checksum_broken"))
+
+    engine = ConversionEngine(max_workers=2, timeout=60)
+    errors = []
+    with test_client.application.app_context():
+        conversions.get_conversion_cache().clear()
+        try:
+            results = dict(engine.convert_all(jobs, on_error=lambda tag, format, e: errors.append(tag)))
+        finally:
+            engine.shutdown()
+            conversions.get_conversion_cache().clear()
+
+    assert sorted(results, key=str) == [0, 1, 2, 3, "broken"]
+    assert all(sorted(results[i]) == ["dimacs", "glencoe", "splot"] for i in range(4))
+    assert results["broken"] == {}
+    assert set(errors) == {"broken"}
+
+
+def test_engine_times_out_slow_conversions(test_client, hubfile):
+    engine = ConversionEngine(max_workers=1, timeout=1)
+    errors = []
+    with test_client.application.app_context():
+        conversions.get_conversion_cache().clear()
+        with mock.patch("app.modules.flamapy.conversions.render_file", slow_render):
+            started = time.monotonic()
+            results = list(engine.convert_all(
+                [("slow", hubfile.get_path(), "slow_checksum")],
+                on_error=lambda tag, format, e: errors.append(type(e)),
+            ))
+        elapsed = time.monotonic() - started
+        engine.shutdown()
+
+    assert results == [("slow", {})]
+    assert errors == [TimeoutError] * 3
+    assert elapsed < 2.5
+
+
+def test_engine_timeout_starts_when_the_task_runs(test_client, hubfile):
+    engine = ConversionEngine(max_workers=1, timeout=1)
+    errors = []
+    with test_client.application.app_context():
+        conversions.get_conversion_cache().clear()
+        with mock.patch("app.modules.flamapy.conversions.render_file", paused_render):
+            # Another caller holds the only worker, the task waits 0.8s and then runs 0.7s
+            engine.pool.submit(time.sleep, 0.8)
+            results = list(engine.convert_all(
+                [("queued", hubfile.get_path(), "queued_checksum")],
+                on_error=lambda tag, format, e: errors.append(type(e)),
+            ))
+        engine.shutdown()
+
+    assert results == [("queued", {})]
+    assert errors == []
+
+
+def test_engine_recycles_stuck_workers(test_client, hubfile):
+    engine = ConversionEngine(max_workers=1, timeout=1, grace=1)
+    errors = []
+    with test_client.application.app_context():
+        conversions.get_conversion_cache().clear()
+        try:
+            with mock.patch("app.modules.flamapy.conversions.render_file", stuck_render):
+                started = time.monotonic()
+                results = list(engine.convert_all(
+                    [("stuck", hubfile.get_path(), "stuck_checksum")],
+                    on_error=lambda tag, format, e: errors.append(type(e)),
+                ))
+                elapsed = time.monotonic() - started
+
+            # The killed worker's slot is back: a fresh pool converts the next model
+            converted = dict(engine.convert_all([("next", hubfile.get_path(), "next_checksum")]))
+        finally:
+            engine.shutdown()
+            conversions.get_conversion_cache().clear()
+
+    assert results == [("stuck", {})]
+    assert errors == [TimeoutError] * 3
+    assert elapsed < 5
+    assert sorted(converted["next"]) == ["dimacs", "glencoe", "splot"]
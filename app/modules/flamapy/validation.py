@@ -0,0 +1,40 @@
+from antlr4 import CommonTokenStream, FileStream
+from antlr4.error.ErrorListener import ErrorListener
+from uvl.UVLCustomLexer import UVLCustomLexer
+from uvl.UVLPythonParser import UVLPythonParser
+
+
+class UVLErrorListener(ErrorListener):
+    def __init__(self):
+        self.errors = []
+
+    def syntaxError(self, recognizer, offendingSymbol, line, column, msg, e):
+        if "\\t" in msg:
+            warning_message = (
+                f"The UVL has the following warning that prevents reading it: "
+                f"Line {line}:{column} - {msg}"
+            )
+            print(warning_message)
+            self.errors.append(warning_message)
+        else:
+            error_message = (
+                f"The UVL has the following error that prevents reading it: "
+                f"Line {line}:{column} - {msg}"
+            )
+            self.errors.append(error_message)
+
+
+def validate_uvl(path):
+    """Syntax errors found parsing the UVL file at path, an empty list when it is valid."""
+    error_listener = UVLErrorListener()
+
+    lexer = UVLCustomLexer(FileStream(path, encoding="utf-8"))
+    lexer.removeErrorListeners()
+    lexer.addErrorListener(error_listener)
+
+    parser = UVLPythonParser(CommonTokenStream(lexer))
+    parser.removeErrorListeners()
+    parser.addErrorListener(error_listener)
+    parser.featureModel()
+
+    return error_listener.errors
@@ -10,12 +10,14 @@ class Hubfile(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(120), nullable=False)
     checksum = db.Column(db.String(120), nullable=False)
+    # Once set, the content lives in the blob store under this hash (see HubfileBlob)
+    sha256 = db.Column(db.String(64), nullable=True, index=True)
     size = db.Column(db.Integer, nullable=False)
     feature_model_id = db.Column(db.Integer, db.ForeignKey('feature_model.id'), nullable=False)
 
     def get_formatted_size(self):
         from app.modules.dataset.services import SizeService
-        return SizeService().get_human_readable_size(self.size)
+        return SizeService.get_human_readable_size(self.size)
 
     def get_owner_user(self) -> User:
         from app.modules.hubfile.services import HubfileService
@@ -43,6 +45,17 @@ class Hubfile(db.Model):
         return f'File<{self.id}>'
 
 
+class HubfileBlob(db.Model):
+    """Content shared by every hubfile with the same sha256, removed from disk when ref_count drops to zero."""
+    __tablename__ = 'file_blob'
+    sha256 = db.Column(db.String(64), primary_key=True)
+    size = db.Column(db.BigInteger, nullable=False)
+    ref_count = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'FileBlob<{self.sha256}>'
+
+
 class HubfileViewRecord(db.Model):
     __tablename__ = 'file_view_record'
     id = db.Column(db.Integer, primary_key=True)
@@ -1,8 +1,9 @@
 from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
 from app.modules.auth.models import User
 from app.modules.dataset.models import DataSet
 from app.modules.featuremodel.models import FeatureModel
-from app.modules.hubfile.models import Hubfile, HubfileDownloadRecord, HubfileViewRecord
+from app.modules.hubfile.models import Hubfile, HubfileBlob, HubfileDownloadRecord, HubfileViewRecord
 from core.repositories.BaseRepository import BaseRepository
 from app import db
 
@@ -24,6 +25,53 @@ class HubfileRepository(BaseRepository):
     def get_dataset_by_hubfile(self, hubfile: Hubfile) -> DataSet:
         return db.session.query(DataSet).join(FeatureModel).join(Hubfile).filter(Hubfile.id == hubfile.id).first()
 
+    def get_with_owner(self, dataset_ids=None, hubfile_ids=None):
+        """(hubfile, dataset id, user id) rows, resolved with a single query."""
+        query = (
+            db.session.query(Hubfile, DataSet.id, DataSet.user_id)
+            .join(FeatureModel, Hubfile.feature_model_id == FeatureModel.id)
+            .join(DataSet, FeatureModel.data_set_id == DataSet.id)
+        )
+        if dataset_ids is not None:
+            query = query.filter(DataSet.id.in_(dataset_ids))
+        if hubfile_ids is not None:
+            query = query.filter(Hubfile.id.in_(hubfile_ids))
+        return query.order_by(DataSet.id, Hubfile.id).all()
+
+
+class HubfileBlobRepository(BaseRepository):
+    def __init__(self):
+        super().__init__(HubfileBlob)
+
+    def acquire(self, sha256: str, size: int) -> HubfileBlob:
+        """Adds a reference to the blob, creating its row on the first one."""
+        updated = (
+            self.session.query(HubfileBlob)
+            .filter(HubfileBlob.sha256 == sha256)
+            .update({HubfileBlob.ref_count: HubfileBlob.ref_count + 1}, synchronize_session=False)
+        )
+        if not updated:
+            try:
+                with self.session.begin_nested():
+                    self.session.add(HubfileBlob(sha256=sha256, size=size, ref_count=1))
+            except IntegrityError:
+                # Another worker created it first
+                return self.acquire(sha256, size)
+        return self.session.get(HubfileBlob, sha256, populate_existing=True)
+
+    def release(self, sha256: str) -> int:
+        """Drops a reference to the blob and returns how many are left, the row is deleted at zero."""
+        self.session.query(HubfileBlob).filter(HubfileBlob.sha256 == sha256).update(
+            {HubfileBlob.ref_count: HubfileBlob.ref_count - 1}, synchronize_session=False
+        )
+        blob = self.session.get(HubfileBlob, sha256, populate_existing=True)
+        if blob is None:
+            return 0
+        if blob.ref_count <= 0:
+            self.session.delete(blob)
+            return 0
+        return blob.ref_count
+
 
 class HubfileViewRecordRepository(BaseRepository):
     def __init__(self):
@@ -3,21 +3,49 @@ import os
 import uuid
 from flask import current_app, jsonify, make_response, request, send_from_directory
 from flask_login import current_user
+from werkzeug.http import is_resource_modified
 from app.modules.hubfile import hubfile_bp
 from app.modules.hubfile.models import HubfileDownloadRecord, HubfileViewRecord
 from app.modules.hubfile.services import HubfileDownloadRecordService, HubfileService
+from core.downloads.accel import accel_redirect
 
 from app import db
 
 
+def not_modified(etag, last_modified):
+    """304 response when the client already holds this version of the file, None otherwise."""
+    if is_resource_modified(request.environ, etag=etag, last_modified=last_modified):
+        return None
+    response = make_response("", 304)
+    response.set_etag(etag)
+    response.last_modified = last_modified
+    response.cache_control.no_cache = True
+    return response
+
+
+def last_modified_of(path):
+    return datetime.fromtimestamp(os.path.getmtime(path), timezone.utc)
+
+
+def get_file_path(file):
+    # Blobs are shared by every dataset holding the same content, older uploads live in the dataset's folder
+    data_set = file.feature_model.data_set
+    path = HubfileService.build_path(data_set.user_id, data_set.id, file.name, file.sha256)
+    return os.path.join(os.path.dirname(current_app.root_path), path)
+
+
 @hubfile_bp.route("/file/download/<int:file_id>", methods=["GET"])
 def download_file(file_id):
     file = HubfileService().get_or_404(file_id)
     filename = file.name
 
-    directory_path = f"uploads/user_{file.feature_model.data_set.user_id}/dataset_{file.feature_model.data_set_id}/"
-    parent_directory_path = os.path.dirname(current_app.root_path)
-    file_path = os.path.join(parent_directory_path, directory_path)
+    file_path = get_file_path(file)
+
+    # Repeat downloads of an unchanged file skip the bookkeeping and the transfer
+    if os.path.exists(file_path):
+        cached = not_modified(file.checksum, last_modified_of(file_path))
+        if cached is not None:
+            return cached
 
     # Get the cookie from the request or generate a new one if it does not exist
     user_cookie = request.cookies.get("file_download_cookie")
@@ -40,10 +68,19 @@ def download_file(file_id):
             download_cookie=user_cookie,
         )
 
-    # Save the cookie to the user's browser
-    resp = make_response(
-        send_from_directory(directory=file_path, path=filename, as_attachment=True)
+    # Save the cookie to the user's browser. The checksum is a strong ETag, so interrupted downloads can be resumed
+    # with Range and If-Range. With offloading enabled nginx sends the bytes instead of this worker
+    resp = accel_redirect(file_path, download_name=filename) or make_response(
+        send_from_directory(
+            directory=os.path.dirname(file_path),
+            path=os.path.basename(file_path),
+            as_attachment=True,
+            download_name=filename,
+            etag=file.checksum,
+        )
     )
+    resp.headers.setdefault("Accept-Ranges", "bytes")
+    resp.cache_control.no_cache = True
     resp.set_cookie("file_download_cookie", user_cookie)
 
     return resp
@@ -52,14 +89,18 @@ def download_file(file_id):
 @hubfile_bp.route('/file/view/<int:file_id>', methods=['GET'])
 def view_file(file_id):
     file = HubfileService().get_or_404(file_id)
-    filename = file.name
 
-    directory_path = f"uploads/user_{file.feature_model.data_set.user_id}/dataset_{file.feature_model.data_set_id}/"
-    parent_directory_path = os.path.dirname(current_app.root_path)
-    file_path = os.path.join(parent_directory_path, directory_path, filename)
+    file_path = get_file_path(file)
 
     try:
         if os.path.exists(file_path):
+            # The JSON view is another representation of the file, so it gets its own validator
+            etag = f"{file.checksum}-view"
+            last_modified = last_modified_of(file_path)
+            cached = not_modified(etag, last_modified)
+            if cached is not None:
+                return cached
+
             with open(file_path, 'r') as f:
                 content = f.read()
 
@@ -87,8 +128,11 @@ def view_file(file_id):
 
             # Prepare response
             response = jsonify({'success': True, 'content': content})
+            response.set_etag(etag)
+            response.last_modified = last_modified
+            # Browsers keep the copy but revalidate it, which costs a 304 while the file is unchanged
+            response.cache_control.no_cache = True
             if not request.cookies.get('view_cookie'):
-                response = make_response(response)
                 response.set_cookie('view_cookie', user_cookie, max_age=60*60*24*365*2)
 
             return response
@@ -1,13 +1,24 @@
+import hashlib
+import logging
 import os
 from app.modules.auth.models import User
 from app.modules.dataset.models import DataSet
+from app.modules.dataset.services import DataSetService
 from app.modules.hubfile.models import Hubfile
 from app.modules.hubfile.repositories import (
+    HubfileBlobRepository,
     HubfileDownloadRecordRepository,
     HubfileRepository,
     HubfileViewRecordRepository
 )
 from core.services.BaseService import BaseService
+from core.storage.blob_store import BlobStore
+
+logger = logging.getLogger(__name__)
+
+
+def get_blob_store() -> BlobStore:
+    return BlobStore(os.path.join(os.getenv('WORKING_DIR', ''), 'uploads', 'blobs'))
 
 
 class HubfileService(BaseService):
@@ -15,6 +26,66 @@ class HubfileService(BaseService):
         super().__init__(HubfileRepository())
         self.hubfile_view_record_repository = HubfileViewRecordRepository()
         self.hubfile_download_record_repository = HubfileDownloadRecordRepository()
+        self.hubfile_blob_repository = HubfileBlobRepository()
+
+    def delete(self, id):
+        hubfile = self.repository.get_by_id(id)
+        if hubfile is None:
+            return False
+        dataset_id = hubfile.feature_model.data_set_id
+        self.delete_with_files(hubfile, [hubfile])
+        DataSetService().refresh_summaries([dataset_id])
+        return True
+
+    def delete_with_files(self, instance, hubfiles):
+        """Deletes instance, whose deletion cascades to hubfiles, and then releases the blobs of those files.
+
+        Every deletion that removes Hubfile rows goes through here, otherwise their blobs keep a reference forever.
+        """
+        sha256s = [hubfile.sha256 for hubfile in hubfiles]
+        self.repository.session.delete(instance)
+        self.repository.session.commit()
+        blob_store = get_blob_store()
+        for sha256 in sha256s:
+            if sha256 and blob_store.exists(sha256):
+                self.release_blob(sha256)
+
+    def store_file(self, hubfile: Hubfile, source_path: str) -> str:
+        """Moves the file uploaded for hubfile into the blob store, where identical uploads share one copy."""
+        self.hubfile_blob_repository.acquire(hubfile.sha256, hubfile.size)
+        self.repository.session.commit()
+        return get_blob_store().put(source_path, hubfile.sha256)
+
+    def release_blob(self, sha256: str):
+        if self.hubfile_blob_repository.release(sha256) == 0:
+            get_blob_store().remove(sha256)
+        self.repository.session.commit()
+
+    def backfill_blobs(self) -> int:
+        """Moves files still stored under uploads/user_<id>/dataset_<id>/ into the blob store."""
+        moved = 0
+        for hubfile, dataset_id, user_id in self.repository.get_with_owner():
+            legacy_path = self.build_path(user_id, dataset_id, hubfile.name)
+            if not os.path.isfile(legacy_path):
+                continue
+
+            digest = hashlib.sha256()
+            with open(legacy_path, 'rb') as f:
+                for data in iter(lambda: f.read(64 * 1024), b''):
+                    digest.update(data)
+            hubfile.sha256 = digest.hexdigest()
+            hubfile.size = os.path.getsize(legacy_path)
+
+            # The reference is committed before the move, an interrupted run leaks a reference but never a file
+            self.store_file(hubfile, legacy_path)
+            moved += 1
+
+            try:
+                os.rmdir(os.path.dirname(legacy_path))
+            except OSError:
+                pass
+        logger.info(f"{moved} files moved into the blob store")
+        return moved
 
     def get_owner_user_by_hubfile(self, hubfile: Hubfile) -> User:
         return self.repository.get_owner_user_by_hubfile(hubfile)
@@ -23,18 +94,25 @@ class HubfileService(BaseService):
         return self.repository.get_dataset_by_hubfile(hubfile)
 
     def get_path_by_hubfile(self, hubfile: Hubfile) -> str:
+        _, dataset_id, user_id = self.repository.get_with_owner(hubfile_ids=[hubfile.id])[0]
+        return self.build_path(user_id, dataset_id, hubfile.name, hubfile.sha256)
 
-        hubfile_user = self.get_owner_user_by_hubfile(hubfile)
-        hubfile_dataset = self.get_dataset_by_hubfile(hubfile)
-        working_dir = os.getenv('WORKING_DIR')
-
-        path = os.path.join(working_dir,
-                            'uploads',
-                            f'user_{hubfile_user.id}',
-                            f'dataset_{hubfile_dataset.id}',
-                            hubfile.name)
+    def get_paths(self, dataset_ids=None):
+        """(hubfile, dataset id, path) of every hubfile, or only of the given datasets."""
+        return [
+            (hubfile, dataset_id, self.build_path(user_id, dataset_id, hubfile.name, hubfile.sha256))
+            for hubfile, dataset_id, user_id in self.repository.get_with_owner(dataset_ids=dataset_ids)
+        ]
 
-        return path
+    @staticmethod
+    def build_path(user_id, dataset_id, filename, sha256=None) -> str:
+        """Blob store path of the content, or the per dataset path of files that were never moved there."""
+        if sha256:
+            blob_store = get_blob_store()
+            if blob_store.exists(sha256):
+                return blob_store.path_for(sha256)
+        working_dir = os.getenv('WORKING_DIR', '')
+        return os.path.join(working_dir, 'uploads', f'user_{user_id}', f'dataset_{dataset_id}', filename)
 
     def total_hubfile_views(self) -> int:
         return self.hubfile_view_record_repository.total_hubfile_views()
@@ -1,5 +1,18 @@
+import hashlib
+import os
+
 import pytest
 
+from app import db
+from app.modules.auth.models import User
+from app.modules.dataset.models import DataSet, DSMetaData, PublicationType
+from app.modules.featuremodel.models import FeatureModel
+from app.modules.hubfile.models import Hubfile, HubfileBlob
+from app.modules.hubfile.services import HubfileService, get_blob_store
+from core.storage.blob_store import BlobStore
+
+UVL_CONTENT = b"features\n    Root\n        optional\n            Leaf\n" * 50
+
 
 @pytest.fixture(scope='module')
 def test_client(test_client):
@@ -7,9 +20,24 @@ def test_client(test_client):
     Extends the test_client fixture to add additional specific data for module testing.
     """
     with test_client.application.app_context():
-        # Add HERE new elements to the database that you want to exist in the test context.
-        # DO NOT FORGET to use db.session.add(<element>) and db.session.commit() to save the data.
-        pass
+        user = User.query.filter_by(email='test@example.com').first()
+        dsmetadata = DSMetaData(title="Hubfile dataset", description="Files", publication_type=PublicationType.NONE)
+        db.session.add(dsmetadata)
+        db.session.commit()
+        dataset = DataSet(user_id=user.id, ds_meta_data_id=dsmetadata.id)
+        db.session.add(dataset)
+        db.session.commit()
+        feature_model = FeatureModel(data_set_id=dataset.id)
+        db.session.add(feature_model)
+        db.session.commit()
+
+        folder = os.path.join("uploads", f"user_{user.id}", f"dataset_{dataset.id}")
+        os.makedirs(folder, exist_ok=True)
+        with open(os.path.join(folder, "model.uvl"), "wb") as f:
+            f.write(UVL_CONTENT)
+        db.session.add(Hubfile(name="model.uvl", checksum="model_checksum", size=len(UVL_CONTENT),
+                               feature_model_id=feature_model.id))
+        db.session.commit()
 
     yield test_client
 
@@ -22,3 +50,175 @@ def test_sample_assertion(test_client):
     """
     greeting = "Hello, World!"
     assert greeting == "Hello, World!", "The greeting does not coincide with 'Hello, World!'"
+
+
+def test_download_file_supports_ranges(test_client):
+    hubfile = Hubfile.query.filter_by(name="model.uvl").first()
+
+    response = test_client.get(f"/file/download/{hubfile.id}")
+    assert response.status_code == 200
+    assert response.headers["Accept-Ranges"] == "bytes"
+    assert response.headers["ETag"] == '"model_checksum"'
+
+    response = test_client.get(f"/file/download/{hubfile.id}", headers={"Range": "bytes=10-19"})
+    assert response.status_code == 206
+    assert response.headers["Content-Range"] == f"bytes 10-19/{len(UVL_CONTENT)}"
+    assert response.data == UVL_CONTENT[10:20]
+
+    # The range is only honoured while the file is the one the client started downloading
+    response = test_client.get(
+        f"/file/download/{hubfile.id}", headers={"Range": "bytes=10-19", "If-Range": '"model_checksum"'}
+    )
+    assert response.status_code == 206
+    response = test_client.get(
+        f"/file/download/{hubfile.id}", headers={"Range": "bytes=10-19", "If-Range": '"other_checksum"'}
+    )
+    assert response.status_code == 200
+    assert response.data == UVL_CONTENT
+
+
+def test_download_file_conditional_get(test_client):
+    hubfile = Hubfile.query.filter_by(name="model.uvl").first()
+
+    response = test_client.get(f"/file/download/{hubfile.id}")
+    assert response.status_code == 200
+    assert "Last-Modified" in response.headers
+
+    response = test_client.get(f"/file/download/{hubfile.id}", headers={"If-None-Match": '"model_checksum"'})
+    assert response.status_code == 304
+    assert response.data == b""
+    assert response.headers["ETag"] == '"model_checksum"'
+
+    response = test_client.get(f"/file/download/{hubfile.id}", headers={"If-None-Match": '"other_checksum"'})
+    assert response.status_code == 200
+    assert response.data == UVL_CONTENT
+
+
+def test_view_file_conditional_get(test_client):
+    hubfile = Hubfile.query.filter_by(name="model.uvl").first()
+
+    response = test_client.get(f"/file/view/{hubfile.id}")
+    assert response.status_code == 200
+    assert response.json["content"] == UVL_CONTENT.decode()
+    etag = response.headers["ETag"]
+    assert etag == '"model_checksum-view"'
+    assert "Last-Modified" in response.headers
+
+    response = test_client.get(f"/file/view/{hubfile.id}", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.data == b""
+
+    response = test_client.get(
+        f"/file/view/{hubfile.id}", headers={"If-Modified-Since": response.headers["Last-Modified"]}
+    )
+    assert response.status_code == 304
+
+
+def test_download_file_accel_redirect(test_client):
+    hubfile = Hubfile.query.filter_by(name="model.uvl").first()
+    user_id = hubfile.feature_model.data_set.user_id
+    dataset_id = hubfile.feature_model.data_set_id
+
+    test_client.application.config["DOWNLOAD_ACCEL_REDIRECT"] = True
+    try:
+        response = test_client.get(f"/file/download/{hubfile.id}")
+    finally:
+        test_client.application.config["DOWNLOAD_ACCEL_REDIRECT"] = False
+
+    assert response.status_code == 200
+    assert response.headers["X-Accel-Redirect"] == f"/_accel/uploads/user_{user_id}/dataset_{dataset_id}/model.uvl"
+    assert response.headers["Content-Disposition"] == "attachment; filename=model.uvl"
+    assert response.data == b""
+    assert "file_download_cookie" in response.headers.get("Set-Cookie", "")
+
+
+def test_blob_store_shards_and_deduplicates(tmp_path):
+    store = BlobStore(str(tmp_path / "blobs"))
+    sha256 = hashlib.sha256(UVL_CONTENT).hexdigest()
+
+    for name in ("first.uvl", "second.uvl"):
+        source = tmp_path / name
+        source.write_bytes(UVL_CONTENT)
+        path = store.put(str(source), sha256)
+        assert not source.exists()
+
+    assert path == str(tmp_path / "blobs" / sha256[:2] / sha256[2:4] / sha256)
+    assert open(path, "rb").read() == UVL_CONTENT
+    with pytest.raises(ValueError):
+        store.path_for("../../etc/passwd")
+
+
+def test_identical_uploads_share_a_blob(test_client):
+    sha256 = hashlib.sha256(UVL_CONTENT).hexdigest()
+    feature_model_id = Hubfile.query.filter_by(name="model.uvl").first().feature_model_id
+    service = HubfileService()
+
+    hubfiles = []
+    for name in ("copy_a.uvl", "copy_b.uvl"):
+        source = os.path.join("uploads", name)
+        with open(source, "wb") as f:
+            f.write(UVL_CONTENT)
+        hubfile = Hubfile(name=name, checksum="model_checksum", sha256=sha256, size=len(UVL_CONTENT),
+                          feature_model_id=feature_model_id)
+        db.session.add(hubfile)
+        db.session.commit()
+        service.store_file(hubfile, source)
+        hubfiles.append(hubfile)
+
+    assert HubfileBlob.query.get(sha256).ref_count == 2
+    blob_path = get_blob_store().path_for(sha256)
+    assert hubfiles[0].get_path() == hubfiles[1].get_path() == blob_path
+
+    response = test_client.get(f"/file/download/{hubfiles[1].id}")
+    assert response.status_code == 200
+    assert response.data == UVL_CONTENT
+    assert "copy_b.uvl" in response.headers["Content-Disposition"]
+
+    service.delete(hubfiles[0].id)
+    assert HubfileBlob.query.get(sha256).ref_count == 1
+    assert os.path.exists(blob_path)
+
+    service.delete(hubfiles[1].id)
+    assert HubfileBlob.query.get(sha256) is None
+    assert not os.path.exists(blob_path)
+
+
+def test_deleting_a_dataset_releases_its_blobs(test_client):
+    content = UVL_CONTENT + b"shared\n"
+    sha256 = hashlib.sha256(content).hexdigest()
+    user = User.query.filter_by(email='test@example.com').first()
+    service = HubfileService()
+
+    datasets = []
+    for title in ("Shared A", "Shared B"):
+        dsmetadata = DSMetaData(title=title, description="Files", publication_type=PublicationType.NONE)
+        db.session.add(dsmetadata)
+        db.session.commit()
+        dataset = DataSet(user_id=user.id, ds_meta_data_id=dsmetadata.id)
+        db.session.add(dataset)
+        db.session.commit()
+        feature_model = FeatureModel(data_set_id=dataset.id)
+        db.session.add(feature_model)
+        db.session.commit()
+
+        source = os.path.join("uploads", f"{title}.uvl")
+        with open(source, "wb") as f:
+            f.write(content)
+        hubfile = Hubfile(name="shared.uvl", checksum="shared_checksum", sha256=sha256, size=len(content),
+                          feature_model_id=feature_model.id)
+        db.session.add(hubfile)
+        db.session.commit()
+        service.store_file(hubfile, source)
+        datasets.append(dataset)
+
+    blob_path = get_blob_store().path_for(sha256)
+    assert HubfileBlob.query.get(sha256).ref_count == 2
+
+    datasets[0].delete()
+    assert HubfileBlob.query.get(sha256).ref_count == 1
+    assert os.path.exists(blob_path)
+    assert datasets[1].files()[0].get_path() == blob_path
+
+    datasets[1].delete()
+    assert HubfileBlob.query.get(sha256) is None
+    assert not os.path.exists(blob_path)
@@ -194,6 +194,9 @@ class ZenodoService(BaseService):
         data = {"name": uvl_filename}
         user_id = current_user.id if user is None else user.id
         file_path = os.path.join(uploads_folder_name(), f"user_{str(user_id)}", f"dataset_{dataset.id}/", uvl_filename)
+        if feature_model.files and feature_model.files[0].sha256:
+            # Stored in the blob store, possibly shared with other datasets
+            file_path = feature_model.files[0].get_path()
         files = {"file": open(file_path, "rb")}
 
         publish_url = f"{self.ZENODO_API_URL}/{deposition_id}/files"
@@ -0,0 +1,114 @@
+import os
+import shutil
+from collections import namedtuple
+from zipfile import ZipFile
+
+from core.archives.zip_stream import CHUNK_SIZE
+
+# Members smaller than this are not checked against the compression ratio, tiny repetitive files compress very well
+RATIO_CHECK_MIN_SIZE = 1024 * 1024
+
+
+class ExtractionLimits(namedtuple("ExtractionLimits", ["max_members", "max_total_size", "max_ratio"])):
+    """Bounds enforced while extracting an untrusted archive, a limit of 0 disables it."""
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(
+            config.get("ZIP_MAX_MEMBERS", 1000),
+            config.get("ZIP_MAX_UNCOMPRESSED_BYTES", 1024 * 1024 * 1024),
+            config.get("ZIP_MAX_COMPRESSION_RATIO", 100),
+        )
+
+
+class UnsafeArchiveError(Exception):
+    pass
+
+
+class BoundedReader:
+    """Reads a member in chunks, failing as soon as it yields more bytes than the member or archive may hold."""
+
+    def __init__(self, source, member_limit, budget):
+        self.source = source
+        self.member_limit = member_limit
+        self.budget = budget
+        self.read_bytes = 0
+
+    def read(self, size=CHUNK_SIZE):
+        data = self.source.read(min(size, CHUNK_SIZE) if size and size > 0 else CHUNK_SIZE)
+        self.read_bytes += len(data)
+        if self.read_bytes > self.member_limit:
+            raise UnsafeArchiveError("Archive member is larger than it declares")
+        self.budget.spend(len(data))
+        return data
+
+
+class Budget:
+    def __init__(self, limit):
+        self.limit = limit
+        self.spent = 0
+
+    def spend(self, size):
+        self.spent += size
+        if self.limit and self.spent > self.limit:
+            raise UnsafeArchiveError(f"Archive expands beyond {self.limit} bytes")
+
+
+def unique_name(taken, filename):
+    """filename, or "name (i).ext" with the first i not in taken, which is updated with the result."""
+    name = filename
+    base_name, extension = os.path.splitext(filename)
+    i = 1
+    while name in taken:
+        name = f"{base_name} ({i}){extension}"
+        i += 1
+    taken.add(name)
+    return name
+
+
+def extract_members(zip_path, target_dir, select, limits, write=None, on_extracted=None):
+    """Extracts the members for which select(info) is true into target_dir, flattening their directories.
+
+    Members are streamed in chunks and checked against limits before and during extraction, so a zip bomb never
+    reaches the disk. Names already taken in target_dir get a " (i)" suffix, found from a single listing.
+    write(stream, path) writes each member, a plain chunked copy by default, and on_extracted(name, path) is called
+    once it is on disk. Returns the extracted names; on failure the members extracted so far are removed.
+    """
+    with ZipFile(zip_path, "r") as zip_ref:
+        members = [info for info in zip_ref.infolist() if not info.is_dir() and select(info)]
+
+        if limits.max_members and len(members) > limits.max_members:
+            raise UnsafeArchiveError(f"Archive has more than {limits.max_members} files")
+        if limits.max_total_size and sum(info.file_size for info in members) > limits.max_total_size:
+            raise UnsafeArchiveError(f"Archive expands beyond {limits.max_total_size} bytes")
+        for info in members:
+            ratio = info.file_size / max(info.compress_size, 1)
+            if limits.max_ratio and info.file_size > RATIO_CHECK_MIN_SIZE and ratio > limits.max_ratio:
+                raise UnsafeArchiveError(f"{info.filename} is compressed more than {limits.max_ratio}:1")
+
+        os.makedirs(target_dir, exist_ok=True)
+        taken = set(os.listdir(target_dir))
+        budget = Budget(limits.max_total_size)
+        names = []
+        paths = []
+        try:
+            for info in members:
+                name = unique_name(taken, os.path.basename(info.filename))
+                path = os.path.join(target_dir, name)
+                paths.append(path)
+                with zip_ref.open(info) as source:
+                    reader = BoundedReader(source, info.file_size, budget)
+                    if write is not None:
+                        write(reader, path)
+                    else:
+                        with open(path, "wb") as target:
+                            shutil.copyfileobj(reader, target, CHUNK_SIZE)
+                names.append(name)
+                if on_extracted is not None:
+                    on_extracted(name, path)
+        except BaseException:
+            for path in paths:
+                if os.path.exists(path):
+                    os.remove(path)
+            raise
+        return names
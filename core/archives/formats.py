@@ -0,0 +1,114 @@
+import tarfile
+import time
+from collections import namedtuple
+from zipfile import ZIP_DEFLATED, ZIP_STORED, ZipFile
+
+import zstandard
+
+from core.archives.zip_stream import CHUNK_SIZE, ZipStreamSink, concat_zips, stream_zip
+
+ZIP_COMPRESSIONS = {"deflate": ZIP_DEFLATED, "stored": ZIP_STORED}
+
+# format -> (mimetype, extension, compressions, default compression, (min level, default level, max level))
+ARCHIVE_FORMATS = {
+    "zip": ("application/zip", ".zip", tuple(ZIP_COMPRESSIONS), "deflate", (0, 6, 9)),
+    "tar.zst": ("application/zstd", ".tar.zst", ("zstd",), "zstd", (1, 3, 19)),
+}
+
+
+class ArchiveOptions(namedtuple("ArchiveOptions", ["format", "compression", "level"])):
+    """How an archive is packed, parsed from the `format`, `compression` and `level` query parameters."""
+
+    @classmethod
+    def parse(cls, args):
+        format = args.get("format") or "zip"
+        if format not in ARCHIVE_FORMATS:
+            raise ValueError(f"Unsupported archive format '{format}', use one of: {', '.join(ARCHIVE_FORMATS)}")
+        _, _, compressions, default_compression, (min_level, default_level, max_level) = ARCHIVE_FORMATS[format]
+
+        compression = args.get("compression") or default_compression
+        if compression not in compressions:
+            raise ValueError(f"Unsupported compression '{compression}' for {format}, use one of: "
+                             f"{', '.join(compressions)}")
+
+        if compression == "stored":
+            return cls(format, compression, 0)
+        try:
+            level = int(args.get("level") or default_level)
+        except ValueError:
+            raise ValueError("The compression level must be an integer")
+        if not min_level <= level <= max_level:
+            raise ValueError(f"The {compression} level must be between {min_level} and {max_level}")
+        return cls(format, compression, level)
+
+    @property
+    def mimetype(self):
+        return ARCHIVE_FORMATS[self.format][0]
+
+    @property
+    def extension(self):
+        return ARCHIVE_FORMATS[self.format][1]
+
+    @property
+    def key(self):
+        return f"{self.format}-{self.compression}-{self.level}"
+
+    @classmethod
+    def from_key(cls, key):
+        format, compression, level = key.split("-")
+        return cls.parse({"format": format, "compression": compression, "level": level})
+
+
+def stream_archive(entries, options, chunk_size=CHUNK_SIZE):
+    """Yields an archive of `entries` ((arcname, path) pairs) packed as `options` says."""
+    if options.format == "tar.zst":
+        return stream_tar_zst(entries, options.level, chunk_size)
+    return stream_zip(
+        entries,
+        compression=ZIP_COMPRESSIONS[options.compression],
+        compresslevel=options.level if options.compression == "deflate" else None,
+        chunk_size=chunk_size,
+    )
+
+
+def stream_tar_zst(entries, level=3, chunk_size=CHUNK_SIZE):
+    """
+    Yields a zstd compressed tar of `entries` ((arcname, path) pairs) as it is built.
+
+    Output is drained after every member, so at most one compressed member is held in memory.
+    """
+    sink = ZipStreamSink()
+    with zstandard.ZstdCompressor(level=level).stream_writer(sink, closefd=False) as compressor:
+        with tarfile.open(fileobj=compressor, mode="w|", bufsize=chunk_size) as tar:
+            for arcname, path in entries:
+                tar.add(path, arcname, recursive=False)
+                data = sink.drain()
+                if data:
+                    yield data
+    yield sink.drain()
+
+
+def zips_to_tar_zst(paths, level=3, chunk_size=CHUNK_SIZE):
+    """Yields a zstd compressed tar with the members of every zip archive in `paths`, in order."""
+    sink = ZipStreamSink()
+    with zstandard.ZstdCompressor(level=level).stream_writer(sink, closefd=False) as compressor:
+        with tarfile.open(fileobj=compressor, mode="w|", bufsize=chunk_size) as tar:
+            for path in paths:
+                with ZipFile(path) as archive:
+                    for zinfo in archive.infolist():
+                        tarinfo = tarfile.TarInfo(zinfo.filename)
+                        tarinfo.size = zinfo.file_size
+                        tarinfo.mtime = time.mktime(zinfo.date_time + (0, 0, -1))
+                        with archive.open(zinfo) as member:
+                            tar.addfile(tarinfo, member)
+                        data = sink.drain()
+                        if data:
+                            yield data
+    yield sink.drain()
+
+
+def assemble_archive(paths, options, chunk_size=CHUNK_SIZE):
+    """Yields one archive from zip `paths`, zips are joined as they are, other formats are repacked."""
+    if options.format == "tar.zst":
+        return zips_to_tar_zst(paths, options.level, chunk_size)
+    return concat_zips(paths, chunk_size)
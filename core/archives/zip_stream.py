@@ -0,0 +1,84 @@
+from zipfile import ZIP_STORED, ZipFile, ZipInfo
+
+CHUNK_SIZE = 64 * 1024
+
+
+class ZipStreamSink:
+    """
+    Write-only, unseekable file object that keeps what ZipFile writes until it is drained.
+
+    As it cannot seek back, ZipFile writes sizes and CRCs in data descriptors after each member. `offset` is where
+    the first written byte lands in the whole stream.
+    """
+
+    def __init__(self, offset=0):
+        self._chunks = []
+        self._position = offset
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def stream_zip(entries, compression=ZIP_STORED, compresslevel=None, chunk_size=CHUNK_SIZE):
+    """
+    Yields a zip archive of `entries` ((arcname, path) pairs) as it is built, so neither the archive nor a whole
+    member is ever held in memory or written to disk.
+    """
+    sink = ZipStreamSink()
+    with ZipFile(sink, "w", compression=compression, compresslevel=compresslevel) as zipf:
+        for arcname, path in entries:
+            zinfo = ZipInfo.from_file(path, arcname)
+            zinfo.compress_type = compression
+            with open(path, "rb") as source, zipf.open(zinfo, "w") as member:
+                while chunk := source.read(chunk_size):
+                    member.write(chunk)
+                    data = sink.drain()
+                    if data:
+                        yield data
+            data = sink.drain()
+            if data:
+                yield data
+    yield sink.drain()
+
+
+def concat_zips(paths, chunk_size=CHUNK_SIZE):
+    """
+    Yields one zip archive holding the members of every archive in `paths`, in order.
+
+    Member data is copied byte for byte, only a new central directory pointing at the shifted members is written,
+    so nothing is decompressed or recompressed. Member names must not repeat across archives.
+    """
+    offset = 0
+    members = []
+    for path in paths:
+        with ZipFile(path) as archive:
+            # Everything before the central directory is local headers and member data
+            end = archive.start_dir
+            for zinfo in archive.infolist():
+                zinfo.header_offset += offset
+                members.append(zinfo)
+
+        with open(path, "rb") as source:
+            remaining = end
+            while remaining and (chunk := source.read(min(chunk_size, remaining))):
+                remaining -= len(chunk)
+                yield chunk
+        offset += end
+
+    sink = ZipStreamSink(offset)
+    with ZipFile(sink, "w") as zipf:
+        zipf.filelist.extend(members)
+    yield sink.drain()
@@ -0,0 +1,116 @@
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+
+
+class DiskLRUCache:
+    """Files stored under a directory bounded to max_bytes, the least recently used ones are evicted first.
+
+    Entries are written to a temporary file and moved into place, so concurrent workers never see a partial file.
+    The size of the directory is counted as entries are added and only rescanned once the count passes max_bytes,
+    entries added by other processes are noticed on that rescan.
+    """
+
+    def __init__(self, directory, max_bytes=512 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        # Bytes in the directory as of the last scan plus the entries added since, None until the first scan
+        self.total_bytes = None
+        self.lock = threading.Lock()
+
+    def path_for(self, key, suffix=""):
+        digest = hashlib.sha256("\0".join(str(part) for part in key).encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, digest[:2], digest + suffix)
+
+    def get(self, key, suffix=""):
+        path = self.path_for(key, suffix)
+        try:
+            # The modification time doubles as the last access time for eviction
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def get_or_create(self, key, produce, suffix=""):
+        """Returns the path of the entry, calling produce(path) to write it on a miss."""
+        path = self.get(key, suffix)
+        if path is not None:
+            return path
+
+        path = self.path_for(key, suffix)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        os.close(fd)
+        try:
+            produce(temp_path)
+            size = os.path.getsize(temp_path)
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+        self.added(size, keep=path)
+        return path
+
+    def put(self, key, source_path, suffix=""):
+        """Moves the finished file at source_path in as the entry, replacing any previous one."""
+        path = self.path_for(key, suffix)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        size = os.path.getsize(source_path)
+        try:
+            size -= os.path.getsize(path)
+        except FileNotFoundError:
+            pass
+        os.replace(source_path, path)
+        self.added(size, keep=path)
+        return path
+
+    def temp_path(self, suffix=".tmp"):
+        """A new file in the cache directory that eviction skips, for put() to move in once it is written."""
+        os.makedirs(self.directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix=suffix)
+        os.close(fd)
+        return temp_path
+
+    def added(self, size, keep=None):
+        """Counts size more bytes in the directory, evicting once the count goes over max_bytes."""
+        with self.lock:
+            if self.total_bytes is not None:
+                self.total_bytes += size
+                if self.total_bytes <= self.max_bytes:
+                    return
+            self.evict(keep=keep)
+
+    def evict(self, keep=None):
+        entries = []
+        total = 0
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith(".tmp"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+        self.total_bytes = total
+
+    def clear(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+        self.total_bytes = 0
@@ -0,0 +1,77 @@
+import bisect
+import threading
+from collections import Counter
+
+import unidecode
+
+
+def normalize(text: str) -> str:
+    return " ".join(unidecode.unidecode(text).lower().split())
+
+
+class PrefixIndex:
+    """
+    Sorted array of (key, kind, text) used for prefix completions with bisect.
+
+    Every word of a text is indexed as the start of a key, so "feature model" is found by "fea" and by "mod".
+    Texts seen several times rank higher.
+    """
+
+    def __init__(self, scan_limit=200):
+        self.scan_limit = scan_limit
+        self._entries = []
+        self._keys = set()
+        self._counts = Counter()
+        self._lock = threading.Lock()
+
+    def _entries_for(self, kind, text):
+        words = normalize(text).split(" ")
+        return [(" ".join(words[i:]), kind, text) for i in range(len(words))]
+
+    def add(self, kind: str, text: str):
+        self.extend([(kind, text)])
+
+    def extend(self, items):
+        with self._lock:
+            new_entries = []
+            for kind, text in items:
+                if not text or not text.strip():
+                    continue
+                self._counts[(kind, text)] += 1
+                for entry in self._entries_for(kind, text):
+                    if entry not in self._keys:
+                        self._keys.add(entry)
+                        new_entries.append(entry)
+            if len(new_entries) > 16:
+                self._entries.extend(new_entries)
+                self._entries.sort()
+            else:
+                for entry in new_entries:
+                    bisect.insort(self._entries, entry)
+
+    def search(self, prefix: str, limit=10) -> list[tuple[str, str]]:
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+
+        with self._lock:
+            matches = {}
+            index = bisect.bisect_left(self._entries, (prefix,))
+            while index < len(self._entries) and len(matches) < self.scan_limit:
+                key, kind, text = self._entries[index]
+                if not key.startswith(prefix):
+                    break
+                matches[(kind, text)] = self._counts[(kind, text)]
+                index += 1
+
+        ranked = sorted(matches.items(), key=lambda match: (-match[1], normalize(match[0][1])))
+        return [(text, kind) for (kind, text), _ in ranked[:limit]]
+
+    def clear(self):
+        with self._lock:
+            self._entries = []
+            self._keys = set()
+            self._counts = Counter()
+
+    def __len__(self):
+        return len(self._counts)
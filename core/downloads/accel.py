@@ -0,0 +1,44 @@
+import mimetypes
+import os
+import unicodedata
+from urllib.parse import quote
+
+from flask import Response, current_app
+
+
+def accel_uri(path):
+    """Internal nginx URI serving path, None when offloading is off or no location covers the file."""
+    if not current_app.config.get("DOWNLOAD_ACCEL_REDIRECT", False) or path is None or not os.path.isfile(path):
+        return None
+
+    path = os.path.realpath(path)
+    for root, location in current_app.config.get("DOWNLOAD_ACCEL_LOCATIONS", {}).items():
+        root = os.path.realpath(root)
+        if os.path.commonpath([root, path]) == root:
+            relative_path = os.path.relpath(path, root).replace(os.sep, "/")
+            return location.rstrip("/") + "/" + quote(relative_path)
+    return None
+
+
+def accel_redirect(path, download_name, mimetype=None):
+    """Empty attachment response telling nginx to send path itself, None when it has to go through Flask.
+
+    nginx answers Range and conditional requests against the file, and keeps the Content-Type,
+    Content-Disposition, Cache-Control and Set-Cookie headers set here.
+    """
+    uri = accel_uri(path)
+    if uri is None:
+        return None
+
+    response = Response(mimetype=mimetype or mimetypes.guess_type(download_name)[0] or "application/octet-stream")
+    response.headers["X-Accel-Redirect"] = uri
+    try:
+        download_name.encode("ascii")
+        response.headers.set("Content-Disposition", "attachment", filename=download_name)
+    except UnicodeEncodeError:
+        # Same fallback as send_file: an ASCII approximation plus the RFC 5987 encoded name
+        simple_name = unicodedata.normalize("NFKD", download_name).encode("ascii", "ignore").decode("ascii")
+        response.headers.set(
+            "Content-Disposition", "attachment", filename=simple_name, **{"filename*": f"UTF-8''{quote(download_name)}"}
+        )
+    return response
@@ -1,5 +1,6 @@
 import os
 import secrets
+import tempfile
 
 
 class ConfigManager:
@@ -33,6 +34,52 @@ class Config:
     TIMEZONE = 'Europe/Madrid'
     TEMPLATES_AUTO_RELOAD = True
     UPLOAD_FOLDER = 'uploads'
+    # 'fulltext' uses MATCH ... AGAINST on MySQL/MariaDB, 'like' forces the ILIKE fallback
+    EXPLORE_SEARCH_MODE = os.getenv('EXPLORE_SEARCH_MODE', 'fulltext')
+    FULLTEXT_MIN_TOKEN_SIZE = int(os.getenv('FULLTEXT_MIN_TOKEN_SIZE', 3))
+    EXPLORE_PAGE_SIZE = int(os.getenv('EXPLORE_PAGE_SIZE', 50))
+    EXPLORE_MAX_PAGE_SIZE = int(os.getenv('EXPLORE_MAX_PAGE_SIZE', 200))
+    # Explore results cache (per process), a TTL of 0 disables it
+    EXPLORE_CACHE_TTL = int(os.getenv('EXPLORE_CACHE_TTL', 60))
+    EXPLORE_CACHE_SIZE = int(os.getenv('EXPLORE_CACHE_SIZE', 256))
+    EXPLORE_SUGGEST_LIMIT = int(os.getenv('EXPLORE_SUGGEST_LIMIT', 10))
+    # Rows loaded per batch by the NDJSON streaming responses
+    STREAM_BATCH_SIZE = int(os.getenv('STREAM_BATCH_SIZE', 100))
+    # On disk cache of flamapy conversions (Glencoe, DIMACS, SPLOT), least recently used files are evicted first
+    FLAMAPY_CACHE_DIR = os.getenv('FLAMAPY_CACHE_DIR', 'cache/flamapy')
+    FLAMAPY_CACHE_MAX_BYTES = int(os.getenv('FLAMAPY_CACHE_MAX_BYTES', 512 * 1024 * 1024))
+    # Process pool running the conversions (0 runs them in the request thread) and per model timeout in seconds
+    FLAMAPY_MAX_WORKERS = int(os.getenv('FLAMAPY_MAX_WORKERS', os.cpu_count() or 1))
+    FLAMAPY_CONVERSION_TIMEOUT = int(os.getenv('FLAMAPY_CONVERSION_TIMEOUT', 60))
+    # Seconds past the timeout before a worker that ignores it is killed and the pool recycled
+    FLAMAPY_CONVERSION_GRACE = int(os.getenv('FLAMAPY_CONVERSION_GRACE', 5))
+    # Where the "download all datasets" archive is built, it is served from there until the catalogue changes
+    DOWNLOAD_ALL_DIR = os.getenv('DOWNLOAD_ALL_DIR', 'cache/downloads')
+    # Per dataset fragments the archive is assembled from, keep it above the size of the whole archive
+    DOWNLOAD_ALL_FRAGMENTS_MAX_BYTES = int(os.getenv('DOWNLOAD_ALL_FRAGMENTS_MAX_BYTES', 2 * 1024 * 1024 * 1024))
+    # Single dataset archives, kept on disk so downloads can be resumed
+    DATASET_ARCHIVES_DIR = os.getenv('DATASET_ARCHIVES_DIR', 'cache/archives')
+    DATASET_ARCHIVES_MAX_BYTES = int(os.getenv('DATASET_ARCHIVES_MAX_BYTES', 1024 * 1024 * 1024))
+    # Chunked uploads: size of the chunks clients are told to send and largest file accepted
+    CHUNKED_UPLOAD_CHUNK_SIZE = int(os.getenv('CHUNKED_UPLOAD_CHUNK_SIZE', 8 * 1024 * 1024))
+    CHUNKED_UPLOAD_MAX_SIZE = int(os.getenv('CHUNKED_UPLOAD_MAX_SIZE', 10 * 1024 * 1024 * 1024))
+    # Bounds on uploaded zips (0 disables a limit) and threads validating the extracted models
+    ZIP_MAX_MEMBERS = int(os.getenv('ZIP_MAX_MEMBERS', 1000))
+    ZIP_MAX_UNCOMPRESSED_BYTES = int(os.getenv('ZIP_MAX_UNCOMPRESSED_BYTES', 1024 * 1024 * 1024))
+    ZIP_MAX_COMPRESSION_RATIO = int(os.getenv('ZIP_MAX_COMPRESSION_RATIO', 100))
+    UVL_VALIDATION_WORKERS = int(os.getenv('UVL_VALIDATION_WORKERS', 4))
+    # GitHub imports: raw content host, largest file accepted, request timeout and cache of imported URLs
+    GITHUB_RAW_URL = os.getenv('GITHUB_RAW_URL', 'https://raw.githubusercontent.com')
+    GITHUB_IMPORT_MAX_BYTES = int(os.getenv('GITHUB_IMPORT_MAX_BYTES', 100 * 1024 * 1024))
+    GITHUB_IMPORT_TIMEOUT = int(os.getenv('GITHUB_IMPORT_TIMEOUT', 15))
+    GITHUB_CACHE_DIR = os.getenv('GITHUB_CACHE_DIR', 'cache/github')
+    GITHUB_CACHE_MAX_BYTES = int(os.getenv('GITHUB_CACHE_MAX_BYTES', 256 * 1024 * 1024))
+    # Let nginx send downloaded files through X-Accel-Redirect, each directory maps to an internal location
+    DOWNLOAD_ACCEL_REDIRECT = os.getenv('DOWNLOAD_ACCEL_REDIRECT', 'false').lower() == 'true'
+    DOWNLOAD_ACCEL_LOCATIONS = {
+        'uploads': '/_accel/uploads/',
+        'cache': '/_accel/cache/',
+    }
 
 
 class DevelopmentConfig(Config):
@@ -49,6 +96,11 @@ class TestingConfig(Config):
         f"{os.getenv('MARIADB_TEST_DATABASE', 'default_db')}"
     )
     WTF_CSRF_ENABLED = False
+    EXPLORE_CACHE_TTL = 0
+    FLAMAPY_CACHE_DIR = os.path.join(tempfile.gettempdir(), 'uvlhub_flamapy_cache')
+    DOWNLOAD_ALL_DIR = os.path.join(tempfile.gettempdir(), 'uvlhub_downloads')
+    DATASET_ARCHIVES_DIR = os.path.join(tempfile.gettempdir(), 'uvlhub_archives')
+    GITHUB_CACHE_DIR = os.path.join(tempfile.gettempdir(), 'uvlhub_github_cache')
 
 
 class ProductionConfig(Config):
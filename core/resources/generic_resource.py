@@ -1,8 +1,9 @@
-from flask import request
+from flask import current_app, request
 from flask_restful import Resource
 from datetime import datetime
 
 from app import db
+from core.serialisers.ndjson import ndjson_response, wants_ndjson
 
 
 def convert_value(value):
@@ -12,21 +13,44 @@ def convert_value(value):
 
 
 class GenericResource(Resource):
-    def __init__(self, model, serializer):
+    def __init__(self, model, serializer, query_options=None):
         self.model = model
         self.model_name = model.__name__
         self.serializer = serializer
+        self.query_options = query_options
+
+    def query(self):
+        # query_options is a callable so loader options are built once mappers are configured
+        if self.query_options:
+            return self.model.query.options(*self.query_options())
+        return self.model.query
 
     def get(self, id=None):
         if id:
-            item = self.model.query.get(id)
+            item = self.query().get(id)
             if not item:
                 return {'message': f'{self.model_name} not found'}, 404
             return self.serializer.serialize(item), 200
+        elif wants_ndjson():
+            return ndjson_response(self.stream(current_app.config.get('STREAM_BATCH_SIZE', 100)))
         else:
-            items = self.model.query.all()
+            items = self.query().all()
             return {'items': [self.serializer.serialize(i) for i in items]}, 200
 
+    def stream(self, batch_size):
+        # Keyset batches over the primary key, only one batch is loaded at a time
+        last_id = None
+        while True:
+            query = self.query().order_by(self.model.id)
+            if last_id is not None:
+                query = query.filter(self.model.id > last_id)
+            items = query.limit(batch_size).all()
+            for item in items:
+                yield self.serializer.serialize(item)
+            if len(items) < batch_size:
+                return
+            last_id = items[-1].id
+
     def post(self):
         data = request.get_json()
         if not data:
@@ -62,8 +86,8 @@ class GenericResource(Resource):
         return {'message': f'{self.model_name} deleted successfully'}, 204
 
 
-def create_resource(model, serialization_fields=None):
+def create_resource(model, serialization_fields=None, query_options=None):
     class Resource(GenericResource):
         def __init__(self):
-            super().__init__(model, serialization_fields)
+            super().__init__(model, serialization_fields, query_options)
     return Resource
@@ -0,0 +1,17 @@
+from flask import Response, current_app, request, stream_with_context
+
+NDJSON_MIMETYPE = 'application/x-ndjson'
+
+
+def wants_ndjson() -> bool:
+    # Plain JSON stays the default, NDJSON has to be explicitly preferred in the Accept header
+    return request.accept_mimetypes.best_match(['application/json', NDJSON_MIMETYPE]) == NDJSON_MIMETYPE
+
+
+def ndjson_response(items) -> Response:
+    """Streams an iterable of dicts, one JSON document per line, while the request context is kept alive."""
+    def generate():
+        for item in items:
+            yield current_app.json.dumps(item) + '\n'
+
+    return Response(stream_with_context(generate()), mimetype=NDJSON_MIMETYPE)
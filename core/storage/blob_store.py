@@ -0,0 +1,40 @@
+import os
+import re
+import shutil
+
+
+class BlobStore:
+    """Files named after the SHA-256 of their content, sharded as <directory>/ab/cd/<sha256>.
+
+    Identical content is stored once. Blobs are moved into place atomically, so a reader never sees a partial one.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def path_for(self, sha256):
+        if not re.fullmatch(r"[0-9a-f]{64}", sha256):
+            raise ValueError(f"Not a SHA-256 hex digest: '{sha256}'")
+        return os.path.join(self.directory, sha256[:2], sha256[2:4], sha256)
+
+    def exists(self, sha256):
+        return os.path.exists(self.path_for(sha256))
+
+    def put(self, source_path, sha256):
+        """Moves the file at source_path into the store, dropping it when the content is already there."""
+        path = self.path_for(sha256)
+        if os.path.exists(path):
+            os.remove(source_path)
+            return path
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        # Sources may live on another filesystem, so the move goes through a temporary name next to the blob
+        shutil.move(source_path, temp_path)
+        os.replace(temp_path, path)
+        return path
+
+    def remove(self, sha256):
+        path = self.path_for(sha256)
+        if os.path.exists(path):
+            os.remove(path)
@@ -0,0 +1,31 @@
+"""fulltext indexes for explore search
+
+Revision ID: 8c1e5a7f3b92
+Revises: 4223c3e8f267
+Create Date: 2024-12-20 10:14:52.118204
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '8c1e5a7f3b92'
+down_revision = '4223c3e8f267'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_ds_meta_data_fulltext', 'ds_meta_data', ['title', 'description', 'tags'],
+                    unique=False, mysql_prefix='FULLTEXT')
+    op.create_index('ix_author_fulltext', 'author', ['name', 'affiliation', 'orcid'],
+                    unique=False, mysql_prefix='FULLTEXT')
+    op.create_index('ix_fm_meta_data_fulltext', 'fm_meta_data',
+                    ['uvl_filename', 'title', 'description', 'publication_doi', 'tags'],
+                    unique=False, mysql_prefix='FULLTEXT')
+
+
+def downgrade():
+    op.drop_index('ix_fm_meta_data_fulltext', table_name='fm_meta_data')
+    op.drop_index('ix_author_fulltext', table_name='author')
+    op.drop_index('ix_ds_meta_data_fulltext', table_name='ds_meta_data')
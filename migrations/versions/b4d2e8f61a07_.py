@@ -0,0 +1,55 @@
+"""denormalized dataset summary columns
+
+Revision ID: b4d2e8f61a07
+Revises: 8c1e5a7f3b92
+Create Date: 2024-12-21 17:02:36.540981
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b4d2e8f61a07'
+down_revision = '8c1e5a7f3b92'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('data_set', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('total_size_bytes', sa.BigInteger(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('files_count', sa.Integer(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('feature_models_count', sa.Integer(), server_default='0', nullable=False))
+        batch_op.create_index(batch_op.f('ix_data_set_total_size_bytes'), ['total_size_bytes'], unique=False)
+        batch_op.create_index(batch_op.f('ix_data_set_feature_models_count'), ['feature_models_count'], unique=False)
+
+    # Backfill existing rows
+    op.execute(
+        """
+        UPDATE data_set SET
+            total_size_bytes = (
+                SELECT COALESCE(SUM(file.size), 0) FROM file
+                JOIN feature_model ON file.feature_model_id = feature_model.id
+                WHERE feature_model.data_set_id = data_set.id
+            ),
+            files_count = (
+                SELECT COUNT(file.id) FROM file
+                JOIN feature_model ON file.feature_model_id = feature_model.id
+                WHERE feature_model.data_set_id = data_set.id
+            ),
+            feature_models_count = (
+                SELECT COUNT(feature_model.id) FROM feature_model
+                WHERE feature_model.data_set_id = data_set.id
+            )
+        """
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('data_set', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_data_set_feature_models_count'))
+        batch_op.drop_index(batch_op.f('ix_data_set_total_size_bytes'))
+        batch_op.drop_column('feature_models_count')
+        batch_op.drop_column('files_count')
+        batch_op.drop_column('total_size_bytes')
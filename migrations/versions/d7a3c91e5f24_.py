@@ -0,0 +1,86 @@
+"""normalized tags
+
+Revision ID: d7a3c91e5f24
+Revises: b4d2e8f61a07
+Create Date: 2024-12-22 11:40:08.905113
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd7a3c91e5f24'
+down_revision = 'b4d2e8f61a07'
+branch_labels = None
+depends_on = None
+
+
+def parse_tags(tags):
+    names = [name.strip().lower() for name in (tags or '').split(',')]
+    return list(dict.fromkeys(name for name in names if name))
+
+
+def upgrade():
+    tag = op.create_table('tag',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=120), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('tag', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_tag_name'), ['name'], unique=True)
+
+    ds_meta_data_tag = op.create_table('ds_meta_data_tag',
+    sa.Column('ds_meta_data_id', sa.Integer(), nullable=False),
+    sa.Column('tag_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['ds_meta_data_id'], ['ds_meta_data.id'], ),
+    sa.ForeignKeyConstraint(['tag_id'], ['tag.id'], ),
+    sa.PrimaryKeyConstraint('ds_meta_data_id', 'tag_id')
+    )
+    with op.batch_alter_table('ds_meta_data_tag', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_ds_meta_data_tag_tag_id'), ['tag_id'], unique=False)
+
+    fm_meta_data_tag = op.create_table('fm_meta_data_tag',
+    sa.Column('fm_meta_data_id', sa.Integer(), nullable=False),
+    sa.Column('tag_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['fm_meta_data_id'], ['fm_meta_data.id'], ),
+    sa.ForeignKeyConstraint(['tag_id'], ['tag.id'], ),
+    sa.PrimaryKeyConstraint('fm_meta_data_id', 'tag_id')
+    )
+    with op.batch_alter_table('fm_meta_data_tag', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_fm_meta_data_tag_tag_id'), ['tag_id'], unique=False)
+
+    # Backfill from the comma separated strings
+    bind = op.get_bind()
+    ds_meta_data = sa.table('ds_meta_data', sa.column('id', sa.Integer), sa.column('tags', sa.String))
+    fm_meta_data = sa.table('fm_meta_data', sa.column('id', sa.Integer), sa.column('tags', sa.String))
+
+    tagged = {
+        (ds_meta_data_tag, 'ds_meta_data_id'): bind.execute(sa.select(ds_meta_data.c.id, ds_meta_data.c.tags)).all(),
+        (fm_meta_data_tag, 'fm_meta_data_id'): bind.execute(sa.select(fm_meta_data.c.id, fm_meta_data.c.tags)).all(),
+    }
+
+    names = sorted({name for rows in tagged.values() for _, tags in rows for name in parse_tags(tags)})
+    if names:
+        op.bulk_insert(tag, [{'name': name} for name in names])
+    tag_ids = dict((name, id) for id, name in bind.execute(sa.select(tag.c.id, tag.c.name)))
+
+    for (association, column), rows in tagged.items():
+        links = [{column: id, 'tag_id': tag_ids[name]} for id, tags in rows for name in parse_tags(tags)]
+        if links:
+            op.bulk_insert(association, links)
+
+
+def downgrade():
+    with op.batch_alter_table('fm_meta_data_tag', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_fm_meta_data_tag_tag_id'))
+
+    op.drop_table('fm_meta_data_tag')
+    with op.batch_alter_table('ds_meta_data_tag', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_ds_meta_data_tag_tag_id'))
+
+    op.drop_table('ds_meta_data_tag')
+    with op.batch_alter_table('tag', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_tag_name'))
+
+    op.drop_table('tag')
@@ -5,6 +5,7 @@ from rosemary.commands.locust import locust, stop
 from rosemary.commands.compose_env import compose_env
 from rosemary.commands.route_list import route_list
 from rosemary.commands.db_seed import db_seed
+from rosemary.commands.db_backfill import db_backfill
 from rosemary.commands.clear_cache import clear_cache
 from rosemary.commands.db_console import db_console
 from rosemary.commands.db_migrate import db_migrate
@@ -52,6 +53,7 @@ cli.add_command(db_reset)
 cli.add_command(db_migrate)
 cli.add_command(db_console)
 cli.add_command(db_seed)
+cli.add_command(db_backfill)
 cli.add_command(route_list)
 cli.add_command(compose_env)
 cli.add_command(locust)
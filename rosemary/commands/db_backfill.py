@@ -0,0 +1,54 @@
+import click
+from flask.cli import with_appcontext
+
+
+def backfill_summaries():
+    from app.modules.dataset.services import DataSetService
+    updated = DataSetService().refresh_summaries()
+    click.echo(click.style(f'Dataset summaries recomputed for {updated} datasets.', fg='blue'))
+
+
+def backfill_tags():
+    from app.modules.dataset.services import TagService
+    updated = TagService().backfill()
+    click.echo(click.style(f'Tags rebuilt for {updated} metadata records.', fg='blue'))
+
+
+def backfill_search(batch_size=500):
+    from app.modules.dataset.services import DataSetService
+    from app.modules.explore.services import ExploreService
+    dataset_ids = [dataset.id for dataset in DataSetService().get_all()]
+    for start in range(0, len(dataset_ids), batch_size):
+        ExploreService().index_datasets(dataset_ids[start:start + batch_size])
+    click.echo(click.style(f'Search index rebuilt for {len(dataset_ids)} datasets.', fg='blue'))
+
+
+def backfill_blobs():
+    from app.modules.hubfile.services import HubfileService
+    moved = HubfileService().backfill_blobs()
+    click.echo(click.style(f'{moved} files moved into the blob store.', fg='blue'))
+
+
+BACKFILLS = {
+    'summaries': backfill_summaries,
+    'tags': backfill_tags,
+    'search': backfill_search,
+    'blobs': backfill_blobs,
+}
+
+
+@click.command('db:backfill', help="Recomputes denormalized data (all of it unless a TARGET is given).")
+@click.argument('target', required=False, type=click.Choice(list(BACKFILLS)))
+@with_appcontext
+def db_backfill(target):
+    targets = [target] if target else list(BACKFILLS)
+
+    for name in targets:
+        click.echo(click.style(f"Backfilling '{name}'...", fg='green'))
+        try:
+            BACKFILLS[name]()
+        except Exception as e:
+            click.echo(click.style(f"Error backfilling '{name}': {e}", fg='red'))
+            return
+
+    click.echo(click.style('Backfill completed.', fg='green'))